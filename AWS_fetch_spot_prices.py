@@ -5,6 +5,7 @@ from pymongo import MongoClient
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from datetime import datetime, timezone
+from CloudSurvey_Package.db_operations import record_ingestion_batch
 
 load_dotenv()
 
@@ -100,5 +101,9 @@ def main():
 
     print(f"Inserted a total of {inserted_count_total} spot price records across all specified regions.")
 
+    # Signal the optimize services that a new price batch is available
+    batch_id = record_ingestion_batch(client, "aws_spot_prices", inserted_count_total)
+    print(f"Recorded ingestion batch {batch_id}.")
+
 if __name__ == "__main__":
     main()
@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 import logging
 import os
 from dotenv import load_dotenv
+from CloudSurvey_Package.db_operations import record_ingestion_batch
 
 load_dotenv()
 CONNECTION_STRING = os.getenv('MONGODB_URI')
@@ -147,6 +148,10 @@ def main():
     if batch:
         insert_spot_prices_bulk(client, "AzureSpotPricesDB", "SpotPrices", batch)
 
+    # Signal the optimize services that a new price batch is available
+    batch_id = record_ingestion_batch(client, "azure_spot_prices", len(all_prices))
+    logging.info(f"Recorded ingestion batch {batch_id}.")
+
     client.close()
     logging.info("MongoDB connection closed.")
 
@@ -328,15 +328,10 @@ def compute_cost_for_start_hour(
         return scenario2_min, scenario2_mean, scenario2_max, scenario2_start_time
 
 
-def find_cheapest_slot_vectorized(instance_list, pricing_data, region, parallelization):
+def slot_costs_vectorized(instance_list, pricing_data, region, parallelization):
     """
-    Finds the cheapest cost slot for each instance using vectorized operations based on pricing data and parallelization factors.
-
-    For each instance (represented as [instance_type, duration_in_seconds]), the function:
-      - Builds a NumPy array of hourly prices for the given region.
-      - For each allowed parallelization factor, calculates the effective duration per instance and computes the cost
-        for each possible starting hour (0-23) considering full days, extra full hours, and fractional hours.
-      - Determines the starting hour that yields the lowest cost per instance.
+    Computes the cost of every starting hour (0-23) for each instance and parallelization factor,
+    the cost matrices behind find_cheapest_slot_vectorized.
 
     Parameters:
       - instance_list: A list of instances, each represented as [instance_type, duration_in_seconds].
@@ -345,10 +340,11 @@ def find_cheapest_slot_vectorized(instance_list, pricing_data, region, paralleli
       - parallelization: A list of allowed parallelization factors (integers).
 
     Returns:
-      A dictionary mapping each instance type to another dictionary that maps each parallelization factor to a tuple:
-        (region, best_start_hour, total_cost, effective_duration)
+      (priced_instances, slot_costs) where priced_instances are the (instance_type, duration) with a price
+      for every hour and slot_costs maps each parallelization factor to a tuple:
+        (cost_per_instance (priced instances x 24 start hours), effective_durations in seconds)
     """
-    results = {}
+    slot_costs = {}
     # Build mapping: instance_type -> NumPy array of shape (24,) for the given region.
     instance_pricing = {}
     for entry in pricing_data:
@@ -356,53 +352,93 @@ def find_cheapest_slot_vectorized(instance_list, pricing_data, region, paralleli
             continue
         itype = entry['instance_type']
         hour = entry['hour']
-        price = entry['spot_price']
+        price = entry['spot_price'] if 'spot_price' in entry else entry['spot_price_eur']  # AWS aggregation
         if itype not in instance_pricing:
             instance_pricing[itype] = np.full(24, np.nan)
         instance_pricing[itype][hour] = price
 
-    for instance_type, duration in instance_list:
-        # Skip if pricing data is incomplete
-        if instance_type not in instance_pricing or np.isnan(instance_pricing[instance_type]).any():
-            continue
+    # Skip instances with incomplete pricing data
+    priced_instances = [
+        (instance_type, duration) for instance_type, duration in instance_list
+        if instance_type in instance_pricing and not np.isnan(instance_pricing[instance_type]).any()
+    ]
+    if not priced_instances:
+        return priced_instances, slot_costs
+
+    durations = np.array([duration for _, duration in priced_instances], dtype=float)
+    hourly_prices = np.stack([instance_pricing[instance_type] for instance_type, _ in priced_instances])
+    daily_costs = np.sum(hourly_prices, axis=1)  # cost for 24 hours per instance
+
+    starts = np.arange(24)
+    for p in parallelization:
+        # Effective duration per instance when using p instances.
+        effective_durations = durations / p  # may be fractional seconds
+
+        # Effective full hours and remainder, split into full days and extra full hours.
+        effective_full_hours = (effective_durations // 3600).astype(int)
+        effective_remainders = effective_durations - effective_full_hours * 3600
+        full_days, extra_hours = np.divmod(effective_full_hours, 24)
+
+        cost_per_instance = np.empty((len(priced_instances), 24))
+        for hours in np.unique(extra_hours):
+            rows = np.nonzero(extra_hours == hours)[0]
+            prices = hourly_prices[rows]
+            if hours > 0:
+                # For each start, sum the prices over the extra hours (cyclically).
+                # Summed as rows of length hours, like the former per-instance loop, so the rounding is identical.
+                indices = (starts[:, None] + np.arange(hours)) % 24
+                extra_costs = np.sum(prices[:, indices].reshape(-1, hours), axis=1).reshape(len(rows), 24)
+            else:
+                extra_costs = np.zeros((len(rows), 24))
 
-        hourly_prices = instance_pricing[instance_type]
-        daily_cost = np.sum(hourly_prices)  # cost for 24 hours
-        results[instance_type] = {}
+            # Fractional hour cost: use the price at the next hour (cyclic)
+            fractional_indices = (starts + hours) % 24
+            fractional_costs = prices[:, fractional_indices] * (effective_remainders[rows] / 3600)[:, None]
 
-        # Process each allowed parallelization factor.
-        for p in parallelization:
-            # Effective duration per instance when using p instances.
-            effective_duration = duration / p  # may be fractional seconds
+            # Total cost for each starting hour
+            cost_per_instance[rows] = (full_days[rows] * daily_costs[rows])[:, None] + extra_costs + fractional_costs
 
-            # Compute effective full hours and remainder for the effective duration.
-            effective_full_hours = int(effective_duration // 3600)
-            effective_remainder = effective_duration - effective_full_hours * 3600
+        slot_costs[p] = (cost_per_instance, effective_durations)
 
-            # Compute number of full days and extra full hours for the effective duration.
-            full_days, extra_hours = divmod(effective_full_hours, 24)
+    return priced_instances, slot_costs
 
-            # For each starting hour (0 to 23), compute cost for the extra hours beyond full days.
-            starts = np.arange(24)
-            if extra_hours > 0:
-                # For each start, sum the prices over extra_hours (cyclically).
-                indices = (starts[:, None] + np.arange(extra_hours)) % 24
-                extra_costs = np.sum(hourly_prices[indices], axis=1)
-            else:
-                extra_costs = np.zeros(24)
 
-            # Fractional hour cost: use the price at the next hour (cyclic)
-            fractional_indices = (starts + extra_hours) % 24
-            fractional_costs = hourly_prices[fractional_indices] * (effective_remainder / 3600)
+def find_cheapest_slot_vectorized(instance_list, pricing_data, region, parallelization):
+    """
+    Finds the cheapest cost slot for each instance using vectorized operations based on pricing data and parallelization factors.
 
-            # Total cost for each starting hour (for one instance)
-            cost_per_instance = full_days * daily_cost + extra_costs + fractional_costs
+    For each instance (represented as [instance_type, duration_in_seconds]), the function:
+      - Builds a NumPy array of hourly prices for the given region.
+      - For each allowed parallelization factor, calculates the effective duration per instance and computes the cost
+        for each possible starting hour (0-23) considering full days, extra full hours, and fractional hours
+        (see slot_costs_vectorized).
+      - Determines the starting hour that yields the lowest cost per instance.
 
-            # Find the best starting hour (lowest cost per instance)
-            best_index = int(np.argmin(cost_per_instance))
-            best_instance_cost = float(cost_per_instance[best_index])
+    Performance Improvements:
+      - The prices of all instances are stacked into one (instances x 24) matrix.
+      - Per parallelization factor, instances with the same number of extra hours share one gather and
+        one sum, so the cost of hundreds of instance types is computed with at most 24 array operations.
 
-            results[instance_type][p] = (region, best_index, best_instance_cost, effective_duration)
+    Parameters:
+      - instance_list: A list of instances, each represented as [instance_type, duration_in_seconds].
+      - pricing_data: A list of pricing records containing instance_type, region, hour, and spot_price.
+      - region: The region in which the pricing data should be considered.
+      - parallelization: A list of allowed parallelization factors (integers).
+
+    Returns:
+      A dictionary mapping each instance type to another dictionary that maps each parallelization factor to a tuple:
+        (region, best_start_hour, total_cost, effective_duration)
+    """
+    priced_instances, slot_costs = slot_costs_vectorized(instance_list, pricing_data, region, parallelization)
+    results = {instance_type: {} for instance_type, _ in priced_instances}
+
+    for p, (cost_per_instance, effective_durations) in slot_costs.items():
+        # Find the best starting hour (lowest cost per instance)
+        best_indices = np.argmin(cost_per_instance, axis=1)
+        for row, (instance_type, _) in enumerate(priced_instances):
+            best_index = int(best_indices[row])
+            results[instance_type][p] = (region, best_index, float(cost_per_instance[row, best_index]),
+                                         float(effective_durations[row]))
 
     return results
 
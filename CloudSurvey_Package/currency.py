@@ -0,0 +1,47 @@
+import os
+
+# Currency of the prices stored by the ingestion scripts:
+#   - Azure_fetch_spot_prices.py and storage_prices_fetch_azure.py request EUR from the Azure retail API,
+#   - AWS_fetch_spot_prices.py and storage_prices_fetch_aws.py store the USD prices of AWS.
+PROVIDER_CURRENCY = {
+    "AWS": "USD",
+    "Azure": "EUR",
+}
+
+BASE_CURRENCY = "EUR"
+DEFAULT_USD_TO_EUR = 0.92
+
+
+def exchange_rate(currency, base_currency=BASE_CURRENCY):
+    """
+    Returns the factor that converts an amount in currency into base_currency.
+    The USD/EUR rate is read from the environment variable USD_TO_EUR.
+    """
+    if currency == base_currency:
+        return 1.0
+    usd_to_eur = float(os.getenv("USD_TO_EUR", DEFAULT_USD_TO_EUR))
+    if (currency, base_currency) == ("USD", "EUR"):
+        return usd_to_eur
+    if (currency, base_currency) == ("EUR", "USD"):
+        return 1 / usd_to_eur
+    raise ValueError(f"No exchange rate from {currency} to {base_currency}")
+
+
+def convert_cost_maps(provider, compute_cost_map, storage_cost_map, transfer_cost_map, base_currency=BASE_CURRENCY):
+    """
+        Converts the cost maps of one provider into base_currency.
+
+        Returns:
+          compute_cost_map, storage_cost_map, transfer_cost_map with all costs in base_currency.
+          The maps are returned unchanged if the provider already prices in base_currency.
+    """
+    rate = exchange_rate(PROVIDER_CURRENCY[provider], base_currency)
+    if rate == 1.0:
+        return compute_cost_map, storage_cost_map, transfer_cost_map
+
+    compute_cost_map = {
+        key: (cost * rate, effective_duration) for key, (cost, effective_duration) in compute_cost_map.items()
+    }
+    storage_cost_map = {key: cost * rate for key, cost in storage_cost_map.items()}
+    transfer_cost_map = {key: cost * rate for key, cost in transfer_cost_map.items()}
+    return compute_cost_map, storage_cost_map, transfer_cost_map
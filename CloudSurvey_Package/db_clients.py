@@ -0,0 +1,127 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+DEFAULT_MAX_POOL_SIZE = 50
+DEFAULT_MIN_POOL_SIZE = 0
+DEFAULT_MAX_IDLE_TIME_MS = 60000
+DEFAULT_SERVER_SELECTION_TIMEOUT_MS = 5000
+
+_clients = {}  # uri -> MongoClient
+_names = {}    # name -> uri
+_lock = threading.Lock()
+
+
+def pool_options():
+    """
+        Reads the connection pool settings from the environment.
+
+        Where:
+          - MONGODB_MAX_POOL_SIZE: Maximum number of connections per server (default 50).
+          - MONGODB_MIN_POOL_SIZE: Connections kept open while idle (default 0).
+          - MONGODB_MAX_IDLE_TIME_MS: Idle connections are closed after this time (default 60000).
+          - MONGODB_SERVER_SELECTION_TIMEOUT_MS: How long an operation waits for a server (default 5000).
+
+        Returns:
+          A dictionary of keyword arguments for MongoClient.
+    """
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", DEFAULT_MAX_POOL_SIZE)),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", DEFAULT_MIN_POOL_SIZE)),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", DEFAULT_MAX_IDLE_TIME_MS)),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+                                                  DEFAULT_SERVER_SELECTION_TIMEOUT_MS)),
+    }
+
+
+def get_client(uri, name=None):
+    """
+        Returns the shared, pooled MongoClient for a connection string.
+
+        Where:
+          - uri: The MongoDB connection string.
+          - name: Optional name under which the client is reported by health_check.
+
+        One client (with its own connection pool) exists per URI and process. MongoClient is
+        thread-safe, so the same client is used by all requests.
+    """
+    client = _clients.get(uri)
+    if client is None:
+        with _lock:
+            client = _clients.get(uri)
+            if client is None:
+                client = MongoClient(uri, **pool_options())
+                _clients[uri] = client
+    if name is not None:
+        _names[name] = uri
+    return client
+
+
+def get_compute_client():
+    """
+    Client for the spot price databases (MONGODB_URI).
+    """
+    return get_client(os.getenv('MONGODB_URI'), name="compute")
+
+
+def get_storage_client():
+    """
+    Client for the storage and transfer price databases (MONGODB_URI2).
+    """
+    return get_client(os.getenv('MONGODB_URI2'), name="storage")
+
+
+def health_check():
+    """
+        Pings every named client.
+
+        Returns:
+          A dictionary name -> {"ok": bool, "latency_ms": float, "error": str or None}.
+    """
+    results = {}
+    for name, uri in list(_names.items()):
+        client = _clients.get(uri)
+        if client is None:
+            continue
+        start = time.perf_counter()
+        try:
+            client.admin.command("ping")
+            results[name] = {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "error": None}
+        except Exception as e:
+            results[name] = {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+    return results
+
+
+def close_all():
+    """
+    Closes all pooled clients. Called automatically at interpreter exit.
+    """
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logging.error(f"Error closing MongoDB client: {e}")
+        _clients.clear()
+        _names.clear()
+
+
+def reset_after_fork():
+    """
+    Forgets the clients inherited from the parent process without closing them, their sockets
+    still belong to the parent. Called in forked worker processes, which then open their own pools.
+    """
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+    _names.clear()
+
+
+atexit.register(close_all)
@@ -1,5 +1,9 @@
+from datetime import datetime, timezone
 from CloudSurvey_Package.math_operations import calculate_konfidenzintervall
 
+INGESTION_DB = "ingestion_meta"
+INGESTION_COLLECTION = "batches"
+
 def get_database(db_name, client):
     return client[db_name]
 
@@ -203,7 +207,7 @@ def fetch_transfer_prices(provider, fromRegion, toRegion, client):
             print(f"Error querying the database: {e}")
             return []
 
-def get_mean_spot_price(client, instance_types, provider):
+def get_mean_spot_price(client, instance_types, provider, with_range=False):
     """
         Retrieves the mean spot price per hour for a list of instance types for a given provider.
         Delegates the calculation to provider-specific functions based on the provider value.
@@ -212,6 +216,8 @@ def get_mean_spot_price(client, instance_types, provider):
           - client: The MongoDB client used for the connection.
           - instance_types: A list of instance types for which average prices should be calculated.
           - provider: The provider, e.g., "AWS" or "Azure".
+          - with_range: Also return the lowest and highest spot price per hour ("min_" and "max_"
+            prefixed to the name of the mean price field). The mean price is the same either way.
 
         Returns:
           A list of documents containing the average spot price per hour.
@@ -219,15 +225,35 @@ def get_mean_spot_price(client, instance_types, provider):
     if provider == "AWS":
         db = get_database("aws_spot_prices_db", client)
         collection_name = "aws_spot_prices"
-        prices_per_hour = get_mean_spot_prices_aws(db, collection_name, instance_types)
+        prices_per_hour = get_mean_spot_prices_aws(db, collection_name, instance_types, with_range)
     else:
         db = get_database("AzureSpotPricesDB", client)
         collection_name = "SpotPrices"
-        prices_per_hour = get_mean_spot_prices_azure(db, collection_name, instance_types)
+        prices_per_hour = get_mean_spot_prices_azure(db, collection_name, instance_types, with_range)
     return prices_per_hour
 
 
-def get_mean_spot_prices_aws(db, collection_name, instance_types):
+def get_spot_instance_types(client, provider):
+    """
+        Retrieves all instance types that have spot prices for a given provider.
+
+        Where:
+          - client: The MongoDB client used for the connection.
+          - provider: The provider, e.g., "AWS" or "Azure".
+
+        Returns:
+          A sorted list of instance type names.
+    """
+    if provider == "AWS":
+        db = get_database("aws_spot_prices_db", client)
+        collection_name = "aws_spot_prices"
+    else:
+        db = get_database("AzureSpotPricesDB", client)
+        collection_name = "SpotPrices"
+    return sorted(db[collection_name].distinct("instance_type"))
+
+
+def get_mean_spot_prices_aws(db, collection_name, instance_types, with_range=False):
     """
         Calculates the average AWS spot prices grouped by instance type, hour, and region.
         Uses an aggregation pipeline to compute the average spot price in Euro.
@@ -236,6 +262,7 @@ def get_mean_spot_prices_aws(db, collection_name, instance_types):
           - db: The database containing AWS spot prices.
           - collection_name: The name of the collection storing AWS spot prices.
           - instance_types: A list of instance types to be included in the aggregation.
+          - with_range: Also compute the lowest and highest price (min_spot_price_eur, max_spot_price_eur).
 
         Returns:
           A list of documents containing instance type, hour, region, and the computed average price.
@@ -272,9 +299,15 @@ def get_mean_spot_prices_aws(db, collection_name, instance_types):
         }
     ]
 
+    if with_range:
+        pipeline[1]["$group"].update({"minSpotPriceEur": {"$min": "$spot_price_eur"},
+                                      "maxSpotPriceEur": {"$max": "$spot_price_eur"}})
+        pipeline[2]["$project"].update({"min_spot_price_eur": "$minSpotPriceEur",
+                                        "max_spot_price_eur": "$maxSpotPriceEur"})
+
     return list(collection.aggregate(pipeline))
 
-def get_mean_spot_prices_azure(db, collection_name, instance_types):
+def get_mean_spot_prices_azure(db, collection_name, instance_types, with_range=False):
     """
         Calculates the average Azure spot prices grouped by instance type, hour, and region.
         Uses an aggregation pipeline with rounding applied to the computed average price.
@@ -283,6 +316,7 @@ def get_mean_spot_prices_azure(db, collection_name, instance_types):
           - db: The database containing Azure spot prices.
           - collection_name: The name of the collection where Azure spot prices are stored.
           - instance_types: A list of instance types to be included in the aggregation.
+          - with_range: Also compute the lowest and highest price (min_spot_price, max_spot_price).
 
         Returns:
           A list of documents containing the instance type, hour, region, and the rounded average price.
@@ -319,6 +353,48 @@ def get_mean_spot_prices_azure(db, collection_name, instance_types):
         }
     ]
 
+    if with_range:
+        pipeline[1]["$group"].update({"minSpotPrice": {"$min": "$spot_price"},
+                                      "maxSpotPrice": {"$max": "$spot_price"}})
+        pipeline[2]["$project"].update({"min_spot_price": "$minSpotPrice",
+                                        "max_spot_price": "$maxSpotPrice"})
+
     return list(collection.aggregate(pipeline))
 
+def record_ingestion_batch(client, source, record_count):
+    """
+        Marks the end of an ingestion run by writing a batch document.
+        Services compare the latest batch id to decide whether cached results are still valid.
+
+        Where:
+          - client: The MongoDB client of the database the prices were written to.
+          - source: Name of the ingested data, e.g. "aws_spot_prices".
+          - record_count: Number of price documents written in this run.
+
+        Returns:
+          The id of the new batch as a string.
+    """
+    db = get_database(INGESTION_DB, client)
+    batch = {
+        "source": source,
+        "records": record_count,
+        "created_at": datetime.now(timezone.utc)
+    }
+    result = db[INGESTION_COLLECTION].insert_one(batch)
+    return str(result.inserted_id)
+
+def get_latest_ingestion_batch(client):
+    """
+        Retrieves the id of the most recent ingestion batch.
+
+        Where:
+          - client: The MongoDB client used for the connection.
 
+        Returns:
+          The batch id as a string, or None if no batch has been recorded yet.
+    """
+    db = get_database(INGESTION_DB, client)
+    doc = db[INGESTION_COLLECTION].find_one({}, sort=[("created_at", -1)])
+    if doc is None:
+        return None
+    return str(doc["_id"])
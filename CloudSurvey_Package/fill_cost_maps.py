@@ -132,7 +132,77 @@ def fill_compute_cost_map_all(provider, instance_list, konfidenzgrad, client, pa
     return compute_cost_map
 
 
-def fill_compute_cost_map_all_performance(provider, instance_list, client, parallelization):
+def iter_compute_cost_map_regions(provider, instance_list, client, parallelization, pricing_list=None):
+    """
+    Builds the compute cost map region by region.
+
+    Yields:
+      (region, region_cost_map) where region_cost_map has the same keys and values as
+      fill_compute_cost_map_all_performance, restricted to that region. Regions without
+      any priced instance yield an empty map.
+
+    If pricing_list (the result of get_mean_spot_price) is given, it is used instead of
+    querying the database.
+    """
+    if provider == "Azure":
+        regions = constants.azure_regions
+    else:
+        regions = constants.aws_regions
+
+    if pricing_list is None:
+        instance_types = [item[0] for item in instance_list]
+        pricing_list = get_mean_spot_price(client, instance_types, provider)
+
+    # Group the prices by region once instead of scanning the whole list for every region
+    pricing_by_region = {}
+    for entry in pricing_list:
+        pricing_by_region.setdefault(entry['region'], []).append(entry)
+
+    for region in regions:
+        best_slots = find_cheapest_slot_vectorized(instance_list, pricing_by_region.get(region, []), region,
+                                                   parallelization)
+
+        region_cost_map = {}
+        for instance_type, parallel_results in best_slots.items():
+            for factor, (reg, start_time, best_cost, effective_duration) in parallel_results.items():
+                dict_key = (reg, instance_type, start_time, factor)
+                region_cost_map[dict_key] = (best_cost, effective_duration)
+
+        yield region, region_cost_map
+
+
+def index_pricing_by_region_instance(provider, instance_list, pricing_list):
+    """
+    Groups the mean spot prices (the result of get_mean_spot_price) by (region, instance_type),
+    for the regions of the provider and the instance types of instance_list.
+
+    Returns:
+      A dictionary (region, instance_type) -> [lowest hourly price, pricing entries]. Pairs without a price
+      for every hour are kept, find_cheapest_slot_vectorized skips them.
+    """
+    if provider == "Azure":
+        regions = constants.azure_regions
+    else:
+        regions = constants.aws_regions
+    instance_types = {item[0] for item in instance_list}
+
+    pricing_index = {}
+    for entry in pricing_list:
+        price = entry['spot_price'] if 'spot_price' in entry else entry['spot_price_eur']  # AWS aggregation
+        key = (entry['region'], entry['instance_type'])
+        group = pricing_index.get(key)
+        if group is None:
+            pricing_index[key] = [price, [entry]]
+        else:
+            group[1].append(entry)
+            if price < group[0]:
+                group[0] = price
+
+    return {(region, instance_type): group for (region, instance_type), group in pricing_index.items()
+            if region in regions and instance_type in instance_types}
+
+
+def fill_compute_cost_map_all_performance(provider, instance_list, client, parallelization, pricing_list=None):
     """
     Builds a compute cost map dictionary where each key is (region, instance_type, start_time, factor)
     and the corresponding value is a tuple (best_cost, effective_duration) derived by selecting
@@ -151,30 +221,21 @@ def fill_compute_cost_map_all_performance(provider, instance_list, client, paral
                      + transfer_cost_map[r1, r2]
                      + compute_cost_map[r2, i, s, p][0][1]
       Exactly one tuple is chosen (x=1), to minimize total cost.
+
+    If pricing_list (the result of get_mean_spot_price) is given, it is used instead of
+    querying the database, so several jobs can share one aggregation.
     """
     compute_cost_map = {}
 
-    if provider == "Azure":
-        regions = constants.azure_regions
-    else:
-        regions = constants.aws_regions
-
-    instance_types = [item[0] for item in instance_list]
-    pricing_list = get_mean_spot_price(client, instance_types, provider)
-
-    for region in regions:
-        best_slots = (find_cheapest_slot_vectorized(instance_list, pricing_list, region, parallelization))
-
-        for instance_type, parallel_results in best_slots.items():
-            for factor, (reg, start_time, best_cost, effective_duration) in parallel_results.items():
-                dict_key = (reg, instance_type, start_time, factor)
-                compute_cost_map[dict_key] = (best_cost, effective_duration)
+    for region, region_cost_map in iter_compute_cost_map_regions(provider, instance_list, client, parallelization,
+                                                                 pricing_list=pricing_list):
+        compute_cost_map.update(region_cost_map)
 
     return compute_cost_map
 
 
 
-def fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client, parallelization):
+def fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client, parallelization, storage_price_list=None):
     """
     Creates a dictionary mapping each region (and instance/parallel factor) to its respective storage cost.
     The cost is calculated based on the storage price, volume, and usage duration (adjusted for parallelization).
@@ -192,21 +253,27 @@ def fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client,
                      + transfer_cost_map[r1, r2]
                      + compute_cost_map[r2, i, s, p][0][1]
       Exactly one tuple is chosen (x=1), to minimize total cost.
+
+    If storage_price_list (the result of get_storage_cost) is given, the database is not queried.
     """
 
-    storage_price_list = get_storage_cost(provider, volume, premium, lrs, client)
+    if storage_price_list is None:
+        storage_price_list = get_storage_cost(provider, volume, premium, lrs, client)
 
     storage_cost_map = {}
 
+    # Hours per instance and factor do not depend on the region, compute them once
+    instance_hours = [
+        (instance[0], factor, second_to_hour(int(instance[1])) / factor)
+        for instance in instance_list
+        for factor in parallelization
+    ]
+
     for price_info in storage_price_list:
-        for instance in instance_list:
-            for factor in parallelization:
-                region_name = price_info["region"]
-                instance_name = instance[0]
-                hour_duration = second_to_hour(int(instance[1]))
-                hour_duration_parallelization = hour_duration / factor
-                cost = (price_info["price"] / 730) * hour_duration_parallelization
-                storage_cost_map[region_name, instance_name, factor] = cost
+        region_name = price_info["region"]
+        hourly_price = price_info["price"] / 730
+        for instance_name, factor, hour_duration_parallelization in instance_hours:
+            storage_cost_map[region_name, instance_name, factor] = hourly_price * hour_duration_parallelization
 
     return storage_cost_map
 
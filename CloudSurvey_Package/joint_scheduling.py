@@ -0,0 +1,348 @@
+import heapq
+import math
+import os
+import time
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from CloudSurvey_Package.computing_prices import slot_costs_vectorized
+from CloudSurvey_Package.optimization_problem import chain_breakdown
+from CloudSurvey_Package.solvers import solve_binary_program
+from CloudSurvey_Package.timing import timed_phase
+
+OPTION_COLUMNS = ("region", "instance", "start", "factor", "compute_cost", "duration")
+DEFAULT_MAX_STORAGE_ASSIGNMENTS = 100  # storage region assignments solved at most per joint schedule
+
+
+def job_start_options(instance_list, pricing_by_region, parallelization, deadline_hours=None):
+    """
+    Enumerates the start options (r2, i, s, p) of one job for the joint schedule.
+
+    Where:
+      - s is a start hour 0..23 of the schedule, compute_cost the cost per instance of that start hour
+        (see slot_costs_vectorized) and duration the effective duration in seconds.
+      - Options that end after deadline_hours are dropped.
+      - Per (r2, s, p) only the instances on the cost / duration Pareto front are kept: an instance that is not
+        cheaper than a faster or equally fast one holds the same number of instances longer and is dominated.
+
+    Returns:
+      A dictionary of equally long NumPy arrays, one per name of OPTION_COLUMNS.
+    """
+    columns = {name: [] for name in OPTION_COLUMNS}
+    starts = np.arange(24)
+    for region, pricing in pricing_by_region.items():
+        priced_instances, slot_costs = slot_costs_vectorized(instance_list, pricing, region, parallelization)
+        instance_names = np.array([instance_type for instance_type, _ in priced_instances], dtype=object)
+        for p, (cost_per_instance, effective_durations) in slot_costs.items():
+            hours = effective_durations / 3600
+            costs = cost_per_instance.T.copy()  # start hours x instances
+            if deadline_hours is not None:
+                costs[starts[:, None] + hours[None, :] > deadline_hours] = np.inf
+
+            # Per start hour: fastest instance first (the cheaper one on equal durations), an instance is kept
+            # if it is cheaper than every faster one
+            order = np.lexsort((costs, np.broadcast_to(hours, costs.shape)))
+            sorted_costs = np.take_along_axis(costs, order, axis=1)
+            cheapest_faster = np.minimum.accumulate(sorted_costs, axis=1)
+            cheapest_faster = np.hstack([np.full((24, 1), np.inf), cheapest_faster[:, :-1]])
+            start_index, position = np.nonzero(sorted_costs < cheapest_faster)
+            rows = order[start_index, position]
+
+            columns["region"].append(np.full(len(rows), region, dtype=object))
+            columns["instance"].append(instance_names[rows])
+            columns["start"].append(start_index)
+            columns["factor"].append(np.full(len(rows), p))
+            columns["compute_cost"].append(cost_per_instance[rows, start_index])
+            columns["duration"].append(effective_durations[rows])
+
+    return {
+        name: np.concatenate(values) if values else np.empty(0, dtype=object if name in ("region", "instance") else float)
+        for name, values in columns.items()
+    }
+
+
+def storage_assignments(group_bounds):
+    """
+    Enumerates the storage region assignments of the storage groups in increasing order of their bound.
+
+    Where:
+      - group_bounds: one array per group with a lower bound of the cost of its jobs per storage region r1
+        (inf if the group cannot use r1). The bound of an assignment is the sum of the bounds of its regions.
+
+    Yields:
+      (bound, assignment) with the index of r1 per group. The assignments are enumerated lazily with a heap
+      over the successors of the ones yielded so far, so only the visited part of the R1^groups space is built.
+    """
+    orders = [np.argsort(bounds, kind="stable") for bounds in group_bounds]
+    sorted_bounds = [bounds[order] for bounds, order in zip(group_bounds, orders)]
+
+    def bound_of(position):
+        return float(sum(bounds[index] for bounds, index in zip(sorted_bounds, position)))
+
+    start = (0,) * len(group_bounds)
+    heap = [(bound_of(start), start)]
+    seen = {start}
+    while heap:
+        bound, position = heapq.heappop(heap)
+        if not math.isfinite(bound):
+            return
+        yield bound, tuple(int(order[index]) for order, index in zip(orders, position))
+        for group, index in enumerate(position):
+            if index + 1 < len(sorted_bounds[group]):
+                successor = position[:group] + (index + 1,) + position[group + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    heapq.heappush(heap, (bound_of(successor), successor))
+
+
+def schedule_jobs(jobs, transfer_cost_map, region_limits=None, default_region_limit=None, time_limit=None,
+                  solver=None, max_storage_assignments=None, timer=None):
+    """
+    Schedules several jobs jointly, picking one (r1, r2, i, s, p) chain per job.
+
+    Where:
+      - jobs: list of dictionaries with instance_list, parallelization, pricing_list (get_mean_spot_price),
+        storage_cost_map (fill_storage_cost_map of the job) and optionally deadline_hours and storage_group.
+      - Capacity: at every hour of the schedule the instances (p per job) running in region r2 must not exceed
+        region_limits[r2] (default_region_limit for regions not listed, None = unlimited). A job starting at s
+        occupies its instances during the hours s .. s + ceil(duration) - 1.
+      - Deadlines: a job with deadline_hours ends by then (hours after hour 0 of the schedule).
+      - Shared storage: jobs with the same storage_group read the same data, which is placed in one storage
+        region r1 for all of them. Each job pays the storage of its volume for its run time and the transfer
+        from r1 to its compute region, as in the single-job model. Jobs without a storage_group use their
+        cheapest r1.
+      - time_limit: optional limit of the solver in seconds, the best schedule found is returned with
+        status "TimeLimit".
+      - max_storage_assignments: at most this many storage assignments are solved (default
+        JOINT_MAX_STORAGE_ASSIGNMENTS, 100). If the last one does not prove the best schedule optimal, it is
+        returned with status "TimeLimit".
+
+    For a given r1 per storage group the problem is a sparse binary program, built once with scipy.sparse
+    and solved with HiGHS or CBC (solver, see solve_binary_program): one binary per start option of a job (see
+    job_start_options), exactly one per job, and one row per limited region and hour. Its size grows with
+    the number of start options, not with their product over the jobs.
+    The storage regions of the groups are enumerated in increasing order of the cost the jobs would have
+    without region limits (see storage_assignments, like anytime_search for a single job). That cost is a lower
+    bound, once it is not below the cheapest schedule found, that schedule is optimal. Usually the first
+    assignment is already optimal.
+    With storage groups, the model in which every job uses its own cheapest r1 is solved first. It relaxes every
+    assignment: if it is infeasible, so are all of them and the search stops right away, otherwise its objective is
+    a lower bound of every schedule.
+
+    If a PhaseTimer is given, "joint_options", "joint_model_construction" and "joint_solve" are timed (the
+    latter includes "solver_setup" and "solve" of all storage assignments) and the number of options,
+    constraints, non-zeros and evaluated storage assignments is recorded.
+
+    Returns:
+      A response dictionary with status, objective, the storage region of every group, the peak number of
+      instances per limited region and per job the chain_breakdown of its chain with start_hour and end_hour.
+    """
+    if not jobs:
+        raise ValueError("No jobs to schedule")
+    region_limits = region_limits or {}
+    if max_storage_assignments is None:
+        max_storage_assignments = int(os.getenv("JOINT_MAX_STORAGE_ASSIGNMENTS", DEFAULT_MAX_STORAGE_ASSIGNMENTS))
+    deadline = time.perf_counter() + time_limit if time_limit else None
+
+    with timed_phase(timer, "joint_options"):
+        options = []
+        grouped_pricing = {}  # id(pricing_list) -> prices grouped by region, jobs usually share one pricing list
+        for job in jobs:
+            pricing_by_region = grouped_pricing.get(id(job["pricing_list"]))
+            if pricing_by_region is None:
+                pricing_by_region = grouped_pricing[id(job["pricing_list"])] = {}
+                for entry in job["pricing_list"]:
+                    pricing_by_region.setdefault(entry["region"], []).append(entry)
+            options.append(job_start_options(job["instance_list"], pricing_by_region, job["parallelization"],
+                                             job.get("deadline_hours")))
+
+    with timed_phase(timer, "joint_model_construction"):
+        storage_regions = list(dict.fromkeys(r1 for job in jobs for r1, _, _ in job["storage_cost_map"]))
+        storage_region_index = {r1: index for index, r1 in enumerate(storage_regions)}
+        compute_regions = list(dict.fromkeys(r2 for _, r2 in transfer_cost_map))
+        compute_region_index = {r2: index for index, r2 in enumerate(compute_regions)}
+        transfer = np.full((len(storage_regions), len(compute_regions)), np.inf)
+        for (r1, r2), transfer_c in transfer_cost_map.items():
+            if r1 in storage_region_index and transfer_c is not None:
+                transfer[storage_region_index[r1], compute_region_index[r2]] = transfer_c
+
+        groups = list(dict.fromkeys(str(job["storage_group"]) for job in jobs if job.get("storage_group") is not None))
+        job_groups = [-1 if job.get("storage_group") is None else groups.index(str(job["storage_group"]))
+                      for job in jobs]
+        limits = np.array([region_limits.get(r2, default_region_limit) for r2 in compute_regions], dtype=float)
+
+        # Per option: the cost with the cheapest r1 and, for grouped jobs, the extra cost of every other r1
+        base_costs, extra_costs, best_storage, x_offsets = [], [], [], []
+        group_bounds = [np.zeros(len(storage_regions)) for _ in groups]
+        n_x = 0
+        for job_index, (job, option) in enumerate(zip(jobs, options)):
+            region_rows = np.array([compute_region_index.get(r2, -1) for r2 in option["region"]], dtype=np.intp)
+            pairs = list(dict.fromkeys(zip(option["instance"], option["factor"])))
+            pair_index = {pair: index for index, pair in enumerate(pairs)}
+            storage = np.full((len(pairs), len(storage_regions)), np.inf)
+            for (r1, i, p), storage_cost in job["storage_cost_map"].items():
+                if (i, p) in pair_index:
+                    storage[pair_index[i, p], storage_region_index[r1]] = storage_cost
+            option_pairs = np.array([pair_index[pair] for pair in zip(option["instance"], option["factor"])],
+                                    dtype=np.intp)
+            costs = storage[option_pairs] + transfer[:, region_rows].T * option["factor"][:, None]
+            costs[region_rows < 0] = np.inf
+
+            best = np.argmin(costs, axis=1) if len(costs) else np.empty(0, dtype=np.intp)
+            fixed = costs[np.arange(len(costs)), best]
+            compute_costs = option["factor"] * option["compute_cost"]
+            objective = fixed + compute_costs
+            keep = np.isfinite(objective)
+            if not keep.any():
+                raise RuntimeError(f"Job {job_index} has no priced start option that meets its deadline.")
+
+            # Options in regions without a limit do not compete with other jobs: only the cheapest of them (per r1
+            # for grouped jobs) and options in limited regions that are cheaper than it can be part of the optimum
+            grouped = job_groups[job_index] >= 0
+            totals = costs + compute_costs[:, None] if grouped else objective[:, None]
+            limited = ~np.isnan(limits[np.maximum(region_rows, 0)])
+            unlimited_totals = np.where(limited[:, None], np.inf, totals)
+            cheapest_unlimited = unlimited_totals.min(axis=0)
+            reachable = np.isfinite(cheapest_unlimited)
+            if reachable.any():
+                keep &= limited & (totals < cheapest_unlimited).any(axis=1)
+                keep[np.argmin(unlimited_totals, axis=0)[reachable]] = True
+
+            options[job_index] = {name: values[keep] for name, values in option.items()}
+            base_costs.append(objective[keep])
+            extra_costs.append(costs[keep] - fixed[keep][:, None] if grouped else None)
+            best_storage.append(best[keep])
+            x_offsets.append(n_x)
+            n_x += int(keep.sum())
+            if grouped:
+                # Without region limits every job of the group takes its cheapest option for the r1 of the group
+                group_bounds[job_groups[job_index]] += totals[keep].min(axis=0)
+
+        rows, cols, data, row_lb, row_ub = [], [], [], [], []
+        n_rows = 0
+
+        def add_rows(row_ids, col_ids, values, lb, ub):
+            nonlocal n_rows
+            rows.append(np.asarray(row_ids, dtype=np.intp) + n_rows)
+            cols.append(np.asarray(col_ids, dtype=np.intp))
+            data.append(np.asarray(values, dtype=float))
+            row_lb.append(np.asarray(lb, dtype=float))
+            row_ub.append(np.asarray(ub, dtype=float))
+            n_rows += len(row_lb[-1])
+
+        # Exactly one start option per job
+        counts = [len(costs) for costs in base_costs]
+        add_rows(np.repeat(np.arange(len(jobs)), counts), np.arange(n_x), np.ones(n_x),
+                 np.ones(len(jobs)), np.ones(len(jobs)))
+
+        # Instances running per limited region and hour
+        option_regions = np.concatenate([[compute_region_index[r2] for r2 in option["region"]] for option in options])
+        option_starts = np.concatenate([option["start"] for option in options]).astype(np.intp)
+        option_hours = np.ceil(np.concatenate([option["duration"] for option in options]) / 3600).astype(np.intp)
+        option_factors = np.concatenate([option["factor"] for option in options])
+        limited = np.nonzero(~np.isnan(limits[option_regions]))[0]
+        if len(limited):
+            lengths = np.maximum(option_hours[limited], 1)
+            occupied = np.repeat(limited, lengths)
+            hours = (np.repeat(option_starts[limited], lengths)
+                     + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+            horizon = int(hours.max()) + 1
+            slots, slot_rows = np.unique(option_regions[occupied] * horizon + hours, return_inverse=True)
+            add_rows(slot_rows, occupied, option_factors[occupied], np.full(len(slots), -np.inf),
+                     limits[slots // horizon])
+
+        matrix = coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                            shape=(n_rows, n_x)).tocsr()
+        row_lb, row_ub = np.concatenate(row_lb), np.concatenate(row_ub)
+
+    def remaining_time():
+        return max(deadline - time.perf_counter(), 0.0) if deadline is not None else None
+
+    with timed_phase(timer, "joint_solve"):
+        incumbent = None  # (objective, x, assignment)
+        optimal = True
+        evaluated = 0
+
+        # Every job with its cheapest r1: relaxes the storage groups
+        relaxation_bound = -np.inf
+        if groups:
+            x, status = solve_binary_program(np.concatenate(base_costs), matrix, row_lb, row_ub, solver=solver,
+                                             relax_first=True, timer=timer, time_limit=remaining_time())
+            if status == "Infeasible":
+                raise RuntimeError("No joint schedule meets the deadlines and region limits.")
+            if status == "Optimal":
+                relaxation_bound = float(np.concatenate(base_costs) @ x)
+
+        for bound, assignment in storage_assignments(group_bounds):
+            # Slightly lowered, so rounding never makes a bound exceed the cost of its schedule
+            if incumbent is not None and max(bound, relaxation_bound) * (1 - 1e-12) >= incumbent[0]:
+                break
+            if evaluated >= max_storage_assignments or (deadline is not None and remaining_time() <= 0):
+                optimal = False
+                break
+            remaining = remaining_time()
+
+            objective = np.concatenate(base_costs)
+            upper_bounds = np.ones(n_x)
+            for job_index, group in enumerate(job_groups):
+                if group >= 0:
+                    columns = slice(x_offsets[job_index], x_offsets[job_index] + len(base_costs[job_index]))
+                    extra = extra_costs[job_index][:, assignment[group]]
+                    # Options without storage or transfer prices for the r1 of the group are excluded
+                    upper_bounds[columns] = np.isfinite(extra)
+                    objective[columns] += np.where(np.isfinite(extra), extra, 0.0)
+
+            # The LP relaxation is usually integral here, then HiGHS' branch and bound is not needed
+            x, status = solve_binary_program(objective, matrix, row_lb, row_ub, upper_bounds=upper_bounds,
+                                             solver=solver, relax_first=True, timer=timer,
+                                             time_limit=remaining)
+            evaluated += 1
+            optimal &= status in ("Optimal", "Infeasible")
+            if x is not None and (incumbent is None or objective @ x < incumbent[0]):
+                incumbent = (objective @ x, x, assignment)
+
+    if timer is not None:
+        timer.record("joint_options", n_x)
+        timer.record("joint_constraints", n_rows)
+        timer.record("joint_nonzeros", matrix.nnz)
+        timer.record("joint_storage_assignments", evaluated)
+
+    if incumbent is None:
+        if not optimal:
+            raise RuntimeError(f"No joint schedule found within the time limit or {max_storage_assignments} "
+                               f"storage assignments.")
+        raise RuntimeError("No joint schedule meets the deadlines and region limits.")
+    _, x, assignment = incumbent
+
+    chosen_regions = {group: storage_regions[assignment[index]] for index, group in enumerate(groups)}
+    schedule = []
+    usage = {}
+    for job_index, (job, option) in enumerate(zip(jobs, options)):
+        row = int(np.argmax(x[x_offsets[job_index]:x_offsets[job_index] + len(base_costs[job_index])]))
+        r2, i, s, p = option["region"][row], option["instance"][row], int(option["start"][row]), int(option["factor"][row])
+        if job_groups[job_index] >= 0:
+            r1 = storage_regions[assignment[job_groups[job_index]]]
+        else:
+            r1 = storage_regions[int(best_storage[job_index][row])]
+        duration = float(option["duration"][row])
+        chain = chain_breakdown((r1, r2, i, s, p), job["storage_cost_map"][r1, i, p], transfer_cost_map[r1, r2],
+                                (float(option["compute_cost"][row]), duration))
+        chain.update({"job": job_index, "storage_group": job.get("storage_group"), "start_hour": s,
+                      "end_hour": s + duration / 3600})
+        schedule.append(chain)
+
+        if not math.isnan(limits[compute_region_index[r2]]):
+            for hour in range(s, s + max(math.ceil(duration / 3600), 1)):
+                usage[r2, hour] = usage.get((r2, hour), 0) + p
+
+    peak_instances = {}
+    for (r2, _), instances in usage.items():
+        peak_instances[r2] = max(peak_instances.get(r2, 0), instances)
+
+    return {
+        "status": "Optimal" if optimal else "TimeLimit",
+        "objective": sum(chain["total_cost"] for chain in schedule),
+        "storage_regions": chosen_regions,
+        "peak_instances": peak_instances,
+        "jobs": schedule,
+    }
@@ -1,9 +1,120 @@
-import pulp
+import heapq
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+from CloudSurvey_Package.solvers import solve_binary_program
+from CloudSurvey_Package.timing import timed_phase
+
+def compute_mean_cost(compute_cost):
+    """
+    Returns the mean compute cost of one compute_cost_map entry.
+
+    Where:
+      - entries of fill_compute_cost_map_all are lists of (cost_min, cost_mean, cost_max, duration),
+        the mean is compute_cost[0][1].
+      - entries of fill_compute_cost_map_all_performance are (best_cost, effective_duration),
+        the cost is compute_cost[0].
+    """
+    first = compute_cost[0]
+    if isinstance(first, (list, tuple)):
+        return first[1]
+    return first
+
+def compute_duration(compute_cost):
+    """
+    Returns the effective duration (duration / p) in seconds of one compute_cost_map entry.
+
+    Where:
+      - entries of fill_compute_cost_map_all hold the duration in hours, compute_cost[0][3],
+      - entries of fill_compute_cost_map_all_performance hold it in seconds, compute_cost[1].
+    """
+    first = compute_cost[0]
+    if isinstance(first, (list, tuple)):
+        return first[3] * 3600
+    return compute_cost[1]
+
+def all_candidates(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """
+    Builds every feasible (r1, r2, i, s, p) chain.
+
+    The chains are joined on indexes instead of comparing every storage key with every compute key:
+    storage grouped by r1 and compute grouped by (r2, i, p). The time is proportional to the number of
+    feasible chains. They are built in the same order as by the former nested loops (transfer pairs,
+    then storage keys, then compute keys, each in map order).
+
+    Returns:
+      feasible_keys (list of chains) and cost_map_combo (chain -> total combined cost).
+    """
+    feasible_keys = []   # list of tuples (r1, r2, i, s, p)
+    cost_map_combo = {}  # dict mapping (r1, r2, i, s, p) -> total combined cost
+
+    storage_by_region = {}  # r1 -> [(i, p, storage_cost)]
+    for (r1, i, p), storage_cost in storage_cost_map.items():
+        storage_by_region.setdefault(r1, []).append((i, p, storage_cost))
+    compute_index = {}      # (r2, i, p) -> [(s, mean compute cost)]
+    for (r2, i, s, p), compute_cost in compute_cost_map.items():
+        compute_index.setdefault((r2, i, p), []).append((s, compute_mean_cost(compute_cost)))
+
+    for (r1, r2), transfer_c in transfer_cost_map.items():
+        # the same i and the same p in both storage and compute
+        for i, p, storage_cost in storage_by_region.get(r1, ()):
+            computes = compute_index.get((r2, i, p))
+            if not computes:
+                continue
+            storage_transfer_cost = storage_cost + (transfer_c * p)
+            for s, compute_cost in computes:
+                quintuple = (r1, r2, i, s, p)
+                feasible_keys.append(quintuple)
+                cost_map_combo[quintuple] = storage_transfer_cost + (p * compute_cost)  # use mean cost for compute_cost
+
+    return feasible_keys, cost_map_combo
+
+
+def dominant_candidates(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """
+    Builds one (r1, r2, i, s, p) chain per compute key, using the storage region r1 with the lowest
+    storage_cost_map[r1, i, p] + transfer_cost_map[r1, r2] * p.
+
+    The cheapest r1 is computed once per (r2, i, p) and shared by all start times s.
+
+    Returns:
+      feasible_keys (list of chains) and cost_map_combo (chain -> total combined cost).
+    """
+    storage_index = index_storage_by_instance(storage_cost_map)
+    best_storage = {}    # (r2, i, p) -> (r1, storage + transfer cost) or None
+    feasible_keys = []
+    cost_map_combo = {}
+
+    for (r2, i, s, p), compute_cost in compute_cost_map.items():
+        if (r2, i, p) not in best_storage:
+            best = None
+            for r1, storage_cost in storage_index.get((i, p), []):
+                transfer_c = transfer_cost_map.get((r1, r2))
+                if transfer_c is None:
+                    continue
+                cost = storage_cost + (transfer_c * p)
+                if best is None or cost < best[1]:
+                    best = (r1, cost)
+            best_storage[(r2, i, p)] = best
+
+        best = best_storage[(r2, i, p)]
+        if best is None:
+            continue
+        r1, storage_transfer_cost = best
+        quintuple = (r1, r2, i, s, p)
+        feasible_keys.append(quintuple)
+        cost_map_combo[quintuple] = storage_transfer_cost + (p * compute_mean_cost(compute_cost))
+
+    return feasible_keys, cost_map_combo
+
 
 def optimize(
     compute_cost_map,
     storage_cost_map,
-    transfer_cost_map
+    transfer_cost_map,
+    timer=None,
+    prune=True,
+    solver=None
 ):
     """
     Builds and solves a linear model picking exactly ONE combination of:
@@ -19,84 +130,328 @@ def optimize(
                    + transfer_cost_map[r1, r2]
                    + compute_cost_map[r2, i, s, p][0][1]
     Exactly one tuple is chosen (x=1), to minimize total cost.
-    """
 
-    model = pulp.LpProblem("Unified_Cloud_Optimization", pulp.LpMinimize)
+    The model is assembled as a cost vector and a scipy.sparse constraint matrix (one binary per feasible key)
+    and solved by solve_binary_program, in-process with HiGHS or with PuLP/CBC (solver "highs" or "cbc",
+    default OPTIMIZE_SOLVER).
+
+    If a PhaseTimer is given, candidate construction, model construction, the translation for the solver
+    ("solver_setup") and the solve are timed separately and the number of feasible keys and variables is recorded.
+
+    With prune=True (default) only the cheapest storage region r1 of every compute key (r2, i, s, p)
+    becomes a variable. Storage and transfer costs do not depend on s, so the other r1 are dominated
+    and the optimum is unchanged, while the model shrinks by the number of storage regions.
+
+    Returns:
+      A response dictionary with the status, the objective value and the chosen combinations.
+    """
 
     # ----------------------------------------------------------------
-    # Build a combined list of all feasible quadruples (r1, r2, i, s)
-    #    - (r1, i) in storage_cost_map
+    # 1) Feasible chains (r1, r2, i, s, p) with their combined cost:
+    #    - (r1, i, p) in storage_cost_map
     #    - (r1, r2) in transfer_cost_map
-    #    - (r2, i, s) in compute_cost_map
+    #    - (r2, i, s, p) in compute_cost_map
+    #    joined on indexes, with prune only the cheapest r1 per compute key (see dominant_candidates)
+
+    with timed_phase(timer, "candidate_construction"):
+        if prune:
+            feasible_keys, cost_map_combo = dominant_candidates(compute_cost_map, storage_cost_map,
+                                                                transfer_cost_map)
+        else:
+            feasible_keys, cost_map_combo = all_candidates(compute_cost_map, storage_cost_map, transfer_cost_map)
+
+    # ----------------------------------------------------------------
+    # 2) One binary per feasible key, objective: the combined cost of each key
+    # 3) Constraint: exactly one combination chosen (a single row of ones)
+    with timed_phase(timer, "model_construction"):
+        objective = np.array([cost_map_combo[q] for q in feasible_keys], dtype=float)
+        matrix = csr_matrix((np.ones(len(feasible_keys)), np.arange(len(feasible_keys)), [0, len(feasible_keys)]),
+                            shape=(1, len(feasible_keys)))
+
+    if timer is not None:
+        timer.record("feasible_keys", len(feasible_keys))
+        timer.record("variables", len(objective))
+
+    if not feasible_keys:
+        raise RuntimeError("Optimization did not converge to an optimal solution.")
+
+    # ----------------------------------------------------------------
+    # 4) Solve
+    # With a single assignment row the LP relaxation has an integral optimum (a vertex picks one key)
+    x, status = solve_binary_program(objective, matrix, [1], [1], solver=solver, relax_first=True, timer=timer)
+
+    if status != 'Optimal':
+        raise RuntimeError("Optimization did not converge to an optimal solution.")
+
+    chosen = [q for q, value in zip(feasible_keys, x) if value > 0.5]
+    return {
+        "status": status,
+        "objective": sum(cost_map_combo[q] for q in chosen),
+        "chosen_combinations": [{"combination": q, "cost": 1.0} for q in chosen]
+    }
+
+
+def cheapest_chain_totals(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """
+    Total cost of the cheapest chain of every compute key (r2, i, s, p), computed with NumPy.
+
+    Where:
+      - The storage and transfer cost of every (r1, r2, i, p) is built by broadcasting
+        storage[r1, i, p] + transfer[r1, r2] * p, missing prices are inf.
+      - Its minimum over r1 is added to p * compute_cost_map[r2, i, s, p] of every compute key.
+      - The totals are computed in the same order as in dominant_candidates, so they are bit-identical
+        to cost_map_combo. Ties go to the first r1 of storage_cost_map.
 
-    feasible_keys = []   # list of tuples (r1, r2, i, s)
-    cost_map_combo = {}  # dict mapping (r1, r2, i, s) -> total combined cost
+    Returns:
+      compute_keys (the keys of compute_cost_map), storage_regions (list of r1), totals (array, inf for
+      compute keys without a chain) and the index of the cheapest r1 in storage_regions per compute key.
+    """
+    storage_regions = {r1: index for index, r1 in enumerate(dict.fromkeys(r1 for r1, _, _ in storage_cost_map))}
+    instances = {i: index for index, i in enumerate(dict.fromkeys(i for _, i, _ in storage_cost_map))}
+    factors = {p: index for index, p in enumerate(dict.fromkeys(p for _, _, p in storage_cost_map))}
+    compute_regions = {r2: index for index, r2 in enumerate(dict.fromkeys(r2 for _, r2 in transfer_cost_map))}
+    factor_values = np.array(list(factors), dtype=float)
 
+    storage = np.full((len(storage_regions), len(instances), len(factors)), np.inf)
+    for (r1, i, p), storage_cost in storage_cost_map.items():
+        storage[storage_regions[r1], instances[i], factors[p]] = storage_cost
+    transfer = np.full((len(storage_regions), len(compute_regions)), np.inf)
     for (r1, r2), transfer_c in transfer_cost_map.items():
-        # find all (r1, i) in storage_cost_map that match this r1
-        # as well as all (r2, i, s) in compute_cost_map that match r2 and i
-        #  the same i in both storage and compute.
-        # the same p in both storage and compute
+        if r1 in storage_regions and transfer_c is not None:
+            transfer[storage_regions[r1], compute_regions[r2]] = transfer_c
 
-        for (r1_s, i_s, p_s) in storage_cost_map.keys():
-            if r1_s != r1:
-                continue  # mismatch
+    # (r1, r2, i, p) -> storage + transfer, reduced to the cheapest r1 per (r2, i, p)
+    storage_transfer = storage[:, None, :, :] + transfer[:, :, None, None] * factor_values
+    best_r1 = np.argmin(storage_transfer, axis=0)
+    best_storage_transfer = np.take_along_axis(storage_transfer, best_r1[None], axis=0)[0]
 
-            # matching (r1, i)
-            storage_cost = storage_cost_map[(r1_s, i_s, p_s)]
+    compute_keys = list(compute_cost_map)
+    key_index = np.array([
+        (compute_regions.get(r2, -1), instances.get(i, -1), factors.get(p, -1)) for r2, i, s, p in compute_keys
+    ], dtype=np.intp).reshape(-1, 3)
+    compute_costs = np.array([compute_mean_cost(compute_cost) for compute_cost in compute_cost_map.values()],
+                             dtype=float)
 
-            for (r2_c, i_c, s_c, p_c) in compute_cost_map.keys():
-                if (r2_c == r2) and (i_c == i_s) and (p_c == p_s):
-                    # match on region r2 and instance i
-                    compute_cost = compute_cost_map[(r2_c, i_c, s_c, p_c)]
+    valid = (key_index >= 0).all(axis=1)
+    r2_index, i_index, p_index = key_index[valid].T
+    totals = np.full(len(compute_keys), np.inf)
+    totals[valid] = (best_storage_transfer[r2_index, i_index, p_index]
+                     + factor_values[p_index] * compute_costs[valid])
+    r1_index = np.full(len(compute_keys), -1, dtype=np.intp)
+    r1_index[valid] = best_r1[r2_index, i_index, p_index]
+    return compute_keys, list(storage_regions), totals, r1_index
 
-                    total_cost = storage_cost + (transfer_c * p_s) + (p_s * compute_cost[0][1]) #use mean cost for compute_cost
 
-                    quintuple = (r1, r2, i_s, s_c, p_s)
-                    feasible_keys.append(quintuple)
-                    cost_map_combo[quintuple] = total_cost
+def argmin_optimize(compute_cost_map, storage_cost_map, transfer_cost_map, timer=None):
+    """
+    Closed-form solution of the model of optimize: with the single constraint "exactly one x = 1"
+    the optimum is the chain with the lowest total cost, which is found with NumPy instead of a solver.
 
-    # ----------------------------------------------------------------
-    # 2) Create decision variables for each feasible quadruple
-    x_var = {
-        (r1, r2, i, s, p): pulp.LpVariable(
-            f"x_{r1}_{r2}_{i}_{s}_p{p}",
-            lowBound=0,
-            upBound=1,
-            cat=pulp.LpBinary
-        )
-        for (r1, r2, i, s, p) in feasible_keys
-    }
+    Where:
+      - The total of the cheapest chain of every compute key comes from cheapest_chain_totals,
+        the argmin over the compute keys is the optimum.
+      - The objective is bit-identical to the one of optimize. Ties go to the first r1 of
+        storage_cost_map and the first key of compute_cost_map.
 
-    # ----------------------------------------------------------------
-    # 3) Constraints
-    # Exactly one combination chosen
-    model += (
-        pulp.lpSum(x_var[q] for q in feasible_keys) == 1,
-        "PickExactlyOneChain"
-    )
+    If a PhaseTimer is given, "cost_tensor" and "argmin" are timed and the number of feasible keys
+    (compute keys with at least one chain) is recorded.
 
-    # ----------------------------------------------------------------
-    # 4) Objective: sum of x_var 
-    # * combined cost
-    model += pulp.lpSum([
-        x_var[(r1, r2, i, s, p)] * cost_map_combo[(r1, r2, i, s, p)]
-        for (r1, r2, i, s, p) in feasible_keys
-    ]), "MinimizeTotalCost"
+    Returns:
+      The chain_breakdown of the optimal chain.
+    """
+    if not storage_cost_map or not transfer_cost_map or not compute_cost_map:
+        raise RuntimeError("Optimization did not converge to an optimal solution.")
 
-    # ----------------------------------------------------------------
-    # 5) Solve
-    if not feasible_keys:
-        print("No feasible keys")
-        print(feasible_keys)
+    with timed_phase(timer, "cost_tensor"):
+        compute_keys, storage_regions, totals, r1_index = cheapest_chain_totals(compute_cost_map, storage_cost_map,
+                                                                                transfer_cost_map)
 
-    model.solve(pulp.PULP_CBC_CMD(msg=0))
+    with timed_phase(timer, "argmin"):
+        feasible = np.isfinite(totals)
+        best = int(np.argmin(totals)) if feasible.any() else None
 
-    if pulp.LpStatus[model.status] != 'Optimal':
+    if timer is not None:
+        timer.record("feasible_keys", int(feasible.sum()))
+
+    if best is None:
         raise RuntimeError("Optimization did not converge to an optimal solution.")
 
-    return model, x_var
+    r2, i, s, p = compute_keys[best]
+    r1 = storage_regions[r1_index[best]]
+    return chain_breakdown((r1, r2, i, s, p), storage_cost_map[r1, i, p], transfer_cost_map[r1, r2],
+                           compute_cost_map[r2, i, s, p])
+
+
+def chain_breakdown(key, storage_cost, transfer_c, compute_cost):
+    """
+    Describes one (r1, r2, i, s, p) chain with its cost components.
+
+    Where:
+      - storage_cost is storage_cost_map[r1, i, p],
+      - transfer_c is transfer_cost_map[r1, r2] (multiplied by p),
+      - compute_cost is the compute_cost_map entry of (r2, i, s, p) (mean cost multiplied by p).
+
+    Returns:
+      A dictionary with the combination, the three cost components and their total.
+    """
+    r1, r2, i, s, p = key
+    storage_part = storage_cost
+    transfer_part = transfer_c * p
+    compute_part = p * compute_mean_cost(compute_cost)
+    return {
+        "combination": key,
+        "storage_cost": storage_part,
+        "transfer_cost": transfer_part,
+        "compute_cost": compute_part,
+        "total_cost": storage_part + transfer_part + compute_part
+    }
+
+
+def index_storage_by_instance(storage_cost_map):
+    """
+    Groups the storage cost map by (instance, parallel factor).
+
+    Returns:
+      A dictionary (i, p) -> list of (r1, storage_cost).
+    """
+    storage_index = {}
+    for (r1, i, p), storage_cost in storage_cost_map.items():
+        storage_index.setdefault((i, p), []).append((r1, storage_cost))
+    return storage_index
+
+
+def best_chains_for_compute(compute_cost_map, storage_index, transfer_cost_map):
+    """
+    For every compute key (r2, i, s, p) finds the cheapest storage region r1.
+
+    Where:
+      - storage_index is the result of index_storage_by_instance,
+      - only r1 with a transfer price (r1 -> r2) are considered.
+
+    Yields:
+      The chain_breakdown of the cheapest chain per compute key.
+    """
+    for (r2, i, s, p), compute_cost in compute_cost_map.items():
+        best = None
+        for r1, storage_cost in storage_index.get((i, p), []):
+            transfer_c = transfer_cost_map.get((r1, r2))
+            if transfer_c is None:
+                continue
+            candidate = chain_breakdown((r1, r2, i, s, p), storage_cost, transfer_c, compute_cost)
+            if best is None or candidate["total_cost"] < best["total_cost"]:
+                best = candidate
+        if best is not None:
+            yield best
+
+
+def iter_chains(compute_cost_map, storage_cost_map, transfer_cost_map, storage_index=None):
+    """
+    Enumerates every feasible (r1, r2, i, s, p) chain with its cost breakdown.
+
+    Where:
+      - (r1, i, p) is in storage_cost_map,
+      - (r1, r2) is in transfer_cost_map,
+      - (r2, i, s, p) is in compute_cost_map.
+
+    Yields:
+      The chain_breakdown of every feasible chain.
+    """
+    if storage_index is None:
+        storage_index = index_storage_by_instance(storage_cost_map)
+
+    for (r2, i, s, p), compute_cost in compute_cost_map.items():
+        for r1, storage_cost in storage_index.get((i, p), []):
+            transfer_c = transfer_cost_map.get((r1, r2))
+            if transfer_c is None:
+                continue
+            yield chain_breakdown((r1, r2, i, s, p), storage_cost, transfer_c, compute_cost)
+
+
+def top_k_chains(compute_cost_map, storage_cost_map, transfer_cost_map, k):
+    """
+    Returns the k cheapest distinct (r1, r2, i, s, p) chains, cheapest first.
+
+    The candidates are streamed through a heap bounded to k entries (heapq.nsmallest),
+    so memory stays O(k) and the time is O(n log k) for n feasible chains. The first
+    entry is the optimum of the single-choice model.
+    """
+    return heapq.nsmallest(k, iter_chains(compute_cost_map, storage_cost_map, transfer_cost_map),
+                           key=lambda chain: chain["total_cost"])
+
 
+def pareto_chains(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """
+    Returns the chains on the Pareto front of total cost and completion time, fastest first.
+
+    Where:
+      - The completion time of a chain is the effective duration of its compute key (duration / p, see
+        compute_duration), the start hour s is the cheapest one of the compute key.
+      - Storage and transfer costs do not change the duration, so only the cheapest r1 of every compute key
+        can be on the front (cheapest_chain_totals).
+      - Sort and sweep: the chains are sorted by completion time and then by cost, a chain is on the front if it
+        is cheaper than every faster or equally fast chain before it (running minimum). This takes O(n log n)
+        for n compute keys instead of O(n^2) pairwise comparisons.
+
+    Returns:
+      The chain_breakdown of every non-dominated chain with its "completion_time" in seconds, the cost
+      decreases and the completion time increases along the list. The last entry has the cost of the optimum
+      of the single-choice model.
+    """
+    if not storage_cost_map or not transfer_cost_map or not compute_cost_map:
+        return []
+
+    compute_keys, storage_regions, totals, r1_index = cheapest_chain_totals(compute_cost_map, storage_cost_map,
+                                                                            transfer_cost_map)
+    durations = np.array([compute_duration(compute_cost) for compute_cost in compute_cost_map.values()],
+                         dtype=float)
+
+    feasible = np.nonzero(np.isfinite(totals))[0]
+    order = feasible[np.lexsort((totals[feasible], durations[feasible]))]
+    sorted_totals = totals[order]
+    cheapest_before = np.concatenate([[np.inf], np.minimum.accumulate(sorted_totals)[:-1]])
 
+    front = []
+    for index in order[sorted_totals < cheapest_before]:
+        r2, i, s, p = compute_keys[index]
+        r1 = storage_regions[r1_index[index]]
+        chain = chain_breakdown((r1, r2, i, s, p), storage_cost_map[r1, i, p], transfer_cost_map[r1, r2],
+                                compute_cost_map[r2, i, s, p])
+        chain["completion_time"] = float(durations[index])
+        front.append(chain)
+    return front
 
 
+def anytime_search(lower_bounds, evaluate, deadline):
+    """
+    Best-first search over independent parts of the candidate space, e.g. the (region, instance) pairs
+    of the compute cost map, that keeps the cheapest chain found so far (the incumbent).
+
+    Where:
+      - lower_bounds: list of (bound, part), bound must not exceed the total cost of any chain of the part.
+      - evaluate(part): returns the chain_breakdowns of the part.
+      - deadline: time.perf_counter() value at which the search stops and returns the incumbent.
+        Parts are evaluated until there is an incumbent, even past the deadline.
+
+    The parts are evaluated in increasing order of their bound. Once the next bound is not below the
+    incumbent, no remaining chain is cheaper and the incumbent is optimal.
+
+    Returns:
+      (incumbent, lower_bound, evaluated): the cheapest chain found (None if no part has a feasible chain),
+      the lowest total cost any chain can have (the incumbent's cost once it is proven optimal) and the
+      number of evaluated parts.
+    """
+    incumbent = None
+    evaluated = 0
+    for bound, part in sorted(lower_bounds, key=lambda item: item[0]):
+        if incumbent is not None:
+            if bound >= incumbent["total_cost"]:
+                return incumbent, incumbent["total_cost"], evaluated
+            if time.perf_counter() >= deadline:
+                return incumbent, bound, evaluated
+        for chain in evaluate(part):
+            if incumbent is None or chain["total_cost"] < incumbent["total_cost"]:
+                incumbent = chain
+        evaluated += 1
+
+    # Every part was evaluated
+    return incumbent, incumbent["total_cost"] if incumbent is not None else None, evaluated
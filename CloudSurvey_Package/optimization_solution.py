@@ -1,14 +1,27 @@
-from CloudSurvey_Package.computing_prices import multiple_jobs
-from CloudSurvey_Package.storage_prices import calculate_complete_storage_price
+from CloudSurvey_Package.computing_prices import find_cheapest_slot_vectorized, multiple_jobs
+from CloudSurvey_Package.storage_prices import calculate_complete_storage_price, get_storage_cost
+from CloudSurvey_Package.db_operations import get_mean_spot_price
 from CloudSurvey_Package.fill_cost_maps import *
 from CloudSurvey_Package.optimization_problem import *
+from CloudSurvey_Package.joint_scheduling import schedule_jobs
+from CloudSurvey_Package.solvers import SOLVERS
+from CloudSurvey_Package.db_clients import get_client, get_compute_client, get_storage_client
+from CloudSurvey_Package.timing import PhaseTimer, timed_phase
+from CloudSurvey_Package.currency import BASE_CURRENCY, PROVIDER_CURRENCY, convert_cost_maps, exchange_rate
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
+import time
+import CloudSurvey_Package.constants as constants
+
+PROVIDERS = ("AWS", "Azure")
+ENGINES = ("argmin",) + SOLVERS
+DEFAULT_ENGINE = "argmin"
+SHARED_STORAGE_GROUP = "shared"  # storage_group of the jobs of a joint schedule that share one storage region
 
 def main_storage(provider, list, konfidenzgrad, volume, premium, lrs, connection_string_compute, connection_string_storage):
-    client_compute = MongoClient(connection_string_compute)
-    client_storage = MongoClient(connection_string_storage)
+    client_compute = get_client(connection_string_compute)
+    client_storage = get_client(connection_string_storage)
 
     total_cost, single_cost = (multiple_jobs(provider, list, konfidenzgrad, client_compute))
     if dimensions_test(single_cost) == 1:
@@ -21,14 +34,302 @@ def main_storage(provider, list, konfidenzgrad, volume, premium, lrs, connection
 
 
 def main_no_storage(provider, list, konfidenzgrad, connection_string_compute):
-    client_compute = MongoClient(connection_string_compute)
+    client_compute = get_client(connection_string_compute)
     total_cost, single_cost = ((multiple_jobs(provider, list, konfidenzgrad, client_compute)))
     if dimensions_test(single_cost) == 1:
         generate_output(total_cost, single_cost, konfidenzgrad, False, provider)
     else:
         generate_output(total_cost, single_cost, konfidenzgrad, True, provider)
 
-def main_optimization(provider, instance_list, konfidenzgrad, volume, premium, lrs, parallelization):
+def normalize_provider(provider):
+    """
+    Normalizes the provider name to "AWS", "Azure" or "all" (both providers).
+    """
+    if provider.lower() == 'aws':
+        return "AWS"
+    if provider.lower() == 'all':
+        return "all"
+    return "Azure"
+
+def provider_of_region(region):
+    """
+    Returns the provider a region belongs to.
+    """
+    if region in constants.aws_regions:
+        return "AWS"
+    return "Azure"
+
+def build_cost_maps(provider, instance_list, volume, premium, lrs, parallelization, client_compute, client_storage,
+                    pricing_list=None, storage_price_list=None, transfer_cost_map=None, timer=None):
+    """
+        Constructs the compute, storage and transfer cost maps for one job.
+
+        Where:
+          - pricing_list: optional pre-fetched result of get_mean_spot_price.
+          - storage_price_list: optional pre-fetched result of get_storage_cost.
+          - transfer_cost_map: optional pre-built transfer cost map of the provider.
+          - timer: optional PhaseTimer, every database query and map construction is timed as its own phase.
+        Anything that is not given is fetched from the databases.
+
+        Returns:
+          compute_cost_map, storage_cost_map, transfer_cost_map
+    """
+    if pricing_list is None:
+        with timed_phase(timer, "get_mean_spot_price"):
+            instance_types = [item[0] for item in instance_list]
+            pricing_list = get_mean_spot_price(client_compute, instance_types, provider)
+    # compute_cost_map = fill_compute_cost_map_all(provider, instance_list, konfidenzgrad, client_compute, parallelization)
+    with timed_phase(timer, "fill_compute_cost_map"):
+        compute_cost_map = fill_compute_cost_map_all_performance(provider, instance_list, client_compute,
+                                                                 parallelization, pricing_list=pricing_list)
+    if storage_price_list is None:
+        with timed_phase(timer, "get_storage_cost"):
+            storage_price_list = get_storage_cost(provider, volume, premium, lrs, client_storage)
+    with timed_phase(timer, "fill_storage_cost_map"):
+        storage_cost_map = fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client_storage,
+                                                 parallelization, storage_price_list=storage_price_list)
+    if transfer_cost_map is None:
+        with timed_phase(timer, "fill_transfer_cost_map"):
+            transfer_cost_map = fill_transfer_cost_map(provider, client_storage)
+    return compute_cost_map, storage_cost_map, transfer_cost_map
+
+def build_cost_maps_all(instance_lists, volume, premium, lrs, parallelization, client_compute, client_storage,
+                        price_data=None, timer=None):
+    """
+        Builds the cost maps of all providers concurrently and merges them in BASE_CURRENCY.
+
+        Where:
+          - instance_lists: {"AWS": instance_list, "Azure": instance_list} with the simulated instances
+            of every provider. Providers without instances are skipped.
+          - The providers use separate databases and regions, so the merged maps have no common keys
+            and the optimization never mixes storage of one provider with compute of the other.
+          - price_data: optional {provider: {"pricing_list", "storage_price_list", "transfer_cost_map"}}
+            with pre-fetched price data (see build_cost_maps).
+          - timer: optional PhaseTimer, the phases of each provider are recorded as "<provider>.<phase>".
+
+        Returns:
+          compute_cost_map, storage_cost_map, transfer_cost_map
+    """
+    providers = [provider for provider in PROVIDERS if instance_lists.get(provider)]
+    provider_timers = {provider: PhaseTimer() for provider in providers}
+
+    def build(provider):
+        cost_maps = build_cost_maps(provider, instance_lists[provider], volume, premium, lrs, parallelization,
+                                    client_compute, client_storage, timer=provider_timers[provider],
+                                    **(price_data or {}).get(provider, {}))
+        return convert_cost_maps(provider, *cost_maps)
+
+    with timed_phase(timer, "build_cost_maps"):
+        with ThreadPoolExecutor(max_workers=max(len(providers), 1)) as executor:
+            provider_cost_maps = list(executor.map(build, providers))
+
+    compute_cost_map, storage_cost_map, transfer_cost_map = {}, {}, {}
+    for provider, (compute, storage, transfer) in zip(providers, provider_cost_maps):
+        compute_cost_map.update(compute)
+        storage_cost_map.update(storage)
+        transfer_cost_map.update(transfer)
+        if timer is not None:
+            timer.merge(provider_timers[provider], prefix=provider + ".")
+    return compute_cost_map, storage_cost_map, transfer_cost_map
+
+def solve_cost_maps(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=None, timer=None, engine=None,
+                    pareto=False):
+    """
+        Builds and solves the optimization model for the given cost maps.
+
+        Where:
+          - top_k: If set, the response also lists the top_k cheapest distinct chains
+            with their cost components under "alternatives" (see top_k_chains).
+          - pareto: If set, the response also lists the chains that are not dominated in total cost and
+            completion time under "pareto_front", fastest first (see pareto_chains).
+          - timer: optional PhaseTimer passed on to the engine.
+          - engine: "argmin" (the closed-form NumPy solution of argmin_optimize), "highs" or "cbc" (the sparse
+            model of optimize, solved in-process with HiGHS or with PuLP/CBC, "pulp" is an alias of "cbc").
+            All pick the same chain, a solver is only needed for models with further constraints.
+            Defaults to OPTIMIZE_ENGINE (Standard: "argmin").
+
+        Returns:
+          A response dictionary with the model status, the objective value and the chosen combinations.
+    """
+    if engine is None:
+        engine = os.getenv("OPTIMIZE_ENGINE", DEFAULT_ENGINE)
+
+    if engine == "argmin":
+        chain = argmin_optimize(compute_cost_map, storage_cost_map, transfer_cost_map, timer=timer)
+        response = {
+            "status": "Optimal",
+            "objective": chain["total_cost"],
+            "chosen_combinations": [{"combination": chain["combination"], "cost": 1.0}]
+        }
+    elif engine in SOLVERS or engine == "pulp":  # "pulp" is the former name of "cbc"
+        response = optimize(compute_cost_map, storage_cost_map, transfer_cost_map, timer=timer,
+                            solver="cbc" if engine == "pulp" else engine)
+    else:
+        raise ValueError(f"Unknown optimization engine {engine!r}, expected one of {ENGINES}")
+    logging.debug(f"Status: {response['status']}, objective: {response['objective']}, chosen combinations: "
+                  f"{[chosen['combination'] for chosen in response['chosen_combinations']]}")
+
+    if top_k:
+        with timed_phase(timer, "top_k"):
+            response["alternatives"] = top_k_chains(compute_cost_map, storage_cost_map, transfer_cost_map, top_k)
+
+    if pareto:
+        with timed_phase(timer, "pareto"):
+            response["pareto_front"] = pareto_chains(compute_cost_map, storage_cost_map, transfer_cost_map)
+
+    return response
+
+def solve_cost_maps_all(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=None, timer=None, pareto=False):
+    """
+    solve_cost_maps for the merged maps of build_cost_maps_all, the response names the currency
+    and the provider of every chosen combination.
+    """
+    response = solve_cost_maps(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=top_k, timer=timer,
+                               pareto=pareto)
+    response["currency"] = BASE_CURRENCY
+    for chosen in response["chosen_combinations"]:
+        chosen["provider"] = provider_of_region(chosen["combination"][1])
+    for chain in response.get("pareto_front", []):
+        chain["provider"] = provider_of_region(chain["combination"][1])
+    return response
+
+def anytime_lower_bounds(provider, instance_list, parallelization, pricing_list, storage_cost_map,
+                         transfer_cost_map, rate=1.0):
+    """
+        Splits the candidate chains of one provider into (region r2, instance i) parts for anytime_search.
+
+        Where:
+          - The lower bound of a part is the cheapest storage of i (over all r1), plus the cheapest transfer
+            into r2, plus the lowest hourly mean price of i in r2 for the whole duration. Every start hour
+            costs at least that much, so no chain of the part is cheaper.
+          - rate converts the spot prices into the currency of the storage and transfer cost maps.
+
+        Returns:
+          A list of (bound, part) and the function evaluating a part into its cheapest chain per factor p
+          (see best_chains_for_compute), with the same costs as the compute cost map of main_optimization.
+    """
+    storage_index = index_storage_by_instance(storage_cost_map)
+    cheapest_storage = {}  # i -> [(p, cheapest storage over all r1)]
+    for (i, p), regions in storage_index.items():
+        cheapest_storage.setdefault(i, []).append((p, min(cost for _, cost in regions)))
+    cheapest_transfer = {}
+    for (r1, r2), transfer_c in transfer_cost_map.items():
+        if r2 not in cheapest_transfer or transfer_c < cheapest_transfer[r2]:
+            cheapest_transfer[r2] = transfer_c
+    durations = {item[0]: item[1] for item in instance_list}
+
+    lower_bounds = []
+    for (region, instance_type), (lowest_price, entries) in index_pricing_by_region_instance(
+            provider, instance_list, pricing_list).items():
+        transfer_c = cheapest_transfer.get(region)
+        storage = cheapest_storage.get(instance_type)
+        if transfer_c is None or storage is None:
+            continue
+        bound = (min(storage_cost + p * transfer_c for p, storage_cost in storage)
+                 + lowest_price * rate * durations[instance_type] / 3600)
+        # Slightly lowered, so rounding never makes a bound exceed the cost of its cheapest chain
+        lower_bounds.append((bound * (1 - 1e-12), (region, instance_type, entries)))
+
+    def evaluate(part):
+        region, instance_type, entries = part
+        slots = find_cheapest_slot_vectorized([[instance_type, durations[instance_type]]], entries, region,
+                                              parallelization)
+        region_cost_map = {
+            (reg, instance_type, start_time, factor): (best_cost * rate, effective_duration)
+            for factor, (reg, start_time, best_cost, effective_duration) in slots.get(instance_type, {}).items()
+        }
+        return best_chains_for_compute(region_cost_map, storage_index, transfer_cost_map)
+
+    return lower_bounds, evaluate
+
+def anytime_optimization(provider, instance_list, volume, premium, lrs, parallelization, time_budget_ms,
+                         price_data=None, timer=None):
+    """
+        Deadline-bounded variant of main_optimization, returns the cheapest chain found within time_budget_ms.
+
+        Where:
+          - The (region, instance) pairs are evaluated in order of a cheap lower bound of their cost
+            (see anytime_lower_bounds and anytime_search) instead of building the full model.
+          - Once the next lower bound is not below the cheapest chain so far, that chain is optimal
+            and the search ends early. This is usually the case long before the budget runs out.
+          - The budget starts with the call and includes fetching price data that is not in price_data.
+            At least one chain is returned, even if that takes longer than the budget.
+          - Alternatives (top_k) are not listed.
+
+        Returns:
+          The response of solve_cost_maps (solve_cost_maps_all for provider "all") with:
+            - status "Optimal" if the chain is proven optimal, "TimeLimit" if the budget ran out first,
+            - lower_bound: the lowest cost any chain can have,
+            - gap: objective - lower_bound, 0 if the chain is optimal.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    client_compute = get_compute_client()
+    client_storage = get_storage_client()
+
+    provider = normalize_provider(provider)
+    if provider == "all":
+        instance_lists = {name: instance_list[name] for name in PROVIDERS if instance_list.get(name)}
+        provider_price_data = price_data or {}
+    else:
+        instance_lists = {provider: instance_list}
+        provider_price_data = {provider: price_data or {}}
+
+    lower_bounds = []
+    evaluators = {}
+    for name, instances in instance_lists.items():
+        data = provider_price_data.get(name, {})
+        pricing_list = data.get("pricing_list")
+        if pricing_list is None:
+            with timed_phase(timer, "get_mean_spot_price"):
+                pricing_list = get_mean_spot_price(client_compute, [item[0] for item in instances], name)
+        storage_price_list = data.get("storage_price_list")
+        if storage_price_list is None:
+            with timed_phase(timer, "get_storage_cost"):
+                storage_price_list = get_storage_cost(name, volume, premium, lrs, client_storage)
+        with timed_phase(timer, "fill_storage_cost_map"):
+            storage_cost_map = fill_storage_cost_map(name, volume, premium, lrs, instances, client_storage,
+                                                     parallelization, storage_price_list=storage_price_list)
+        transfer_cost_map = data.get("transfer_cost_map")
+        if transfer_cost_map is None:
+            with timed_phase(timer, "fill_transfer_cost_map"):
+                transfer_cost_map = fill_transfer_cost_map(name, client_storage)
+
+        rate = 1.0
+        if provider == "all":
+            _, storage_cost_map, transfer_cost_map = convert_cost_maps(name, {}, storage_cost_map, transfer_cost_map)
+            rate = exchange_rate(PROVIDER_CURRENCY[name])
+        with timed_phase(timer, "lower_bounds"):
+            provider_bounds, evaluators[name] = anytime_lower_bounds(name, instances, parallelization, pricing_list,
+                                                                     storage_cost_map, transfer_cost_map, rate)
+        lower_bounds.extend((bound, (name, part)) for bound, part in provider_bounds)
+
+    with timed_phase(timer, "anytime_search"):
+        incumbent, lower_bound, evaluated = anytime_search(
+            lower_bounds, lambda part: evaluators[part[0]](part[1]), deadline)
+    if timer is not None:
+        timer.record("candidate_pairs", len(lower_bounds))
+        timer.record("evaluated_pairs", evaluated)
+
+    if incumbent is None:
+        raise RuntimeError("Optimization did not converge to an optimal solution.")
+
+    objective = incumbent["total_cost"]
+    gap = max(objective - lower_bound, 0.0)
+    response = {
+        "status": "Optimal" if gap == 0 else "TimeLimit",
+        "objective": objective,
+        "chosen_combinations": [{"combination": incumbent["combination"], "cost": 1.0}],
+        "lower_bound": min(lower_bound, objective),
+        "gap": gap,
+    }
+    if provider == "all":
+        response["currency"] = BASE_CURRENCY
+        for chosen in response["chosen_combinations"]:
+            chosen["provider"] = provider_of_region(chosen["combination"][1])
+    return response
+
+def main_optimization(provider, instance_list, konfidenzgrad, volume, premium, lrs, parallelization, top_k=None,
+                      price_data=None, time_budget_ms=None, timer=None, pareto=False):
     """
         Builds and solves a linear model picking exactly ONE combination of:
           (r1, r2, i, s, p)
@@ -45,55 +346,283 @@ def main_optimization(provider, instance_list, konfidenzgrad, volume, premium, l
         Exactly one tuple is chosen (x=1), to minimize total cost.
 
         This function performs the following steps:
-          - Loads environment variables and retrieves connection strings.
-          - Establishes connections to compute and storage databases.
+          - Takes the pooled compute and storage clients from db_clients.
           - Normalizes the provider name to "AWS" or "Azure".
           - Constructs cost maps for compute, storage, and transfer by calling corresponding functions.
           - Builds and solves the optimization model using the optimize function.
           - Prints the model status, objective value, and chosen cost combinations.
 
         Parameters:
-          provider (str): Cloud provider name (e.g., "AWS" or "Azure").
-          instance_list (list): List of instances with their associated parameters.
+          provider (str): Cloud provider name (e.g., "AWS" or "Azure"), or "all" to compare both providers.
+          instance_list (list): List of instances with their associated parameters. For provider "all" a
+            dictionary {"AWS": instance_list, "Azure": instance_list}; the costs are then converted to
+            BASE_CURRENCY and the global optimum over both providers is returned.
           konfidenzgrad (int): Confidence level used in cost computations.
           volume (float): Volume metric for storage cost calculation.
           premium (bool): Indicator for using premium storage.
           lrs (bool): Flag for local redundant storage.
           parallelization (list): List of parallelization factors to consider.
+          top_k (int): Optional number of cheapest alternative chains to return as fallbacks.
+          price_data (dict): Optional pre-fetched price data, the keyword arguments pricing_list,
+            storage_price_list and/or transfer_cost_map of build_cost_maps. For provider "all" one such
+            dictionary per provider (see build_cost_maps_all). Missing data is fetched from the databases.
+          time_budget_ms (float): Optional time budget in milliseconds. The cheapest chain found within the
+            budget is returned with the gap to the lower bound of the remaining chains (see anytime_optimization).
+          timer (PhaseTimer): Optional timer that records the duration of every phase and the model size.
+          pareto (bool): Also return the chains that are not dominated in total cost and completion time
+            (duration / p) under "pareto_front", so a trade-off can be picked from one request (see
+            pareto_chains). Not computed with time_budget_ms.
+
+        Returns:
+          A response dictionary with status, objective and the chosen combinations.
         """
-    load_dotenv()
-    connection_string_compute = os.getenv('MONGODB_URI')
-    connection_string_storage = os.getenv('MONGODB_URI2')
-    client_compute = MongoClient(connection_string_compute)
-    client_storage = MongoClient(connection_string_storage)
+    if time_budget_ms:
+        return anytime_optimization(provider, instance_list, volume, premium, lrs, parallelization,
+                                    float(time_budget_ms), price_data=price_data, timer=timer)
 
-    if provider.lower() == 'aws':
-        provider = "AWS"
+    client_compute = get_compute_client()
+    client_storage = get_storage_client()
+
+    provider = normalize_provider(provider)
+
+    if provider == "all":
+        compute_cost_map, storage_cost_map, transfer_cost_map = build_cost_maps_all(
+            instance_list, volume, premium, lrs, parallelization, client_compute, client_storage,
+            price_data=price_data, timer=timer
+        )
+        return solve_cost_maps_all(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=top_k, timer=timer,
+                                   pareto=pareto)
+
+    compute_cost_map, storage_cost_map, transfer_cost_map = build_cost_maps(
+        provider, instance_list, volume, premium, lrs, parallelization, client_compute, client_storage, timer=timer,
+        **(price_data or {})
+    )
+
+    return solve_cost_maps(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=top_k, timer=timer,
+                           pareto=pareto)
+
+def stream_optimization(provider, instance_list, konfidenzgrad, volume, premium, lrs, parallelization,
+                        price_data=None):
+    """
+        Streaming variant of main_optimization.
+
+        The storage and transfer cost maps are built first. Then the compute prices are evaluated
+        region by region, and as soon as a region is known its candidates are yielded.
+        price_data is the optional pre-fetched price data as in main_optimization.
+
+        Yields:
+          - {"type": "candidate", ...} for every compute key (r2, i, s, p) with its cheapest
+            storage region r1 and the cost breakdown (see chain_breakdown).
+          - Finally {"type": "optimum", "status": ..., "objective": ...} with the global optimum,
+            which is the same chain main_optimization picks.
+    """
+    client_compute = get_compute_client()
+    client_storage = get_storage_client()
+
+    provider = normalize_provider(provider)
+    price_data = price_data or {}
+
+    storage_cost_map = fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client_storage,
+                                             parallelization, storage_price_list=price_data.get("storage_price_list"))
+    transfer_cost_map = price_data.get("transfer_cost_map")
+    if transfer_cost_map is None:
+        transfer_cost_map = fill_transfer_cost_map(provider, client_storage)
+    storage_index = index_storage_by_instance(storage_cost_map)
+
+    optimum = None
+    for region, region_cost_map in iter_compute_cost_map_regions(provider, instance_list, client_compute,
+                                                                 parallelization,
+                                                                 pricing_list=price_data.get("pricing_list")):
+        for chain in best_chains_for_compute(region_cost_map, storage_index, transfer_cost_map):
+            if optimum is None or chain["total_cost"] < optimum["total_cost"]:
+                optimum = chain
+            yield {"type": "candidate", **chain}
+
+    if optimum is None:
+        yield {"type": "optimum", "status": "Infeasible", "objective": None}
     else:
-        provider = "Azure"
+        yield {"type": "optimum", "status": "Optimal", "objective": optimum["total_cost"], **optimum}
 
-    # compute_cost_map = fill_compute_cost_map_all(provider, instance_list, konfidenzgrad, client_compute, parallelization)
-    compute_cost_map = fill_compute_cost_map_all_performance(provider, instance_list, client_compute, parallelization)
-    storage_cost_map = fill_storage_cost_map(provider, volume, premium, lrs, instance_list, client_storage, parallelization)
-    transfer_cost_map = fill_transfer_cost_map(provider, client_storage)
+def main_optimization_batch(jobs, timer=None):
+    """
+        Runs main_optimization for many jobs while sharing the database work between them.
 
-    model, x_var = (optimize(compute_cost_map, storage_cost_map, transfer_cost_map))
-    print("Status:", pulp.LpStatus[model.status])
-    print("Objective:", pulp.value(model.objective))
+        Where:
+          - jobs: A list of dictionaries with the keys provider, instance_list, konfidenzgrad,
+            volume, premium, lrs, parallelization and optionally top_k and pareto (the arguments of
+            main_optimization).
+          - The mean spot prices are aggregated once per provider for the union of all instance types.
+          - Storage prices are fetched once per (provider, volume, premium, lrs).
+          - The transfer cost map is built once per provider.
+          - Jobs with provider "all", jobs that bring their own price_data (e.g. from a price snapshot)
+            and jobs with a time_budget_ms are optimized one by one with main_optimization.
+          - price_data may list "missing_instance_types" whose spot prices it does not contain (see
+            PriceSnapshot.price_data). These are aggregated together with the instance types of the shared
+            jobs, so each provider is queried once per batch.
+          - timer: optional PhaseTimer, phases of all jobs are summed.
 
-    response = {
-        "status": pulp.LpStatus[model.status],
-        "objective": pulp.value(model.objective),
-        "chosen_combinations": []
-    }
+        Returns:
+          A list with one entry per job, in input order. Each entry is the response of the job
+          or a dictionary {"error": message} if the job could not be optimized.
+    """
+    client_compute = get_compute_client()
+    client_storage = get_storage_client()
+
+    def own_price_data(job, provider):
+        # {provider: price data} of a job optimized on its own, None for jobs on the shared price data
+        if provider == "all":
+            return job.get("price_data") or {}
+        if job.get("price_data") or job.get("time_budget_ms"):
+            return {provider: job.get("price_data") or {}}
+        return None
+
+    # 1) Collect the instance types per provider: of the shared jobs and those missing in the own price data
+    instance_types_by_provider = {}
+    shared_providers = set()
+    for job in jobs:
+        provider = normalize_provider(job["provider"])
+        price_data = own_price_data(job, provider)
+        if price_data is None:
+            shared_providers.add(provider)
+            instance_types_by_provider.setdefault(provider, set()).update(item[0] for item in job["instance_list"])
+            continue
+        for name, data in price_data.items():
+            if data.get("missing_instance_types"):
+                instance_types_by_provider.setdefault(name, set()).update(data["missing_instance_types"])
+
+    # 2) One spot price aggregation per provider, one transfer map per provider of the shared jobs
+    pricing_lists = {}
+    transfer_cost_maps = {}
+    for provider, instance_types in instance_types_by_provider.items():
+        with timed_phase(timer, "get_mean_spot_price"):
+            pricing_lists[provider] = get_mean_spot_price(client_compute, sorted(instance_types), provider)
+    for provider in shared_providers:
+        with timed_phase(timer, "fill_transfer_cost_map"):
+            transfer_cost_maps[provider] = fill_transfer_cost_map(provider, client_storage)
+
+    def complete(data, provider):
+        # Adds the shared spot prices of the missing instance types to the own price data of a job
+        data = dict(data)
+        missing = set(data.pop("missing_instance_types", ()))
+        if missing:
+            data["pricing_list"] = data.get("pricing_list", []) + [
+                entry for entry in pricing_lists[provider] if entry["instance_type"] in missing]
+        return data
+
+    # 3) Optimize every job on the shared price data
+    storage_price_lists = {}
+    results = []
+    for job in jobs:
+        provider = normalize_provider(job["provider"])
+        try:
+            price_data = own_price_data(job, provider)
+            if price_data is not None:
+                if job.get("price_data"):
+                    price_data = {name: complete(data, name) for name, data in price_data.items()}
+                    job = dict(job, price_data=price_data if provider == "all" else price_data[provider])
+                results.append(main_optimization(**job, timer=timer))
+                continue
+            storage_key = (provider, job["volume"], bool(job["premium"]), bool(job["lrs"]))
+            if storage_key not in storage_price_lists:
+                with timed_phase(timer, "get_storage_cost"):
+                    storage_price_lists[storage_key] = get_storage_cost(provider, job["volume"], job["premium"],
+                                                                        job["lrs"], client_storage)
+
+            compute_cost_map, storage_cost_map, transfer_cost_map = build_cost_maps(
+                provider, job["instance_list"], job["volume"], job["premium"], job["lrs"], job["parallelization"],
+                client_compute, client_storage,
+                pricing_list=pricing_lists[provider],
+                storage_price_list=storage_price_lists[storage_key],
+                transfer_cost_map=transfer_cost_maps[provider],
+                timer=timer,
+            )
+            results.append(solve_cost_maps(compute_cost_map, storage_cost_map, transfer_cost_map,
+                                           top_k=job.get("top_k"), timer=timer, pareto=bool(job.get("pareto"))))
+        except Exception as e:
+            results.append({"error": str(e)})
+
+    return results
+
+def main_joint_optimization(provider, jobs, region_limits=None, default_region_limit=None, shared_storage=False,
+                            time_limit=None, solver=None, max_storage_assignments=None, timer=None):
+    """
+        Schedules several jobs of one provider jointly (see schedule_jobs) instead of optimizing every job
+        on its own, so they share per-region instance limits and storage.
+
+        Where:
+          - jobs: A list of dictionaries with the keys instance_list, volume, premium, lrs, parallelization and
+            optionally deadline_hours, storage_group and price_data (pricing_list, storage_price_list and/or
+            transfer_cost_map, see build_cost_maps).
+          - region_limits: {region: instances} the maximum number of instances running at the same time in a
+            region, default_region_limit for the other regions (None = unlimited).
+          - shared_storage: jobs without a storage_group share one storage region (True) or use their
+            cheapest storage region each (False, default).
+          - time_limit: optional solver time limit in seconds.
+          - solver: "highs" or "cbc", defaults to OPTIMIZE_SOLVER (see solve_binary_program).
+          - max_storage_assignments: maximum number of storage assignments solved, defaults to
+            JOINT_MAX_STORAGE_ASSIGNMENTS (see schedule_jobs).
+          - The spot prices of jobs without price_data are aggregated once for the union of their instance types,
+            storage prices are fetched once per (volume, premium, lrs) and the transfer cost map is built once.
+          - timer: optional PhaseTimer, phases of all jobs are summed.
+
+        Returns:
+          The response of schedule_jobs: status, objective, the storage region per group, the peak number of
+          instances per limited region and the chain, start and end hour of every job, in input order.
+    """
+    provider = normalize_provider(provider)
+    if provider == "all":
+        raise ValueError("A joint schedule needs a single provider, 'all' is not supported")
+
+    client_compute = get_compute_client()
+    client_storage = get_storage_client()
+    price_data = [job.get("price_data") or {} for job in jobs]
+
+    # 1) One spot price aggregation for the jobs without prices and one transfer map
+    instance_types = sorted({item[0] for job, data in zip(jobs, price_data) if data.get("pricing_list") is None
+                             for item in job["instance_list"]})
+    pricing_list = None
+    if instance_types:
+        with timed_phase(timer, "get_mean_spot_price"):
+            pricing_list = get_mean_spot_price(client_compute, instance_types, provider)
+    transfer_cost_map = next((data["transfer_cost_map"] for data in price_data
+                              if data.get("transfer_cost_map") is not None), None)
+    if transfer_cost_map is None:
+        with timed_phase(timer, "fill_transfer_cost_map"):
+            transfer_cost_map = fill_transfer_cost_map(provider, client_storage)
+
+    # 2) Storage cost map per job
+    storage_price_lists = {}
+    scheduled_jobs = []
+    for job, data in zip(jobs, price_data):
+        storage_price_list = data.get("storage_price_list")
+        if storage_price_list is None:
+            storage_key = (job["volume"], bool(job["premium"]), bool(job["lrs"]))
+            if storage_key not in storage_price_lists:
+                with timed_phase(timer, "get_storage_cost"):
+                    storage_price_lists[storage_key] = get_storage_cost(provider, job["volume"], job["premium"],
+                                                                        job["lrs"], client_storage)
+            storage_price_list = storage_price_lists[storage_key]
+        with timed_phase(timer, "fill_storage_cost_map"):
+            storage_cost_map = fill_storage_cost_map(provider, job["volume"], job["premium"], job["lrs"],
+                                                     job["instance_list"], client_storage, job["parallelization"],
+                                                     storage_price_list=storage_price_list)
+
+        storage_group = job.get("storage_group")
+        if storage_group is None and shared_storage:
+            storage_group = SHARED_STORAGE_GROUP
+        scheduled_jobs.append({
+            "instance_list": job["instance_list"],
+            "parallelization": job["parallelization"],
+            "pricing_list": data["pricing_list"] if data.get("pricing_list") is not None else pricing_list,
+            "storage_cost_map": storage_cost_map,
+            "deadline_hours": job.get("deadline_hours"),
+            "storage_group": storage_group,
+        })
 
-    for key, var_obj in x_var.items():
-        if var_obj.varValue > 0.5:  # chosen
-            print("Chosen combination:", key, "Cost:", var_obj.varValue)
-            response["chosen_combinations"].append({
-                "combination": key,
-                "cost": var_obj.varValue
-            })
+    # 3) One model for all jobs
+    return schedule_jobs(scheduled_jobs, transfer_cost_map, region_limits=region_limits,
+                         default_region_limit=default_region_limit, time_limit=time_limit, solver=solver,
+                         max_storage_assignments=max_storage_assignments, timer=timer)
 
 """
 #Testing
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pulp
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from CloudSurvey_Package.timing import timed_phase
+
+SOLVERS = ("highs", "cbc")
+DEFAULT_SOLVER = "highs"
+INTEGRALITY_TOLERANCE = 1e-6
+
+# scipy.optimize.milp status -> status of the response
+HIGHS_STATUS = {0: "Optimal", 1: "TimeLimit", 2: "Infeasible", 3: "Unbounded"}
+
+
+def resolve_solver(solver=None):
+    """
+    Returns the solver backend to use, OPTIMIZE_SOLVER if none is given (Standard: "highs").
+    """
+    if solver is None:
+        solver = os.getenv("OPTIMIZE_SOLVER", DEFAULT_SOLVER)
+    solver = solver.lower()
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {SOLVERS}")
+    return solver
+
+
+def solve_binary_program(objective, matrix, row_lb, row_ub, upper_bounds=None, solver=None, time_limit=None,
+                         relax_first=False, timer=None):
+    """
+    Minimizes objective @ x over binary x with row_lb <= matrix @ x <= row_ub.
+
+    Where:
+      - matrix: scipy.sparse matrix with one row per constraint, assembled by the caller.
+      - upper_bounds: optional 0/1 upper bound per variable, 0 excludes a variable without rebuilding the matrix.
+      - solver: "highs" solves in-process with scipy.optimize.milp. "cbc" translates the matrix into a PuLP
+        model and runs the CBC binary, which writes the model to a temporary file and starts a subprocess.
+        Defaults to OPTIMIZE_SOLVER (see resolve_solver).
+      - time_limit: optional solver time limit in seconds.
+      - relax_first: solve the LP relaxation first and return it if it is integral (HiGHS only). Branch and bound
+        of HiGHS is much slower with many binaries and not needed for models whose relaxation is usually integral.
+
+    If a PhaseTimer is given, "solver_setup" (translation of the matrix for the backend) and "solve" are timed.
+
+    Returns:
+      (x, status): x is the rounded solution or None, status "Optimal", "TimeLimit" (a solution that is not
+      proven optimal), "Infeasible", "Unbounded" or "Not Solved".
+    """
+    solver = resolve_solver(solver)
+    objective = np.asarray(objective, dtype=float)
+    if upper_bounds is None:
+        upper_bounds = np.ones(len(objective))
+
+    if solver == "highs":
+        with timed_phase(timer, "solver_setup"):
+            bounds = Bounds(np.zeros(len(objective)), upper_bounds)
+            constraints = LinearConstraint(matrix, row_lb, row_ub)
+            options = {"time_limit": time_limit} if time_limit is not None else None
+        with timed_phase(timer, "solve"):
+            if relax_first:
+                relaxation = milp(objective, bounds=bounds, constraints=constraints, options=options)
+                if relaxation.x is None:
+                    return None, HIGHS_STATUS.get(relaxation.status, "Not Solved")
+                if np.all(np.abs(relaxation.x - np.round(relaxation.x)) <= INTEGRALITY_TOLERANCE):
+                    return np.round(relaxation.x), "Optimal"
+            result = milp(objective, integrality=np.ones(len(objective)), bounds=bounds, constraints=constraints,
+                          options=options)
+        status = HIGHS_STATUS.get(result.status, "Not Solved")
+        return (np.round(result.x) if result.x is not None else None), status
+
+    with timed_phase(timer, "solver_setup"):
+        model = pulp.LpProblem("Binary_Program", pulp.LpMinimize)
+        variables = [pulp.LpVariable(f"x_{index}", lowBound=0, upBound=int(upper), cat=pulp.LpBinary)
+                     for index, upper in enumerate(upper_bounds)]
+        model += pulp.LpAffineExpression(zip(variables, objective.tolist())), "Objective"
+        rows = matrix.tocsr()
+        for row, (lb, ub) in enumerate(zip(row_lb, row_ub)):
+            start, end = rows.indptr[row], rows.indptr[row + 1]
+            expression = pulp.LpAffineExpression(
+                [(variables[column], value) for column, value in zip(rows.indices[start:end], rows.data[start:end])])
+            if lb == ub:
+                model += expression == lb, f"row_{row}"
+                continue
+            if np.isfinite(lb):
+                model += expression >= lb, f"row_{row}_lb"
+            if np.isfinite(ub):
+                model += expression <= ub, f"row_{row}_ub"
+    with timed_phase(timer, "solve"):
+        model.solve(pulp.PULP_CBC_CMD(msg=0, timeLimit=time_limit))
+
+    # sol_status 1: optimal, 2: integer solution found before the time limit
+    if model.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None, pulp.LpStatus[model.status]
+    x = np.array([variable.varValue or 0.0 for variable in variables])
+    return np.round(x), "Optimal" if model.sol_status == pulp.LpSolutionOptimal else "TimeLimit"
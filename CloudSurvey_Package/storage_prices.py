@@ -20,9 +20,26 @@ def get_transfer_cost(fromRegion, toRegion, provider, client):
     if provider == "AWS":
         price = fetch_transfer_prices(provider, fromRegion, toRegion, client)
         if price:
-            return price
+            return price[-1]["price"]  # documents are sorted by timestamp, use the latest
         return 0.04 #standard transfer cost for aws
 
+storage_map = {
+    4: "1",
+    8: "2",
+    16: "3",
+    32: "4",
+    64: "6",
+    128: "10",
+    256: "15",
+    512: "20",
+    1024: "30",
+    2048: "40",
+    4096: "50",
+    8192: "60",
+    16384: "70",
+    32768: "80",
+}
+
 def get_storage_skuname(volume, premium, lrs):
     """
         Determines the SKU name for storage based on volume, premium, and redundancy options.
@@ -37,22 +54,6 @@ def get_storage_skuname(volume, premium, lrs):
               - Otherwise, returns "E{number} ZRS".
     """
     number = 1
-    storage_map = {
-        4: "1",
-        8: "2",
-        16: "3",
-        32: "4",
-        64: "6",
-        128: "10",
-        256: "15",
-        512: "20",
-        1024: "30",
-        2048: "40",
-        4096: "50",
-        8192: "60",
-        16384: "70",
-        32768: "80",
-    }
     volume_in_gib = gb_to_gib(volume)
 
     for key in storage_map:
@@ -77,18 +78,36 @@ def get_storage_cost(provider, volume, premium, lrs, client):
           - For AWS, chooses "gp2" for premium storage or "gp3" otherwise.
           - Fetches and returns a list of storage price details for the given provider and SKU.
     """
-    storage_prices = []
+    skuName = get_storage_sku(provider, volume, premium, lrs)
+    if skuName is None:
+        return []
+    return fetch_storage_prices(provider, skuName, client)
+
+
+def get_storage_sku(provider, volume, premium, lrs):
+    """
+        Returns the SKU name get_storage_cost queries for the given options, or None for an unknown provider.
+    """
     if provider == "Azure":
         volume_in_gib = gb_to_gib(volume)
-        skuName = get_storage_skuname(volume_in_gib, premium, lrs)
-        storage_prices = fetch_storage_prices(provider, skuName, client)
-    elif provider == "AWS":
+        return get_storage_skuname(volume_in_gib, premium, lrs)
+    if provider == "AWS":
         if premium:
-            skuName = "gp2"
-        else:
-            skuName = "gp3"
-        storage_prices = fetch_storage_prices(provider, skuName, client)
-    return storage_prices
+            return "gp2"
+        return "gp3"
+    return None
+
+
+def get_storage_skus(provider):
+    """
+        Returns every SKU name get_storage_cost can query for a provider.
+    """
+    if provider == "Azure":
+        return [f"{tier}{number} {redundancy}"
+                for tier in ("P", "E") for redundancy in ("LRS", "ZRS") for number in storage_map.values()]
+    if provider == "AWS":
+        return ["gp2", "gp3"]
+    return []
 
 
 def calculate_storage_price(price_region, duration, provider):
@@ -0,0 +1,69 @@
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """
+    Collects the wall-clock time of named phases with the monotonic perf_counter clock.
+
+    Where:
+      - phase(name) is a context manager, the time of repeated phases with the same name is summed.
+      - record(name, value) stores a size of the model, e.g. the number of feasible keys.
+      - memory: optional profiler whose phase(name) context manager is entered with every phase,
+        e.g. the tracemalloc profile of optimize_service/memory_profile.py.
+    """
+
+    def __init__(self, memory=None):
+        self.phases = {}
+        self.sizes = {}
+        self.memory = memory
+
+    @contextmanager
+    def phase(self, name):
+        if self.memory is not None:
+            with self.memory.phase(name), self._timed(name):
+                yield
+        else:
+            with self._timed(name):
+                yield
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start)
+
+    def record(self, name, value):
+        self.sizes[name] = value
+
+    def merge(self, other, prefix=""):
+        """
+        Adds the phases and sizes of another timer, e.g. one that timed a concurrent task, under prefix.
+        """
+        for name, seconds in other.phases.items():
+            self.phases[prefix + name] = self.phases.get(prefix + name, 0.0) + seconds
+        for name, value in other.sizes.items():
+            self.sizes[prefix + name] = value
+
+    def as_dict(self):
+        """
+        Returns the phases in milliseconds and the recorded model sizes.
+        """
+        return {
+            "phases_ms": {name: seconds * 1000 for name, seconds in self.phases.items()},
+            "model_size": dict(self.sizes),
+        }
+
+
+@contextmanager
+def timed_phase(timer, name):
+    """
+    Times a phase if a PhaseTimer is given, otherwise does nothing.
+    """
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
@@ -1,18 +1,86 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from CloudSurvey_Package.optimization_solution import *
-from dotenv import load_dotenv
-import os
-import joblib
-from mipsDb_new.guessMIPS import predict_mips
-import requests
+from CloudSurvey_Package.timing import PhaseTimer, timed_phase
+from CloudSurvey_Package.db_clients import get_compute_client, get_storage_client, health_check, reset_after_fork
+from mipsDb_new.model_registry import ModelNotLoaded, get_registry
+from optimize_service.pipeline import predict_job_mips, predict_jobs_mips, simulate_instances, optimization_job, \
+    InvalidRequest, normalize_request, simulate_job_instances, select_instances
+from optimize_service.job_store import JobStore
+from optimize_service.jobs import JobManager, JobQueueFull
+from optimize_service.memory_profile import MemoryProfiler
+from optimize_service.metrics import after_fork as metrics_after_fork, observe_timer, render_metrics
+from optimize_service.price_snapshot import PriceSnapshot
+from optimize_service.result_cache import ResultCache
+from optimize_service.runtime_model import get_runtime_model
+from optimize_service.simulation_cache import get_simulation_cache
+from optimize_service.single_flight import SingleFlight
+from optimize_service.warmup import TrafficStats, WarmUp
+import json
 import logging
-
-load_dotenv()
-connection_string_storage = os.getenv('MONGODB_URI2')
-connection_string_compute = os.getenv('MONGODB_URI')
+import os
 
 app = Flask(__name__)
 
+# Load encoder and MIPS model once at startup; requests share the resident snapshot.
+# Missing pickles do not stop the import: /ready answers 503 until the watcher (or a request) has loaded them.
+model_registry = get_registry()
+model_registry.try_load()
+model_registry.start_watcher()
+
+# Pooled database clients, shared by all requests
+get_compute_client()
+get_storage_client()
+
+# Spot, storage and transfer prices of all providers, loaded by the warm-up (before the fork of the gunicorn
+# workers). GET /ready answers 200 once it is done, requests before use the databases.
+price_snapshot = PriceSnapshot()
+traffic_stats = TrafficStats()
+warm_up = WarmUp(price_snapshot, traffic_stats)
+warm_up.start()
+
+# Responses of identical requests, dropped when new prices are ingested
+result_cache = ResultCache(batch_lookup=price_snapshot.current_batch)
+
+# Identical requests that arrive while one of them is computed wait for its result
+in_flight = SingleFlight()
+
+# Opt-in tracemalloc profile of the phases of sampled requests (MEMORY_PROFILE=1), see GET /debug/memory
+memory_profiler = MemoryProfiler()
+
+def prepare_job(data):
+    model_snapshot = model_registry.current()
+    # The result is cached under the model the job was prepared with (usually the one of the submit)
+    data['model_version'] = model_snapshot.version
+    return prepare_optimization(data, model_snapshot)
+
+def store_job_result(data, result):
+    # Keyed by the model version and ingestion batch the job was computed with, not those at its end
+    cache_result(normalize_request(data, data['model_version']), result, data['result_cache_batch'])
+
+def cache_result(cache_key, result, batch):
+    # A result whose time budget ran out before it was proven optimal is not cached, neither is a result
+    # computed on prices older than the current ingestion batch (batch: result_cache.batch() before the computation)
+    if result.get("status") == "Optimal":
+        result_cache.put(cache_key, result, batch=batch)
+
+# Submit-and-poll mode for optimizations that take longer than the gateway timeout
+job_manager = JobManager(prepare_job, on_result=store_job_result, store=JobStore())
+
+def after_fork():
+    # Called in every worker process forked by gunicorn (see gunicorn.conf.py)
+    reset_after_fork()
+    # New pools of this worker, also reported by /health
+    get_compute_client()
+    get_storage_client()
+    get_simulation_cache().after_fork()
+    model_registry.after_fork()
+    price_snapshot.after_fork()
+    traffic_stats.after_fork()
+    job_manager.after_fork()
+    warm_up.after_fork()
+    memory_profiler.after_fork()
+    metrics_after_fork()
+
 """
 instance_list = [["FX48-12mds v2 Spot", 3600],["E2s v5 Spot", 3000]]
 
@@ -24,64 +92,306 @@ parallelization_set = [1, 2, 4]
 def optimize():
     # Extract parameters from the HTTP request
     data = request.json
+    if data.get('async'):
+        return submit_job(data)
+    memory = memory_profiler.start(requested=bool(data.get('memory_profile')))
+    timer = PhaseTimer(memory=memory)
+
+    try:
+        with timer.phase("total"):
+            result = optimize_request(data, timer)
+    finally:
+        memory_profiler.finish(memory, timer, request=data)
+    observe_timer(timer)
+
+    # Return the result as a JSON response, with the phase timings if requested
+    if data.get('timings'):
+        return jsonify({"result": result, "timings": timer.as_dict()})
+    return jsonify({"result": result})
+
+def submit_job(data):
+    # Answered right away if cached, otherwise queued and polled at /jobs/<id>
+    model_snapshot = model_registry.current()
+    try:
+        cached_result = result_cache.get(normalize_request(data, model_snapshot.version))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Missing or invalid job parameter: {e}"}), 400
+    if cached_result is not None:
+        return jsonify({"result": cached_result})
 
-    provider = data['provider']
-    instance_list = data['instance_list']
-    konfidenzgrad = data['konfidenzgrad']
-    volume = data['volume']
-    premium = data['premium']
-    lrs = data['lrs']
-    parallelization = data['parallelization']
+    try:
+        job_id = job_manager.submit(dict(data, result_cache_batch=result_cache.batch(),
+                                         model_version=model_snapshot.version))
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
 
-    encoder = joblib.load("mipsDb_new/partition_encoder.pkl")
-    partition_columns = list(encoder.get_feature_names_out(['partition']))
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.as_dict())
 
-    partition = data['partition']
-    nnodes = data['nnodes']
-    ncpus = data['ncpus']
-    io_usage = data['io_usage']
-    memory_usage = data['memory_usage']
-    data_input_size = data['data_input_size']
-    data_output_size = data['data_output_size']
-    elapsed_time = data['elapsed_time']
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.as_dict())
 
-    model_path = "mipsDb_new/mips_model.pkl"
+def optimize_request(data, timer):
+    model_snapshot = model_registry.current()
+    with timer.phase("cache_lookup"):
+        cache_key = normalize_request(data, model_snapshot.version)
+        cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
 
-    mips = predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, data_input_size, data_output_size,
-                 elapsed_time, encoder, partition_columns)
+    result, coalesced = in_flight.do(cache_key, compute_optimization, data, model_snapshot, cache_key, timer)
+    if coalesced:
+        logging.info("Answered /optimize from an identical request in flight")
+    return result
 
+def prepare_optimization(data, model_snapshot, timer=None):
+    # MIPS prediction and simulation, returns the keyword arguments of main_optimization
+    with timed_phase(timer, "predict_mips"):
+        mips = predict_job_mips(data, model_snapshot)
 
-    mips = int(mips)
+    with timed_phase(timer, "cloudsim"):
+        filtered_instances = simulate_job_instances(data['provider'], mips)
 
+    job = optimization_job(data, select_instances(filtered_instances))
+    job['price_data'] = snapshot_price_data(job)
+    return job
+
+def snapshot_price_data(job, fetch_missing=True):
+    traffic_stats.record(job['provider'], job['instance_list'])
+    return price_snapshot.price_data(job['provider'], job['instance_list'], job['volume'], job['premium'], job['lrs'],
+                                     fetch_missing=fetch_missing)
+
+def compute_optimization(data, model_snapshot, cache_key, timer):
     logging.basicConfig(level=logging.INFO)
 
-    url_simulate = "http://192.168.178.28:8080/simulate/" + provider.lower() + "?cloudletLength=" + str(mips)
-    instances = requests.get(url_simulate)
+    batch = result_cache.batch()
+    result = main_optimization(**prepare_optimization(data, model_snapshot, timer), timer=timer)
 
-    instances2 = instances.json()
+    logging.info(result)
+    cache_result(cache_key, result, batch)
+    return result
+
+@app.route('/optimize/stream', methods=['POST'])
+def optimize_stream():
+    # Same parameters as /optimize, answered as newline-delimited JSON
+    data = request.json
+    if data['provider'].lower() == 'all':
+        return jsonify({"error": "Streaming supports a single provider, use /optimize for provider 'all'"}), 400
 
-    instance_list = [[item['instance_name'], item['execution_time']] for item in instances2]
+    model_snapshot = model_registry.current()
+    mips = predict_job_mips(data, model_snapshot)
+    filtered_instances = select_instances(simulate_instances(data['provider'], mips))
+    job = optimization_job(data, filtered_instances)
 
-    filtered_instances = [
-        item for item in instance_list if not any(
-            str(value).lower() == 'nan' for value in item
-        )
+    def generate():
+        yield json.dumps({"type": "simulation", "mips": mips, "instances": len(filtered_instances)}) + "\n"
+        for line in stream_optimization(
+            job['provider'],
+            job['instance_list'],
+            job['konfidenzgrad'],
+            job['volume'],
+            job['premium'],
+            job['lrs'],
+            job['parallelization'],
+            price_data=snapshot_price_data(job),
+        ):
+            yield json.dumps(line) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/optimize/batch', methods=['POST'])
+def optimize_batch():
+    # Array of job specs in the input_parameter.json format
+    jobs = request.json
+    if not isinstance(jobs, list):
+        return jsonify({"error": "Expected a JSON array of job specs"}), 400
+
+    # 1) Answer repeated jobs from the result cache
+    model_snapshot = model_registry.current()
+    try:
+        cache_keys = [normalize_request(job, model_snapshot.version) for job in jobs]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Missing or invalid job parameter: {e}"}), 400
+    results = [result_cache.get(cache_key) for cache_key in cache_keys]
+
+    # Identical jobs of the batch are optimized once
+    first_index = {}
+    for index, result in enumerate(results):
+        if result is None:
+            first_index.setdefault(cache_keys[index], index)
+    missing = list(first_index.values())
+    missing_jobs = [jobs[index] for index in missing]
+
+    batch = result_cache.batch()
+
+    # 2) One vectorized MIPS prediction for all remaining jobs
+    try:
+        mips_values = predict_jobs_mips(missing_jobs, model_snapshot)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 3) One CloudSim call per distinct (provider, cloudlet length)
+    simulations = {}
+    for job, mips in zip(missing_jobs, mips_values):
+        simulation_key = (job['provider'].lower(), mips)
+        if simulation_key not in simulations:
+            simulations[simulation_key] = simulate_job_instances(job['provider'], mips)
+
+    # 4) Optimize the remaining jobs on shared price data
+    optimization_jobs = [
+        optimization_job(job, select_instances(simulations[(job['provider'].lower(), mips)]))
+        for job, mips in zip(missing_jobs, mips_values)
     ]
+    for job in optimization_jobs:
+        # Spot prices missing in the snapshot are queried once for the whole batch
+        job['price_data'] = snapshot_price_data(job, fetch_missing=False)
+    timer = PhaseTimer()
+    for index, result in zip(missing, main_optimization_batch(optimization_jobs, timer=timer)):
+        results[index] = result
+        cache_result(cache_keys[index], result, batch)
 
-    result = main_optimization(
-        provider,
-        filtered_instances[:1],
-        konfidenzgrad,
-        volume,
-        premium,
-        lrs,
-        parallelization,
-    )
+    for index, cache_key in enumerate(cache_keys):
+        if results[index] is None:
+            results[index] = results[first_index[cache_key]]
+    observe_timer(timer)
 
-    logging.info(result)
+    return jsonify({"results": [{"result": result} for result in results]})
+
+@app.route('/optimize/joint', methods=['POST'])
+def optimize_joint():
+    # Job specs in the input_parameter.json format with optional deadline_hours and storage_group,
+    # scheduled together under per-region instance limits
+    data = request.json
+    jobs = data.get('jobs') if isinstance(data, dict) else None
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify({"error": "Expected a non-empty 'jobs' array of job specs"}), 400
+    providers = {str(job.get('provider', '')).lower() for job in jobs}
+    if len(providers) != 1 or 'all' in providers:
+        return jsonify({"error": "All jobs of a joint schedule need the same single provider"}), 400
 
-    # Return the result as a JSON response
+    timer = PhaseTimer()
+    with timer.phase("total"):
+        # 1) One vectorized MIPS prediction and one CloudSim call per distinct cloudlet length
+        model_snapshot = model_registry.current()
+        try:
+            with timer.phase("predict_mips"):
+                mips_values = predict_jobs_mips(jobs, model_snapshot)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": f"Missing or invalid job parameter: {e}"}), 400
+        simulations = {}
+        with timer.phase("cloudsim"):
+            for job, mips in zip(jobs, mips_values):
+                if mips not in simulations:
+                    simulations[mips] = simulate_job_instances(job['provider'], mips)
+
+        # 2) One joint model on the price snapshot
+        try:
+            optimization_jobs = []
+            for job, mips in zip(jobs, mips_values):
+                scheduled_job = optimization_job(job, select_instances(simulations[mips]))
+                scheduled_job['price_data'] = snapshot_price_data(scheduled_job)
+                for key in ('deadline_hours', 'storage_group'):
+                    if job.get(key) is not None:
+                        scheduled_job[key] = job[key]
+                optimization_jobs.append(scheduled_job)
+        except KeyError as e:
+            return jsonify({"error": f"Missing or invalid job parameter: {e}"}), 400
+        try:
+            result = main_joint_optimization(
+                jobs[0]['provider'],
+                optimization_jobs,
+                region_limits=data.get('region_limits'),
+                default_region_limit=data.get('default_region_limit'),
+                shared_storage=data.get('shared_storage', False),
+                time_limit=data.get('time_limit'),
+                solver=data.get('solver'),
+                max_storage_assignments=data.get('max_storage_assignments'),
+                timer=timer,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 422
+    observe_timer(timer)
+
+    if data.get('timings'):
+        return jsonify({"result": result, "timings": timer.as_dict()})
     return jsonify({"result": result})
 
+@app.route('/prices/<provider>/<instance_type>', methods=['GET'])
+@app.route('/prices/<provider>/<instance_type>/<region>', methods=['GET'])
+def price_profile(provider, instance_type, region=None):
+    # 24-hour mean/min/max spot price curves, answered with 304 while the ingestion batch is unchanged
+    if provider.lower() not in ('aws', 'azure'):
+        return jsonify({"error": "Provider must be 'aws' or 'azure'"}), 400
+    profile, etag = price_snapshot.price_profile(normalize_provider(provider), instance_type, region)
+    if profile is None:
+        return jsonify({"error": "No spot prices for this instance type and region"}), 404
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(profile)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/debug/memory', methods=['GET'])
+def memory_profiles():
+    # Profiles of this worker process, the request with the highest peak first
+    if not memory_profiler.enabled:
+        return jsonify({"error": "Memory profiling is disabled, set MEMORY_PROFILE=1"}), 404
+    return jsonify(dict(memory_profiler.status(limit=request.args.get('limit', type=int)), worker_pid=os.getpid()))
+
+@app.route('/status', methods=['GET'])
+def status():
+    # Caches, single flight and jobs are kept per worker process, worker_pid tells which one answered
+    return jsonify({
+        "worker_pid": os.getpid(),
+        "model": model_registry.status(),
+        "result_cache": result_cache.stats(),
+        "simulation_cache": get_simulation_cache().stats(),
+        "runtime_model": get_runtime_model().stats(),
+        "single_flight": in_flight.stats(),
+        "jobs": job_manager.stats(),
+        "price_snapshot": price_snapshot.status(),
+        "warm_up": warm_up.status(),
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Phase durations and model sizes in the Prometheus text format, summed over all workers under gunicorn
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.errorhandler(ModelNotLoaded)
+def model_not_loaded(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.errorhandler(InvalidRequest)
+def invalid_request(e):
+    return jsonify({"error": f"Missing or invalid job parameter: {e}"}), 400
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Readiness for the load balancer: 503 until the MIPS model is loaded and the warm-up has filled the price caches
+    status = dict(warm_up.status(), model_loaded=model_registry.loaded)
+    return jsonify(status), 200 if warm_up.ready and model_registry.loaded else 503
+
+@app.route('/health', methods=['GET'])
+def health():
+    databases = health_check()
+    # No database checked (e.g. no client created yet) is not healthy
+    healthy = bool(databases) and all(database["ok"] for database in databases.values())
+    return jsonify({"healthy": healthy, "databases": databases}), 200 if healthy else 503
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5087)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5087)
@@ -0,0 +1,233 @@
+"""
+Asynchronous (ASGI) variant of app.py.
+
+The blocking steps of one request are started as soon as their inputs are known:
+  - the CloudSim simulation, the storage price query and the transfer map are started together,
+  - the spot price aggregation starts when CloudSim has returned the instance list,
+  - prices in the price snapshot (loaded by the warm-up as in app.py) are not queried at all,
+  - building the cost maps and the CBC solve (CPU-bound) run in a process pool.
+Blocking calls (requests, pymongo) run in a thread pool, so one worker serves many requests in flight.
+
+Start with:
+    hypercorn app_async:app --bind 0.0.0.0:5088
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from quart import Quart, request, jsonify
+
+from CloudSurvey_Package.db_clients import close_all, get_compute_client, get_storage_client, health_check
+from CloudSurvey_Package.db_operations import get_mean_spot_price
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_solution import PROVIDERS, anytime_optimization, build_cost_maps, \
+    build_cost_maps_all, normalize_provider, solve_cost_maps, solve_cost_maps_all
+from CloudSurvey_Package.storage_prices import get_storage_cost
+from mipsDb_new.model_registry import ModelNotLoaded, get_registry
+from optimize_service.pipeline import predict_job_mips, select_instances, simulate_instances
+from optimize_service.price_snapshot import PriceSnapshot
+from optimize_service.warmup import TrafficStats, WarmUp
+
+load_dotenv()
+IO_THREADS = int(os.getenv('IO_THREADS', 32))
+SOLVER_WORKERS = int(os.getenv('SOLVER_WORKERS', os.cpu_count() or 1))
+
+app = Quart(__name__)
+
+model_registry = get_registry()
+
+# Spot, storage and transfer prices of all providers, loaded in the background after the start
+price_snapshot = PriceSnapshot()
+traffic_stats = TrafficStats()
+warm_up = WarmUp(price_snapshot, traffic_stats)
+
+
+@app.before_serving
+async def startup():
+    app.io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="optimize-io")
+    app.solver_executor = ProcessPoolExecutor(max_workers=SOLVER_WORKERS)
+    app.client_compute = get_compute_client()
+    app.client_storage = get_storage_client()
+
+    # Missing pickles do not stop the startup, /ready answers 503 until they are loaded
+    model_registry.try_load()
+    model_registry.start_watcher()
+    warm_up.start()
+
+
+@app.after_serving
+async def shutdown():
+    app.solver_executor.shutdown(cancel_futures=True)
+    app.io_executor.shutdown(cancel_futures=True)
+    close_all()
+
+
+def build_and_solve(provider, instance_list, volume, premium, lrs, parallelization,
+                    pricing_list, storage_price_list, transfer_cost_map, top_k=None, time_budget_ms=None,
+                    pareto=False):
+    """
+    Builds the cost maps from pre-fetched price data and solves the model.
+    Runs in the solver process pool, so it must not touch the database clients.
+    """
+    if time_budget_ms:
+        price_data = {"pricing_list": pricing_list, "storage_price_list": storage_price_list,
+                      "transfer_cost_map": transfer_cost_map}
+        return anytime_optimization(provider, instance_list, volume, premium, lrs, parallelization,
+                                    float(time_budget_ms), price_data=price_data)
+    compute_cost_map, storage_cost_map, transfer_cost_map = build_cost_maps(
+        provider, instance_list, volume, premium, lrs, parallelization, None, None,
+        pricing_list=pricing_list, storage_price_list=storage_price_list, transfer_cost_map=transfer_cost_map,
+    )
+    return solve_cost_maps(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=top_k, pareto=pareto)
+
+
+def build_and_solve_all(instance_lists, volume, premium, lrs, parallelization, price_data, top_k=None,
+                        time_budget_ms=None, pareto=False):
+    """
+    build_and_solve for provider "all" with the pre-fetched price data of every provider.
+    """
+    if time_budget_ms:
+        return anytime_optimization("all", instance_lists, volume, premium, lrs, parallelization,
+                                    float(time_budget_ms), price_data=price_data)
+    compute_cost_map, storage_cost_map, transfer_cost_map = build_cost_maps_all(
+        instance_lists, volume, premium, lrs, parallelization, None, None, price_data=price_data,
+    )
+    return solve_cost_maps_all(compute_cost_map, storage_cost_map, transfer_cost_map, top_k=top_k, pareto=pareto)
+
+
+def run_blocking(function, *args):
+    """
+    Runs a blocking function in the I/O thread pool and returns an awaitable.
+    """
+    return asyncio.get_running_loop().run_in_executor(app.io_executor, function, *args)
+
+
+async def fetch_provider_data(provider, mips, volume, premium, lrs):
+    """
+        Fetches everything one provider needs for the optimization.
+
+        Where:
+          - CloudSim, the storage prices and the transfer map are fetched concurrently.
+          - The compute prices are fetched once the simulated instance list is known.
+          - Prices in the price snapshot are taken from there, only the rest is queried.
+
+        Returns:
+          (instance_list, {"pricing_list", "storage_price_list", "transfer_cost_map"})
+    """
+    # 1) Independent fetches: simulation, storage prices and transfer map (unless in the snapshot)
+    simulation = run_blocking(simulate_instances, provider, mips)
+    snapshot_data = await run_blocking(price_snapshot.price_data, provider, [], volume, premium, lrs) or {}
+    storage_prices = None
+    if "storage_price_list" not in snapshot_data:
+        storage_prices = run_blocking(get_storage_cost, provider, volume, premium, lrs, app.client_storage)
+    transfer_map = None
+    if "transfer_cost_map" not in snapshot_data:
+        transfer_map = run_blocking(fill_transfer_cost_map, provider, app.client_storage)
+
+    # 2) Compute prices depend on the simulated instances
+    filtered_instances = select_instances(await simulation)
+    traffic_stats.record(provider, filtered_instances)
+    pricing_data = await run_blocking(price_snapshot.price_data, provider, filtered_instances)
+    if pricing_data is not None:
+        pricing_list = pricing_data["pricing_list"]
+    else:
+        instance_types = [item[0] for item in filtered_instances]
+        pricing_list = await run_blocking(get_mean_spot_price, app.client_compute, instance_types, provider)
+    return filtered_instances, {
+        "pricing_list": pricing_list,
+        "storage_price_list": (await storage_prices if storage_prices is not None
+                               else snapshot_data["storage_price_list"]),
+        "transfer_cost_map": await transfer_map if transfer_map is not None else snapshot_data["transfer_cost_map"],
+    }
+
+
+async def main_optimization_async(provider, mips, volume, premium, lrs, parallelization, top_k=None,
+                                  time_budget_ms=None, pareto=False):
+    """
+        Async counterpart of the optimize pipeline of app.py.
+
+        Where:
+          - The price data is fetched with fetch_provider_data, for provider "all" for both providers at once.
+          - The cost maps are built and solved in the solver process pool. With time_budget_ms the
+            deadline-bounded anytime_optimization runs there instead, its budget starts in the pool.
+
+        Returns:
+          The response dictionary of solve_cost_maps.
+    """
+    provider = normalize_provider(provider)
+    loop = asyncio.get_running_loop()
+
+    if provider == "all":
+        provider_data = await asyncio.gather(
+            *(fetch_provider_data(p, mips, volume, premium, lrs) for p in PROVIDERS)
+        )
+        instance_lists = {p: instances for p, (instances, _) in zip(PROVIDERS, provider_data)}
+        price_data = {p: data for p, (_, data) in zip(PROVIDERS, provider_data)}
+        return await loop.run_in_executor(
+            app.solver_executor, build_and_solve_all, instance_lists, volume, premium, lrs, parallelization,
+            price_data, top_k, time_budget_ms, pareto
+        )
+
+    filtered_instances, price_data = await fetch_provider_data(provider, mips, volume, premium, lrs)
+
+    # 3) Cost maps and solve in the solver pool
+    return await loop.run_in_executor(
+        app.solver_executor, build_and_solve, provider, filtered_instances, volume, premium, lrs, parallelization,
+        price_data["pricing_list"], price_data["storage_price_list"], price_data["transfer_cost_map"], top_k,
+        time_budget_ms, pareto
+    )
+
+
+@app.route('/optimize', methods=['POST'])
+async def optimize():
+    data = await request.get_json()
+
+    model_snapshot = model_registry.current()
+    mips = await run_blocking(predict_job_mips, data, model_snapshot)
+
+    result = await main_optimization_async(
+        data['provider'],
+        mips,
+        data['volume'],
+        data['premium'],
+        data['lrs'],
+        data['parallelization'],
+        top_k=data.get('top_k'),
+        time_budget_ms=data.get('time_budget_ms'),
+        pareto=bool(data.get('pareto')),
+    )
+
+    logging.info(result)
+
+    return jsonify({"result": result})
+
+
+@app.errorhandler(ModelNotLoaded)
+async def model_not_loaded(e):
+    return jsonify({"error": str(e)}), 503
+
+
+@app.route('/ready', methods=['GET'])
+async def ready():
+    ready = warm_up.ready and model_registry.loaded
+    return jsonify(dict(warm_up.status(), model_loaded=model_registry.loaded)), 200 if ready else 503
+
+
+@app.route('/status', methods=['GET'])
+async def status():
+    return jsonify({"model": model_registry.status(), "price_snapshot": price_snapshot.status()})
+
+
+@app.route('/health', methods=['GET'])
+async def health():
+    databases = await run_blocking(health_check)
+    # No database checked (e.g. no client created yet) is not healthy
+    healthy = bool(databases) and all(database["ok"] for database in databases.values())
+    return jsonify({"healthy": healthy, "databases": databases}), 200 if healthy else 503
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5088)
@@ -0,0 +1,73 @@
+import argparse
+import json
+import random
+import time
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_problem import all_candidates, dominant_candidates
+from CloudSurvey_Package.optimization_solution import build_cost_maps
+from benchmarks.instance_scaling import DEFAULT_INSTANCE_COUNTS, DEFAULT_PARALLELIZATION, \
+    synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+
+CANDIDATE_BUILDERS = {"all": all_candidates, "dominant": dominant_candidates}
+
+
+def run(instance_count, parallelization, transfer_cost_map, seed):
+    """
+    Builds the candidate chains of the unpruned (all_candidates) and the pruned model (dominant_candidates)
+    for instance_count synthetic Azure instance types.
+
+    Returns:
+      A dictionary with the number of chains ("<builder>_chains") and the construction time ("<builder>_ms")
+      of both builders.
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_list = synthetic_instance_list(instance_count, rng)
+    cost_maps = build_cost_maps(
+        "Azure", instance_list, 100, False, True, parallelization, None, None,
+        pricing_list=synthetic_pricing_list(instance_list, regions, rng),
+        storage_price_list=synthetic_storage_price_list(regions, rng),
+        transfer_cost_map=transfer_cost_map,
+    )
+
+    result = {"instances": instance_count, "compute_keys": len(cost_maps[0])}
+    for name, builder in CANDIDATE_BUILDERS.items():
+        start = time.perf_counter()
+        feasible_keys, _ = builder(*cost_maps)
+        result[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+        result[f"{name}_chains"] = len(feasible_keys)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Candidate construction time over the number of feasible (r1, r2, i, s, p) chains.")
+    parser.add_argument("--instances", type=int, nargs="+", default=DEFAULT_INSTANCE_COUNTS)
+    parser.add_argument("--parallelization", type=int, nargs="+", default=DEFAULT_PARALLELIZATION)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # Azure transfer prices are computed from the region pairs, no database is needed
+    transfer_cost_map = fill_transfer_cost_map("Azure", None)
+
+    results = []
+    for instance_count in args.instances:
+        result = run(instance_count, args.parallelization, transfer_cost_map, args.seed)
+        results.append(result)
+        # A constant time per chain means the construction is linear in the number of feasible chains
+        print("  ".join([f"{instance_count:>5} instances"] + [
+            f"{name} {result[f'{name}_chains']:>8} chains {result[f'{name}_ms']:8.1f} ms "
+            f"({result[f'{name}_ms'] * 1000 / max(result[f'{name}_chains'], 1):5.2f} us/chain)"
+            for name in CANDIDATE_BUILDERS
+        ]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
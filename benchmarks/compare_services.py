@@ -0,0 +1,93 @@
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+def timed_post(session, url, payload):
+    """
+    Sends one request and returns (latency in seconds, HTTP status code or None on error).
+    """
+    start = time.perf_counter()
+    try:
+        response = session.post(url, json=payload)
+        status = response.status_code
+    except requests.RequestException:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def run_load(url, payload, requests_total, concurrency):
+    """
+    Sends requests_total POST requests to url with the given number of concurrent clients.
+    payload is one request body or a list of bodies that is sent round-robin.
+
+    Returns:
+      A dictionary with throughput (requests per second), p50/p90/p99 latency in milliseconds
+      and the number of failed requests.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    payloads = payload if isinstance(payload, list) else [payload]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda index: timed_post(session, url, payloads[index % len(payloads)]),
+                                    range(requests_total)))
+    wall_time = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, status in results if status == 200]) * 1000
+    errors = sum(1 for _, status in results if status != 200)
+    if latencies.size == 0:
+        return {"url": url, "concurrency": concurrency, "requests": requests_total, "errors": errors}
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": requests_total,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall_time,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def print_table(rows):
+    # Rows of benchmarks/load_test.py name their service, the others are labelled with the url
+    print(f"{'service':40} {'conc':>5} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    for row in rows:
+        label = row.get("service", row["url"])
+        if "p50_ms" not in row:
+            print(f"{label:40} {row['concurrency']:>5} {'-':>8} {'-':>9} {'-':>9} {'-':>9} {row['errors']:>6}")
+            continue
+        print(f"{label:40} {row['concurrency']:>5} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare p50/p99 latency of the Flask and the async optimize service.")
+    parser.add_argument("--flask-url", default="http://127.0.0.1:5087/optimize")
+    parser.add_argument("--async-url", default="http://127.0.0.1:5088/optimize")
+    parser.add_argument("--input", default="input_parameter.json", help="Request body to send")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    with open(args.input, "r") as f:
+        payload = json.load(f)
+
+    rows = []
+    for concurrency in args.concurrency:
+        for url in (args.flask_url, args.async_url):
+            rows.append(run_load(url, payload, args.requests, concurrency))
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
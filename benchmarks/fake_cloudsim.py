@@ -0,0 +1,100 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Synthetic instance catalogue: instance name -> MIPS rating of the simulated VM
+AZURE_INSTANCES = {
+    "E2s v5 Spot": 20000,
+    "D4s v5 Spot": 40000,
+    "F8s v2 Spot": 80000,
+    "FX48-12mds v2 Spot": 120000,
+}
+AWS_INSTANCES = {
+    "m5.large": 20000,
+    "c5.xlarge": 40000,
+    "c5.2xlarge": 80000,
+    "m5.8xlarge": 160000,
+}
+INSTANCES = {"azure": AZURE_INSTANCES, "aws": AWS_INSTANCES}
+
+
+def simulate(provider, cloudlet_length):
+    """
+        Answers like GET /simulate/<provider> of the CloudSim REST API.
+
+        Returns:
+          A list of {"instance_name", "execution_time"} entries, the execution time in seconds is
+          cloudlet_length / MIPS rating, so it is deterministic for one cloudlet length.
+    """
+    return [
+        {"instance_name": name, "execution_time": cloudlet_length / rating}
+        for name, rating in INSTANCES[provider].items()
+    ]
+
+
+class FakeCloudSimHandler(BaseHTTPRequestHandler):
+    latency = 0.0  # seconds added to every response to model the network and the simulation
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "simulate" or parts[1] not in INSTANCES:
+            self.send_error(404)
+            return
+        try:
+            cloudlet_length = float(parse_qs(url.query)["cloudletLength"][0])
+        except (KeyError, ValueError):
+            self.send_error(400, "cloudletLength is required")
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(simulate(parts[1], cloudlet_length)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_cloudsim(host="127.0.0.1", port=0, latency_ms=0):
+    """
+        Starts the fake simulator in a daemon thread.
+
+        Where:
+          - port: 0 picks a free port.
+          - latency_ms: Delay added to every response.
+
+        Returns:
+          (server, base_url), base_url can be used as CLOUDSIM_URL.
+    """
+    handler = type("Handler", (FakeCloudSimHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-cloudsim", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the CloudSim REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_cloudsim(args.host, args.port, args.latency_ms)
+    print(f"Fake CloudSim listening on {base_url} (CLOUDSIM_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
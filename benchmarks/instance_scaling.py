@@ -0,0 +1,154 @@
+import argparse
+import json
+import random
+import time
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_problem import optimize
+from CloudSurvey_Package.optimization_solution import ENGINES, anytime_optimization, build_cost_maps, solve_cost_maps
+from CloudSurvey_Package.timing import PhaseTimer
+
+DEFAULT_INSTANCE_COUNTS = [1, 10, 50, 100, 250, 500]
+DEFAULT_PARALLELIZATION = [1, 2, 4, 8]
+# Phases of argmin_optimize and of the PuLP model of optimize
+SOLVER_PHASES = ("cost_tensor", "argmin", "candidate_construction", "model_construction", "solver_setup", "solve")
+
+
+def synthetic_instance_list(count, rng):
+    """
+    count instance types with execution times between a few minutes and two days, like a CloudSim answer.
+    """
+    return [[f"Synthetic{index} v5 Spot", rng.uniform(300, 172800)] for index in range(count)]
+
+
+def synthetic_pricing_list(instance_list, regions, rng):
+    """
+    The result of get_mean_spot_price for the given instances: one mean price per instance, region and hour.
+    """
+    pricing_list = []
+    for instance_type, _ in instance_list:
+        base_price = rng.uniform(0.01, 2.0)
+        for region in regions:
+            region_factor = rng.uniform(0.8, 1.2)
+            for hour in range(24):
+                pricing_list.append({
+                    "instance_type": instance_type,
+                    "region": region,
+                    "hour": hour,
+                    "spot_price": round(base_price * region_factor * rng.uniform(0.7, 1.3), 4),
+                })
+    return pricing_list
+
+
+def synthetic_storage_price_list(regions, rng):
+    """
+    The result of get_storage_cost: one monthly price per region.
+    """
+    return [{"region": region, "price": round(rng.uniform(5, 20), 4)} for region in regions]
+
+
+def run(instance_count, parallelization, transfer_cost_map, seed, unpruned, time_budget_ms=None, engine=None):
+    """
+    Builds the cost maps and solves the model for instance_count synthetic Azure instance types
+    with the given engine of solve_cost_maps.
+
+    Returns:
+      A dictionary with the total latency, the phases of the PhaseTimer in milliseconds and the model size.
+      With unpruned=True the unpruned model is solved as well (solve phases prefixed with "unpruned_").
+      With time_budget_ms the anytime search runs on the same prices ("anytime_ms", "anytime_status", "anytime_gap").
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_list = synthetic_instance_list(instance_count, rng)
+    pricing_list = synthetic_pricing_list(instance_list, regions, rng)
+    storage_price_list = synthetic_storage_price_list(regions, rng)
+
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    compute_cost_map, storage_cost_map, transfer_map = build_cost_maps(
+        "Azure", instance_list, 100, False, True, parallelization, None, None,
+        pricing_list=pricing_list, storage_price_list=storage_price_list, transfer_cost_map=transfer_cost_map,
+        timer=timer,
+    )
+    response = solve_cost_maps(compute_cost_map, storage_cost_map, transfer_map, timer=timer, engine=engine)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    result = {"instances": instance_count, "total_ms": total_ms, "objective": response["objective"]}
+    result.update(timer.as_dict())
+
+    if unpruned:
+        unpruned_timer = PhaseTimer()
+        unpruned_response = optimize(compute_cost_map, storage_cost_map, transfer_map, timer=unpruned_timer,
+                                     prune=False)
+        result["phases_ms"].update(
+            {f"unpruned_{name}": duration for name, duration in unpruned_timer.as_dict()["phases_ms"].items()})
+        result["model_size"].update(
+            {f"unpruned_{name}": size for name, size in unpruned_timer.as_dict()["model_size"].items()})
+        result["unpruned_objective"] = unpruned_response["objective"]
+
+    if time_budget_ms:
+        anytime_timer = PhaseTimer()
+        start = time.perf_counter()
+        anytime = anytime_optimization(
+            "Azure", instance_list, 100, False, True, parallelization, time_budget_ms,
+            price_data={"pricing_list": pricing_list, "storage_price_list": storage_price_list,
+                        "transfer_cost_map": transfer_cost_map},
+            timer=anytime_timer,
+        )
+        result["anytime_ms"] = (time.perf_counter() - start) * 1000
+        result["anytime_status"] = anytime["status"]
+        result["anytime_gap"] = anytime["gap"]
+        result["anytime_objective"] = anytime["objective"]
+        result["model_size"].update(anytime_timer.as_dict()["model_size"])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency of cost map construction and optimization over the number of instance types.")
+    parser.add_argument("--instances", type=int, nargs="+", default=DEFAULT_INSTANCE_COUNTS)
+    parser.add_argument("--parallelization", type=int, nargs="+", default=DEFAULT_PARALLELIZATION)
+    parser.add_argument("--unpruned-max", type=int, default=10,
+                        help="Also solve the unpruned model up to this many instance types")
+    parser.add_argument("--time-budget-ms", type=float,
+                        help="Also run the anytime search (time_budget_ms of main_optimization) with this budget")
+    parser.add_argument("--engine", choices=ENGINES, help="Engine of solve_cost_maps (default: OPTIMIZE_ENGINE)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # Azure transfer prices are computed from the region pairs, no database is needed
+    transfer_cost_map = fill_transfer_cost_map("Azure", None)
+
+    results = []
+    for instance_count in args.instances:
+        result = run(instance_count, args.parallelization, transfer_cost_map, args.seed,
+                     unpruned=instance_count <= args.unpruned_max, time_budget_ms=args.time_budget_ms,
+                     engine=args.engine)
+        results.append(result)
+
+        phases = result["phases_ms"]
+        sizes = result["model_size"]
+        print(f"{instance_count:>5} instances  total {result['total_ms']:9.1f} ms  "
+              f"compute {phases['fill_compute_cost_map']:8.1f}  storage {phases['fill_storage_cost_map']:7.1f}  "
+              f"solver {sum(phases.get(name, 0) for name in SOLVER_PHASES):8.1f}  "
+              f"feasible keys {sizes['feasible_keys']:>7}")
+        if "unpruned_solve" in phases:
+            unpruned_ms = sum(duration for name, duration in phases.items() if name.startswith("unpruned_"))
+            print(f"{'':>5}            unpruned model {unpruned_ms:9.1f} ms  "
+                  f"variables {sizes['unpruned_variables']:>7}  same objective: "
+                  f"{abs(result['unpruned_objective'] - result['objective']) < 1e-9}")
+        if "anytime_ms" in result:
+            print(f"{'':>5}            anytime search {result['anytime_ms']:9.1f} ms  "
+                  f"{result['anytime_status']}  gap {result['anytime_gap']:.3g}  "
+                  f"pairs {sizes['evaluated_pairs']}/{sizes['candidate_pairs']}  "
+                  f"same objective: {result['anytime_objective'] == result['objective']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
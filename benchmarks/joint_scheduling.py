@@ -0,0 +1,109 @@
+import argparse
+import json
+import random
+import time
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_solution import main_joint_optimization
+from CloudSurvey_Package.solvers import SOLVERS
+from CloudSurvey_Package.timing import PhaseTimer
+from benchmarks.instance_scaling import synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+
+DEFAULT_JOB_COUNTS = [10, 50, 100, 200]
+DEFAULT_PARALLELIZATION = [1, 2, 4]
+
+
+def synthetic_jobs(job_count, instance_types, instances_per_job, parallelization, deadline_hours, rng):
+    """
+    job_count jobs of main_joint_optimization, each with instances_per_job of the instance types and
+    execution times between a quarter and twice the one of the instance type.
+    """
+    return [
+        {
+            "instance_list": [[instance_type, duration * rng.uniform(0.25, 2)]
+                              for instance_type, duration in rng.sample(instance_types, instances_per_job)],
+            "volume": rng.choice([50, 100, 500]),
+            "premium": False,
+            "lrs": True,
+            "parallelization": parallelization,
+            "deadline_hours": deadline_hours,
+        }
+        for _ in range(job_count)
+    ]
+
+
+def run(job_count, args, transfer_cost_map):
+    """
+    Schedules job_count synthetic Azure jobs jointly, with the price data of all jobs given.
+
+    Returns:
+      A dictionary with the total latency, the phases of the PhaseTimer in milliseconds, the model size,
+      the status and the objective.
+    """
+    rng = random.Random(args.seed)
+    regions = constants.azure_regions
+    instance_types = synthetic_instance_list(args.instance_types, rng)
+    # Short jobs, so that hundreds of them compete for the region limits within one day
+    instance_types = [[instance_type, duration / 8] for instance_type, duration in instance_types]
+    pricing_list = synthetic_pricing_list(instance_types, regions, rng)
+    storage_price_list = synthetic_storage_price_list(regions, rng)
+
+    jobs = synthetic_jobs(job_count, instance_types, args.instances_per_job, args.parallelization,
+                          args.deadline_hours, rng)
+    for job in jobs:
+        job["price_data"] = {"pricing_list": pricing_list, "storage_price_list": storage_price_list,
+                             "transfer_cost_map": transfer_cost_map}
+
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    response = main_joint_optimization("Azure", jobs, default_region_limit=args.region_limit,
+                                       shared_storage=args.shared_storage, time_limit=args.time_limit,
+                                       solver=args.solver, timer=timer)
+    result = {"jobs": job_count, "total_ms": (time.perf_counter() - start) * 1000,
+              "status": response["status"], "objective": response["objective"],
+              "peak_instances": max(response["peak_instances"].values(), default=0)}
+    result.update(timer.as_dict())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and model size of the joint schedule over the number of jobs.")
+    parser.add_argument("--jobs", type=int, nargs="+", default=DEFAULT_JOB_COUNTS)
+    parser.add_argument("--instance-types", type=int, default=20, help="Instance types the jobs are simulated on")
+    parser.add_argument("--instances-per-job", type=int, default=4)
+    parser.add_argument("--parallelization", type=int, nargs="+", default=DEFAULT_PARALLELIZATION)
+    parser.add_argument("--region-limit", type=int, default=16,
+                        help="Concurrent instances per region, the same in every region")
+    parser.add_argument("--deadline-hours", type=float, default=30)
+    parser.add_argument("--shared-storage", action="store_true", help="All jobs share one storage region")
+    parser.add_argument("--time-limit", type=float, help="Solver time limit in seconds")
+    parser.add_argument("--solver", choices=SOLVERS, help="Solver backend (default: OPTIMIZE_SOLVER)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # Azure transfer prices are computed from the region pairs, no database is needed
+    transfer_cost_map = fill_transfer_cost_map("Azure", None)
+
+    results = []
+    for job_count in args.jobs:
+        result = run(job_count, args, transfer_cost_map)
+        results.append(result)
+        phases = result["phases_ms"]
+        sizes = result["model_size"]
+        print(f"{job_count:>5} jobs  total {result['total_ms']:9.1f} ms  options {phases['joint_options']:8.1f}  "
+              f"model {phases['joint_model_construction']:8.1f}  solve {phases['joint_solve']:9.1f} "
+              f"(solver setup {phases.get('solver_setup', 0):8.1f})  "
+              f"options {sizes['joint_options']:>7}  constraints {sizes['joint_constraints']:>6}  "
+              f"non-zeros {sizes['joint_nonzeros']:>8}  storage assignments {sizes['joint_storage_assignments']:>4}  "
+              f"{result['status']}  peak {result['peak_instances']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
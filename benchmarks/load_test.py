@@ -0,0 +1,290 @@
+"""
+Reproducible load test of the optimize service on one machine.
+
+Starts a fake CloudSim (benchmarks/fake_cloudsim.py), a price database seeded with
+synthetic prices (benchmarks/synthetic_prices.py) and app.py in this process, then
+drives POST /optimize at the given concurrency levels and reports throughput and
+p50/p90/p99 latency.
+
+Price database:
+  - --mongo-uri mongodb://127.0.0.1:27017 seeds and uses a local mongod, e.g.
+        docker run -d -p 27017:27017 mongo:7
+  - without --mongo-uri an in-process mongomock client is used (pip install mongomock).
+
+The MIPS model must exist (see mipsDb_new/trainModel.py) or be given with --model-path.
+
+With --workers N the service runs under gunicorn (gunicorn.conf.py) with N pre-forked
+workers instead of a single in-process server, to measure how throughput scales with cores.
+
+With --service async (or both) the asyncio service app_async.py is served with hypercorn
+against the same fake CloudSim and prices, to compare it with the Flask service.
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 200
+    python -m benchmarks.load_test --workers 4 --concurrency 4 16 64
+    python -m benchmarks.load_test --service both --cloudsim-latency-ms 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import runpy
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.compare_services import print_table, run_load
+from benchmarks.fake_cloudsim import start_fake_cloudsim
+from benchmarks.synthetic_prices import seed_prices
+
+
+def enable_mongomock_round():
+    """
+    mongomock does not implement the $round aggregation operator used by get_mean_spot_prices_azure.
+    """
+    from mongomock import aggregate
+
+    parse = aggregate._Parser.parse
+
+    def parse_with_round(self, expression):
+        if isinstance(expression, dict) and list(expression) == ["$round"]:
+            value, digits = expression["$round"]
+            return round(self.parse(value), digits)
+        return parse(self, expression)
+
+    aggregate._Parser.parse = parse_with_round
+
+
+def setup_database(args):
+    """
+    Seeds the price database and points the service at it.
+    """
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        os.environ["MONGODB_URI"] = args.mongo_uri
+        os.environ["MONGODB_URI2"] = args.mongo_uri
+        client = MongoClient(args.mongo_uri)
+        return seed_prices(client, days=args.days, seed=args.seed)
+
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("mongomock is not installed, install it or pass --mongo-uri of a local mongod")
+    enable_mongomock_round()
+    client = mongomock.MongoClient()
+    import CloudSurvey_Package.db_clients as db_clients
+    db_clients.MongoClient = lambda uri, **options: client
+    os.environ["MONGODB_URI"] = "mongomock://compute"
+    os.environ["MONGODB_URI2"] = "mongomock://storage"
+    return seed_prices(client, days=args.days, seed=args.seed)
+
+
+def wait_ready(url):
+    """
+    Waits until GET /ready answers 200: the model and the price snapshot of the warm-up are loaded, so the
+    measurement does not include requests that still query the database.
+    """
+    while True:
+        try:
+            if requests.get(url + "/ready", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+
+def start_service(host="127.0.0.1"):
+    """
+    Imports app.py with the prepared environment and serves it in a daemon thread.
+    """
+    from werkzeug.serving import make_server
+    import app
+
+    server = make_server(host, 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="optimize-service", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def start_async_service(host="127.0.0.1"):
+    """
+    Imports app_async.py with the prepared environment and serves it with hypercorn in a daemon thread.
+    Returns (stop function, url) once the service is ready.
+    """
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    import app_async
+
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        port = probe.getsockname()[1]
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    config.accesslog = None
+
+    loop = asyncio.new_event_loop()
+    shutdown = asyncio.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(app_async.app, config, shutdown_trigger=shutdown.wait))
+
+    thread = threading.Thread(target=run, name="optimize-service-async", daemon=True)
+    thread.start()
+
+    url = f"http://{host}:{port}"
+    wait_ready(url)
+
+    def stop():
+        loop.call_soon_threadsafe(shutdown.set)
+        thread.join()
+    return stop, url
+
+
+def serve_gunicorn(bind, workers):
+    from gunicorn.app.base import BaseApplication
+
+    class OptimizeService(BaseApplication):
+        def load_config(self):
+            settings = runpy.run_path("gunicorn.conf.py")
+            for key, value in settings.items():
+                if key in self.cfg.settings:
+                    self.cfg.set(key, value)
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+
+        def load(self):
+            import app
+            return app.app
+
+    OptimizeService().run()
+
+
+def start_gunicorn(workers, host="127.0.0.1", startup_timeout=120):
+    """
+    Serves app.py with gunicorn.conf.py and the given number of workers in a forked child process,
+    which inherits the seeded database. Returns (process, url) once /health answers.
+    """
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        port = probe.getsockname()[1]
+    process = multiprocessing.get_context("fork").Process(target=serve_gunicorn, args=(f"{host}:{port}", workers),
+                                                          daemon=False)
+    process.start()
+
+    url = f"http://{host}:{port}"
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url + "/health", timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    sys.exit("gunicorn did not start")
+
+
+def calibrate_runtime_model():
+    from optimize_service.pipeline import request_simulation
+    from optimize_service.runtime_model import get_runtime_model
+
+    runtime_model = get_runtime_model()
+    for provider in ("azure", "aws"):
+        runtime_model.calibrate(provider, lambda p, length: request_simulation(p, length, drop_nan=False))
+
+
+def request_variants(payload, count):
+    """
+    Builds count distinct requests by shifting elapsed_time, so each one is a separate optimization.
+    """
+    return [dict(payload, elapsed_time=payload["elapsed_time"] + index) for index in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of /optimize against a fake CloudSim and synthetic prices.")
+    parser.add_argument("--mongo-uri", help="Local mongod to seed and use (default: in-process mongomock)")
+    parser.add_argument("--input", default="input_parameter.json", help="Request body template")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--distinct", type=int, default=50, help="Number of distinct request bodies")
+    parser.add_argument("--cloudsim-latency-ms", type=float, default=0, help="Delay of the fake simulator")
+    parser.add_argument("--days", type=int, default=7, help="Days of synthetic spot prices")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--result-cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--simulation-cache", action="store_true", help="Keep the simulation cache enabled")
+    parser.add_argument("--runtime-model", action="store_true",
+                        help="Calibrate the local runtime model against the fake simulator instead of calling it")
+    parser.add_argument("--model-path", help="MIPS model pickle (MIPS_MODEL_PATH)")
+    parser.add_argument("--encoder-path", help="Partition encoder pickle (MIPS_ENCODER_PATH)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Serve with gunicorn and this many workers (default: single in-process server)")
+    parser.add_argument("--service", choices=["flask", "async", "both"], default="flask",
+                        help="app.py (Flask), app_async.py (Quart/hypercorn) or both one after the other")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    # Environment of the service, must be set before app.py is imported
+    _, cloudsim_url = start_fake_cloudsim(latency_ms=args.cloudsim_latency_ms)
+    os.environ["CLOUDSIM_URL"] = cloudsim_url
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ["SIMULATION_CACHE_PATH"] = os.path.join(work_dir, "simulation_cache.db")
+    os.environ["RUNTIME_MODEL_PATH"] = os.path.join(work_dir, "runtime_model.json")
+    os.environ["JOB_STORE_PATH"] = os.path.join(work_dir, "jobs.db")
+    if not args.result_cache:
+        os.environ["RESULT_CACHE_MAX_BYTES"] = "0"
+    if not args.simulation_cache:
+        os.environ["SIMULATION_CACHE_MAX_ENTRIES"] = "0"
+    if args.model_path:
+        os.environ["MIPS_MODEL_PATH"] = args.model_path
+    if args.encoder_path:
+        os.environ["MIPS_ENCODER_PATH"] = args.encoder_path
+
+    print(f"Seeded prices: {setup_database(args)}")
+    print(f"Fake CloudSim: {cloudsim_url}")
+    if args.runtime_model:
+        calibrate_runtime_model()
+
+    with open(args.input, "r") as f:
+        payloads = request_variants(json.load(f), args.distinct)
+
+    services = ["flask", "async"] if args.service == "both" else [args.service]
+    rows = []
+    for service in services:
+        # The price queries print messages such as "No documents found.", keep the report readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            if service == "async":
+                stop, service_url = start_async_service()
+            elif args.workers:
+                server, service_url = start_gunicorn(args.workers)
+                stop = lambda: (server.terminate(), server.join())
+            else:
+                server, service_url = start_service()
+                stop = server.shutdown
+            wait_ready(service_url)
+            service_rows = [run_load(service_url + "/optimize", payloads, args.requests, concurrency)
+                            for concurrency in args.concurrency]
+        stop()
+        for row in service_rows:
+            row["service"] = service
+        rows.extend(service_rows)
+
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+import time
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_problem import compute_duration, dominant_candidates, pareto_chains
+from CloudSurvey_Package.optimization_solution import build_cost_maps
+from benchmarks.instance_scaling import DEFAULT_INSTANCE_COUNTS, DEFAULT_PARALLELIZATION, \
+    synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+
+
+def pairwise_front(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """
+    Reference front of pareto_chains by comparing every pair of chains, O(n^2).
+
+    Returns:
+      The set of (completion_time, total_cost) of the non-dominated chains.
+    """
+    feasible_keys, cost_map_combo = dominant_candidates(compute_cost_map, storage_cost_map, transfer_cost_map)
+    points = [(compute_duration(compute_cost_map[key[1:]]), cost_map_combo[key]) for key in feasible_keys]
+    return {
+        (duration, cost) for duration, cost in points
+        if not any(other_duration <= duration and other_cost <= cost
+                   and (other_duration < duration or other_cost < cost)
+                   for other_duration, other_cost in points)
+    }
+
+
+def run(instance_count, parallelization, transfer_cost_map, seed, pairwise):
+    """
+    Computes the cost / completion time front of instance_count synthetic Azure instance types with
+    pareto_chains and, if pairwise is set, with the pairwise reference.
+
+    Returns:
+      A dictionary with the number of compute keys, the size of the front, the time of the sweep
+      ("sweep_ms") and of the pairwise comparison ("pairwise_ms") and whether both fronts are equal.
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_list = synthetic_instance_list(instance_count, rng)
+    cost_maps = build_cost_maps(
+        "Azure", instance_list, 100, False, True, parallelization, None, None,
+        pricing_list=synthetic_pricing_list(instance_list, regions, rng),
+        storage_price_list=synthetic_storage_price_list(regions, rng),
+        transfer_cost_map=transfer_cost_map,
+    )
+
+    start = time.perf_counter()
+    front = pareto_chains(*cost_maps)
+    result = {"instances": instance_count, "compute_keys": len(cost_maps[0]), "front": len(front),
+              "sweep_ms": (time.perf_counter() - start) * 1000}
+
+    if pairwise:
+        start = time.perf_counter()
+        reference = pairwise_front(*cost_maps)
+        result["pairwise_ms"] = (time.perf_counter() - start) * 1000
+        result["same_front"] = reference == {(chain["completion_time"], chain["total_cost"]) for chain in front}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time of the sort-and-sweep cost / completion time front over the number of instance types.")
+    parser.add_argument("--instances", type=int, nargs="+", default=DEFAULT_INSTANCE_COUNTS)
+    parser.add_argument("--parallelization", type=int, nargs="+", default=DEFAULT_PARALLELIZATION)
+    parser.add_argument("--pairwise-max", type=int, default=50,
+                        help="Also compare every pair of chains up to this many instance types")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # Azure transfer prices are computed from the region pairs, no database is needed
+    transfer_cost_map = fill_transfer_cost_map("Azure", None)
+
+    results = []
+    for instance_count in args.instances:
+        result = run(instance_count, args.parallelization, transfer_cost_map, args.seed,
+                     pairwise=instance_count <= args.pairwise_max)
+        results.append(result)
+        line = (f"{instance_count:>5} instances  {result['compute_keys']:>6} compute keys  front {result['front']:>4}  "
+                f"sweep {result['sweep_ms']:8.1f} ms")
+        if "pairwise_ms" in result:
+            line += f"  pairwise {result['pairwise_ms']:9.1f} ms  same front: {result['same_front']}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import random
+import statistics
+import time
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_solution import ENGINES, build_cost_maps, solve_cost_maps
+from CloudSurvey_Package.timing import PhaseTimer
+from benchmarks.instance_scaling import DEFAULT_INSTANCE_COUNTS, DEFAULT_PARALLELIZATION, \
+    synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+
+# Phases of the engines that build the model and that solve it
+BUILD_PHASES = ("cost_tensor", "candidate_construction", "model_construction", "solver_setup")
+SOLVE_PHASES = ("argmin", "solve")
+
+
+def run(instance_count, parallelization, transfer_cost_map, seed, repeat):
+    """
+    Solves the same cost maps of instance_count synthetic Azure instance types with every engine of solve_cost_maps.
+
+    Returns:
+      A dictionary with the median latency ("<engine>_ms"), the median model build time ("<engine>_build_ms":
+      candidates, sparse matrix and its translation for the solver) and solve time ("<engine>_solve_ms"), the
+      phases of the last run ("<engine>_phases_ms") of every engine, and whether all engines returned the same
+      response.
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_list = synthetic_instance_list(instance_count, rng)
+    cost_maps = build_cost_maps(
+        "Azure", instance_list, 100, False, True, parallelization, None, None,
+        pricing_list=synthetic_pricing_list(instance_list, regions, rng),
+        storage_price_list=synthetic_storage_price_list(regions, rng),
+        transfer_cost_map=transfer_cost_map,
+    )
+
+    result = {"instances": instance_count, "compute_keys": len(cost_maps[0])}
+    responses = {}
+    for engine in ENGINES:
+        latencies, build_times, solve_times = [], [], []
+        for _ in range(repeat):
+            timer = PhaseTimer()
+            start = time.perf_counter()
+            responses[engine] = solve_cost_maps(*cost_maps, timer=timer, engine=engine)
+            latencies.append((time.perf_counter() - start) * 1000)
+            build_times.append(sum(timer.phases.get(name, 0) for name in BUILD_PHASES) * 1000)
+            solve_times.append(sum(timer.phases.get(name, 0) for name in SOLVE_PHASES) * 1000)
+        result[f"{engine}_ms"] = statistics.median(latencies)
+        result[f"{engine}_build_ms"] = statistics.median(build_times)
+        result[f"{engine}_solve_ms"] = statistics.median(solve_times)
+        result[f"{engine}_phases_ms"] = timer.as_dict()["phases_ms"]
+
+    first = responses[ENGINES[0]]
+    result["same_response"] = all(response == first for response in responses.values())
+    result["objective"] = first["objective"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency of the closed-form argmin engine against the model solved with HiGHS and PuLP/CBC "
+                    "on the same cost maps.")
+    parser.add_argument("--instances", type=int, nargs="+", default=DEFAULT_INSTANCE_COUNTS)
+    parser.add_argument("--parallelization", type=int, nargs="+", default=DEFAULT_PARALLELIZATION)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per engine, the median is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # Azure transfer prices are computed from the region pairs, no database is needed
+    transfer_cost_map = fill_transfer_cost_map("Azure", None)
+
+    results = []
+    for instance_count in args.instances:
+        result = run(instance_count, args.parallelization, transfer_cost_map, args.seed, args.repeat)
+        results.append(result)
+        latencies = "  ".join(f"{engine} {result[f'{engine}_ms']:9.2f} ms (build {result[f'{engine}_build_ms']:8.2f}, "
+                              f"solve {result[f'{engine}_solve_ms']:8.2f})" for engine in ENGINES)
+        print(f"{instance_count:>5} instances  {result['compute_keys']:>6} compute keys  {latencies}  "
+              f"same response: {result['same_response']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
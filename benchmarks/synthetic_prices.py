@@ -0,0 +1,99 @@
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.db_operations import record_ingestion_batch
+from benchmarks.fake_cloudsim import AWS_INSTANCES, AZURE_INSTANCES
+
+AZURE_SKU_NUMBERS = ["1", "2", "3", "4", "6", "10", "15", "20", "30", "40", "50", "60", "70", "80"]
+
+
+def spot_price_documents(instances, regions, days, price_field, rng):
+    """
+    One document per instance type, region, hour and day with a price around a per-instance base price.
+    """
+    now = datetime.now(timezone.utc)
+    documents = []
+    for instance_index, instance_type in enumerate(instances):
+        base_price = 0.05 * (instance_index + 1)
+        for region in regions:
+            region_factor = rng.uniform(0.8, 1.2)
+            for day in range(days):
+                for hour in range(24):
+                    documents.append({
+                        "instance_type": instance_type,
+                        "region": region,
+                        "hour": hour,
+                        price_field: round(base_price * region_factor * rng.uniform(0.7, 1.3), 6),
+                        "timestamp": now - timedelta(days=day, hours=23 - hour),
+                    })
+    return documents
+
+
+def seed_prices(client, days=7, seed=1, drop=True):
+    """
+        Writes synthetic spot, storage and transfer prices in the layout the ingestion scripts produce.
+
+        Where:
+          - client: A pymongo (or compatible) client; the compute and storage databases are both written to it.
+          - days: Number of price samples per instance type, region and hour.
+          - seed: Seed of the random prices, equal seeds give equal databases.
+          - drop: Drop the collections before writing.
+
+        AWS transfer prices are not written, so get_transfer_cost uses its default of 0.04 per GB.
+
+        Returns:
+          A dictionary with the number of written documents per collection.
+    """
+    rng = random.Random(seed)
+    collections = {
+        "azure_spot": client["AzureSpotPricesDB"]["SpotPrices"],
+        "aws_spot": client["aws_spot_prices_db"]["aws_spot_prices"],
+        "azure_storage": client["azure_storage_pricing_db"]["StoragePrices"],
+        "aws_storage": client["aws_storage_pricing_db"]["aws_ebs_prices"],
+    }
+    if drop:
+        for collection in collections.values():
+            collection.drop()
+
+    documents = {
+        "azure_spot": spot_price_documents(AZURE_INSTANCES, constants.azure_regions, days, "spot_price", rng),
+        "aws_spot": spot_price_documents(AWS_INSTANCES, constants.aws_regions, days, "spot_price_eur", rng),
+        "azure_storage": [
+            {"region": region, "skuName": f"{tier}{number} {redundancy}", "unitOfMeasure": "1/Month",
+             "price": round(float(number) * (4 if tier == "P" else 2) * rng.uniform(0.8, 1.2), 4), "timestamp": 1}
+            for region in constants.azure_regions
+            for tier in ("P", "E")
+            for redundancy in ("LRS", "ZRS")
+            for number in AZURE_SKU_NUMBERS
+        ],
+        "aws_storage": [
+            {"region": region, "description": f"{volume_type} storage", "price": round(rng.uniform(0.08, 0.12), 4),
+             "timestamp": 1}
+            for region in constants.aws_regions
+            for volume_type in ("gp2", "gp3")
+        ],
+    }
+    for name, collection_documents in documents.items():
+        collections[name].insert_many(collection_documents)
+
+    record_ingestion_batch(client, "synthetic_prices", sum(len(d) for d in documents.values()))
+    return {name: len(collection_documents) for name, collection_documents in documents.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a local mongod with synthetic price data.")
+    parser.add_argument("--mongo-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    print(seed_prices(client, days=args.days, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
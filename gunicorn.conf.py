@@ -0,0 +1,53 @@
+# Production server of app.py:
+#
+#     gunicorn app:app
+#
+# The app is imported once in the master process (preload_app): the MIPS model, the runtime model
+# and the price snapshot are loaded before the workers are forked and shared copy-on-write.
+# Graceful restart (e.g. after a deployment): kill -HUP <master pid> starts new workers and stops the
+# old ones after their running requests. The preloaded state is kept, to reload it as well
+# start a new master with kill -USR2 <master pid> and stop the old one with kill -TERM <old master pid>.
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5087")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+preload_app = True
+
+# Optimizations over many instance types can take longer than the default of 30 seconds
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 60))
+keepalive = 5
+
+# The warm-up runs in the master before the fork, so every worker starts with the filled price caches.
+# gunicorn only opens the listening socket after the preloaded app is imported.
+os.environ.setdefault("WARMUP_IN_BACKGROUND", "0")
+
+# Every worker writes its /metrics histograms to this directory, a scrape of any worker merges all of them.
+# A new directory per master, so the counters start at zero with the deployment.
+os.environ.setdefault("METRICS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="optimize-metrics-"))
+
+# Restart a worker after this many requests (0 disables), the jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+
+def when_ready(server):
+    # Objects loaded so far are moved out of the garbage collector's generations, so collections
+    # in the workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ["METRICS_MULTIPROC_DIR"], ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # MongoDB clients, SQLite connections, locks and background threads must not be shared with the master
+    from app import after_fork
+    after_fork()
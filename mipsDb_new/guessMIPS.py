@@ -1,7 +1,7 @@
 import joblib
 import pandas as pd
 
-def predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, data_input_size, data_output_size, elapsed_time, encoder, partition_columns):
+def predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, data_input_size, data_output_size, elapsed_time, encoder, partition_columns, model=None):
     """
     Predict MIPS for a job based on input parameters using the trained model.
 
@@ -17,6 +17,7 @@ def predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, d
     - elapsed_time: Elapsed time (integer).
     - encoder: OneHotEncoder used for encoding the partition column.
     - partition_columns: List of encoded partition column names.
+    - model: Already loaded model (optional). If given, model_path is not read.
 
     Returns:
     - Predicted MIPS value.
@@ -62,8 +63,9 @@ def predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, d
     # Drop the original partition column and combine with encoded columns
     input_df = pd.concat([input_df.drop(columns=['partition']), partition_df], axis=1)
 
-    # Load the trained model
-    model = joblib.load(model_path)
+    # Load the trained model unless a resident one was passed in
+    if model is None:
+        model = joblib.load(model_path)
     model_columns = model.feature_names_in_  # Get feature names from the trained model
 
     # Ensure all required columns are present in input_df
@@ -79,6 +81,55 @@ def predict_mips(model_path, partition, nnodes, ncpus, io_usage, memory_usage, d
 
     return predicted_mips[0]
 
+def predict_mips_batch(model, jobs, encoder, partition_columns):
+    """
+    Predict MIPS for many jobs with a single call to the model.
+
+    Parameters:
+    - model: Loaded MIPS model.
+    - jobs: List of dictionaries with the keys partition, nnodes, ncpus, io_usage, memory_usage,
+      data_input_size, data_output_size and elapsed_time (the input_parameter.json format).
+    - encoder: OneHotEncoder used for encoding the partition column.
+    - partition_columns: List of encoded partition column names.
+
+    Returns:
+    - Array of predicted MIPS values, one per job and in input order.
+
+    Raises:
+    - ValueError if a job has a missing or invalid parameter.
+    """
+    BASE_CPU_TAKT = 2.45  # GHz, default value for EPYC processors
+
+    try:
+        input_data = {
+            'partition': [job['partition'] for job in jobs],
+            'nnodes': [int(job['nnodes']) for job in jobs],
+            'ncpus': [int(job['ncpus']) for job in jobs],
+            'cpu_takt': [BASE_CPU_TAKT] * len(jobs),
+            'io_usage': [float(job['io_usage']) for job in jobs],
+            'memory_usage': [float(job['memory_usage']) for job in jobs],
+            'data_input_size': [float(job['data_input_size']) for job in jobs],
+            'data_output_size': [float(job['data_output_size']) for job in jobs],
+            'elapsed_time': [int(job['elapsed_time']) for job in jobs]
+        }
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Missing or invalid job parameter: {e}")
+
+    input_df = pd.DataFrame(input_data)
+
+    # One-hot encode all partitions at once
+    partition_encoded = encoder.transform(input_df[['partition']])
+    partition_df = pd.DataFrame(partition_encoded, columns=partition_columns)
+    input_df = pd.concat([input_df.drop(columns=['partition']), partition_df], axis=1)
+
+    model_columns = model.feature_names_in_
+    for col in model_columns:
+        if col not in input_df.columns:
+            input_df[col] = 0
+    input_df = input_df[model_columns]
+
+    return model.predict(input_df)
+
 '''
 # Example usage
 if __name__ == "__main__":
@@ -95,4 +146,4 @@ if __name__ == "__main__":
 
     if predicted_mips is not None:
         print(f"Predicted MIPS: {predicted_mips}")
-'''
\ No newline at end of file
+'''
\ No newline at end of file
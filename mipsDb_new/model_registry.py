@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import joblib
+
+DEFAULT_ENCODER_PATH = "mipsDb_new/partition_encoder.pkl"
+DEFAULT_MODEL_PATH = "mipsDb_new/mips_model.pkl"
+DEFAULT_RELOAD_INTERVAL = 30  # seconds between checks of the .pkl files
+
+
+class ModelNotLoaded(RuntimeError):
+    """
+    Raised by ModelRegistry.current() while no snapshot could be loaded (e.g. the .pkl files are missing).
+    """
+
+
+class ModelSnapshot:
+    """
+    One consistent, read-only pair of partition encoder and MIPS model.
+
+    A snapshot is never modified after it has been built. Request handlers take the
+    current snapshot once and use it for the whole request, so encoder and model
+    always come from the same version even if a reload happens in between.
+    """
+
+    def __init__(self, encoder, partition_columns, model, model_path, encoder_path,
+                 version, file_signature, loaded_at, load_seconds):
+        self.encoder = encoder
+        self.partition_columns = partition_columns
+        self.model = model
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self.version = version
+        self.file_signature = file_signature
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+def file_signature(paths):
+    """
+    Returns a cheap change signature (mtime_ns, size) for every path.
+    Used by the watcher to decide whether the pickles have to be reloaded.
+    """
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def content_version(paths):
+    """
+    Builds a short version string from the content hash of all given files.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """
+    Keeps the partition encoder and the MIPS RandomForest resident in memory.
+
+    Where:
+      - load() reads both pickles and publishes them as one ModelSnapshot.
+      - try_load() does the same at startup, but records the error instead of raising, so the service
+        starts (and reports not ready) without the pickles.
+      - current() returns the published snapshot, loading it on first use. Raises ModelNotLoaded if
+        that fails.
+      - reload_if_changed() rebuilds the snapshot when a .pkl file changed on disk
+        and swaps it in with a single reference assignment. If the new files cannot
+        be loaded (e.g. half-written), the previous snapshot stays active.
+      - start_watcher() runs reload_if_changed() periodically in a daemon thread.
+    """
+
+    def __init__(self, model_path=None, encoder_path=None, reload_interval=None):
+        self.model_path = model_path or os.getenv("MIPS_MODEL_PATH", DEFAULT_MODEL_PATH)
+        self.encoder_path = encoder_path or os.getenv("MIPS_ENCODER_PATH", DEFAULT_ENCODER_PATH)
+        if reload_interval is None:
+            reload_interval = float(os.getenv("MODEL_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+        self.reload_interval = reload_interval
+
+        self._snapshot = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.reload_count = 0
+        self.last_error = None
+
+    def _build_snapshot(self):
+        paths = [self.encoder_path, self.model_path]
+        start = time.perf_counter()
+        signature = file_signature(paths)
+        encoder = joblib.load(self.encoder_path)
+        partition_columns = list(encoder.get_feature_names_out(['partition']))
+        model = joblib.load(self.model_path)
+        version = content_version(paths)
+        load_seconds = time.perf_counter() - start
+
+        return ModelSnapshot(
+            encoder=encoder,
+            partition_columns=partition_columns,
+            model=model,
+            model_path=self.model_path,
+            encoder_path=self.encoder_path,
+            version=version,
+            file_signature=signature,
+            loaded_at=datetime.now(timezone.utc).isoformat(),
+            load_seconds=load_seconds,
+        )
+
+    def load(self):
+        """
+        Loads both pickles and publishes them. Raises if the files cannot be read.
+        """
+        with self._reload_lock:
+            snapshot = self._build_snapshot()
+            self._snapshot = snapshot
+            self.last_error = None
+        logging.info(f"Loaded MIPS model version {snapshot.version} in {snapshot.load_seconds:.3f}s")
+        return snapshot
+
+    def try_load(self):
+        """
+        Loads both pickles like load(), but returns None and keeps the error in last_error if they cannot be read.
+        The watcher loads them once they appear.
+        """
+        try:
+            return self.load()
+        except Exception as e:
+            self.last_error = str(e)
+            logging.error(f"Loading MIPS model failed, the service is not ready: {e}")
+            return None
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.try_load()
+        if snapshot is None:
+            raise ModelNotLoaded(f"MIPS model is not loaded: {self.last_error}")
+        return snapshot
+
+    def reload_if_changed(self):
+        """
+        Reloads the snapshot if the files on disk differ from the loaded ones.
+
+        Returns:
+          True if a new snapshot was published, False otherwise.
+        """
+        with self._reload_lock:
+            active = self._snapshot
+            try:
+                signature = file_signature([self.encoder_path, self.model_path])
+                if active is not None and signature == active.file_signature:
+                    return False
+                snapshot = self._build_snapshot()
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Reloading MIPS model failed, keeping previous version: {e}")
+                return False
+
+            self._snapshot = snapshot
+            self.reload_count += 1
+            self.last_error = None
+        logging.info(f"Reloaded MIPS model, new version {snapshot.version}")
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self.reload_if_changed()
+
+    def start_watcher(self):
+        """
+        Starts the background thread that hot-swaps the model on file changes.
+        Does nothing if the reload interval is 0 or the watcher already runs.
+        """
+        if self.reload_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def after_fork(self):
+        """
+        Called in a forked worker: threads are not inherited, so the watcher is started again.
+        The loaded snapshot is kept and shared with the parent.
+        """
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.start_watcher()
+
+    def status(self):
+        snapshot = self._snapshot
+        status = {
+            "loaded": snapshot is not None,
+            "model_path": self.model_path,
+            "encoder_path": self.encoder_path,
+            "reload_interval": self.reload_interval,
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+        }
+        if snapshot is not None:
+            status.update({
+                "version": snapshot.version,
+                "loaded_at": snapshot.loaded_at,
+                "load_seconds": snapshot.load_seconds,
+            })
+        return status
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Returns the process-wide ModelRegistry, creating it on first use.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
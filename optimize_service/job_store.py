@@ -0,0 +1,87 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = "jobs.db"
+
+
+class JobStore:
+    """
+    Status and results of background jobs in a SQLite file, shared by all worker processes.
+
+    With several workers (gunicorn.conf.py), a job is polled or cancelled through whichever worker
+    receives the request. The worker that runs the job writes every status change here, and picks up
+    cancellations requested by other workers.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("JOB_STORE_PATH", DEFAULT_PATH)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job TEXT NOT NULL,
+                    finished_at REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._connection.commit()
+        return self._connection
+
+    def save(self, job):
+        """
+        Stores the current state of a job (the as_dict of a Job).
+        """
+        job_dict = job.as_dict()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT INTO jobs (job_id, job, finished_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET job = excluded.job, finished_at = excluded.finished_at",
+                (job.id, json.dumps(job_dict, default=str), job.finished_at)
+            )
+            connection.commit()
+
+    def load(self, job_id):
+        """
+        Returns the stored as_dict of a job, or None.
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT job FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            connection.commit()
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE job_id = ?",
+                                          (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def purge(self, retention):
+        """
+        Removes jobs that finished more than retention seconds ago.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                               (time.time() - retention,))
+            connection.commit()
+
+    def after_fork(self):
+        """
+        Called in a forked worker: SQLite connections must not be shared with the parent.
+        """
+        self._lock = threading.Lock()
+        self._connection = None
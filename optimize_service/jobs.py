@@ -0,0 +1,305 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_RETENTION = 3600          # seconds a finished job and its result are kept
+DEFAULT_START_METHOD = "forkserver"
+# Imported once by the fork server, so every job process starts with the solver modules loaded
+FORKSERVER_PRELOAD = ["CloudSurvey_Package.optimization_solution", "optimize_service.jobs"]
+CANCEL_POLL_INTERVAL = 1.0        # seconds between two checks for cancellations requested by other workers
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, data):
+        self.id = uuid.uuid4().hex
+        self.data = data
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self.cancel_requested = threading.Event()
+
+    def as_dict(self):
+        job = {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            job["result"] = self.result
+        if self.status == FAILED:
+            job["error"] = self.error
+        return job
+
+    @classmethod
+    def from_dict(cls, job_dict):
+        """
+        Rebuilds a job from its as_dict, e.g. a job of another worker read from the JobStore.
+        """
+        job = cls(None)
+        job.id = job_dict["job_id"]
+        job.status = job_dict["status"]
+        job.submitted_at = job_dict["submitted_at"]
+        job.started_at = job_dict["started_at"]
+        job.finished_at = job_dict["finished_at"]
+        job.result = job_dict.get("result")
+        job.error = job_dict.get("error")
+        return job
+
+
+def run_optimization(optimization_kwargs, connection):
+    """
+    Entry point of a worker process: solves one job and sends ("ok", result) or ("error", message).
+    """
+    from CloudSurvey_Package.db_clients import reset_after_fork
+    from CloudSurvey_Package.optimization_solution import main_optimization
+    reset_after_fork()
+    try:
+        connection.send(("ok", main_optimization(**optimization_kwargs)))
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+class JobManager:
+    """
+    Runs long optimizations in the background (submit and poll).
+
+    Where:
+      - prepare(data): Runs in the service process and returns the keyword arguments of main_optimization
+        (MIPS prediction and simulation are fast and use the resident model and caches).
+      - on_result(data, result): Called in the service process after a job succeeded, e.g. to fill the result cache.
+      - workers: Number of jobs solved at the same time, each one in its own worker process, so a
+        running job can be cancelled by terminating its process.
+      - start_method: How the job processes are started (JOB_START_METHOD, default "forkserver"). The service
+        runs threads, so forking it directly can copy a lock held by another thread and deadlock the child.
+        The fork server is a single-threaded process that imports FORKSERVER_PRELOAD once and forks the jobs.
+      - max_queued: Jobs waiting for a worker above this bound are rejected with JobQueueFull.
+      - retention: Seconds a finished job (and its result) can be polled before it is removed.
+      - store: Optional JobStore. Every status change is written to it, so jobs of this process can be
+        polled and cancelled through other worker processes of the service (and vice versa).
+    """
+
+    def __init__(self, prepare, on_result=None, workers=None, max_queued=None, retention=None, start_method=None,
+                 store=None):
+        self.prepare = prepare
+        self.on_result = on_result
+        self.store = store
+        self.workers = workers or int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS))
+        self.max_queued = max_queued if max_queued is not None else int(os.getenv("JOB_MAX_QUEUED", DEFAULT_MAX_QUEUED))
+        self.retention = retention if retention is not None else float(os.getenv("JOB_RETENTION", DEFAULT_RETENTION))
+
+        self._context = multiprocessing.get_context(start_method or os.getenv("JOB_START_METHOD", DEFAULT_START_METHOD))
+        if self._context.get_start_method() == "forkserver":
+            self._context.set_forkserver_preload(FORKSERVER_PRELOAD)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="optimize-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, data):
+        """
+        Queues a job and returns its id. Raises JobQueueFull if too many jobs are waiting.
+        """
+        self.purge()
+        job = Job(data)
+        with self._lock:
+            queued = sum(1 for other in self._jobs.values() if other.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs are waiting, try again later")
+            self._jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._execute, job)
+        return job.id
+
+    def get(self, job_id):
+        """
+        Returns the job, or None if the id is unknown. Jobs of other processes are read from the store.
+        """
+        self.purge()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job_dict = self.store.load(job_id)
+            if job_dict is not None:
+                job = Job.from_dict(job_dict)
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued job or terminates the worker process of a running one.
+
+        Returns:
+          The job, or None if the id is unknown.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status in FINISHED:
+                return job
+            if job.id not in self._jobs:
+                # Runs in another process, which polls the store for the cancellation
+                self.store.request_cancel(job.id)
+                return job
+            job.cancel_requested.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            elif job.process is not None:
+                job.process.terminate()
+        self._save(job)
+        return job
+
+    def purge(self):
+        """
+        Removes finished jobs older than the retention time.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED and now - job.finished_at > self.retention]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.store is not None:
+            self.store.purge(self.retention)
+
+    def _save(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except Exception as e:
+            logging.error(f"Storing the status of job {job.id} failed: {e}")
+
+    def _cancel_requested_elsewhere(self, job):
+        if self.store is None:
+            return False
+        try:
+            return self.store.cancel_requested(job.id)
+        except Exception as e:
+            logging.error(f"Reading the status of job {job.id} failed: {e}")
+            return False
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.process = None
+
+    def _execute(self, job):
+        if self._cancel_requested_elsewhere(job):
+            self.cancel(job.id)
+        with self._lock:
+            if job.cancel_requested.is_set():
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        self._save(job)
+
+        try:
+            optimization_kwargs = self.prepare(job.data)
+        except Exception as e:
+            with self._lock:
+                self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+            self._save(job)
+            return
+
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=run_optimization, args=(optimization_kwargs, sender), daemon=True)
+        with self._lock:
+            cancelled = job.cancel_requested.is_set()
+            if cancelled:
+                self._finish(job, CANCELLED)
+            else:
+                process.start()
+                job.process = process
+        if cancelled:
+            self._save(job)
+            return
+        sender.close()
+
+        message = None
+        timeout = CANCEL_POLL_INTERVAL if self.store is not None else None
+        while not wait([receiver, process.sentinel], timeout=timeout):
+            if self._cancel_requested_elsewhere(job):
+                self.cancel(job.id)
+        if receiver.poll():
+            try:
+                message = receiver.recv()
+            except EOFError:
+                pass
+        process.join()
+        receiver.close()
+
+        with self._lock:
+            if job.cancel_requested.is_set():
+                self._finish(job, CANCELLED)
+            elif message is None:
+                self._finish(job, FAILED, error=f"Worker process exited with code {process.exitcode}")
+            elif message[0] == "ok":
+                self._finish(job, SUCCEEDED, result=message[1])
+            else:
+                self._finish(job, FAILED, error=message[1])
+        self._save(job)
+
+        if job.status == SUCCEEDED and self.on_result is not None:
+            try:
+                self.on_result(job.data, job.result)
+            except Exception as e:
+                logging.error(f"Storing the result of job {job.id} failed: {e}")
+
+    def after_fork(self):
+        """
+        Called in a forked worker: starts with an empty job table and its own thread pool.
+        """
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="optimize-job")
+        if self.store is not None:
+            self.store.after_fork()
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "retention": self.retention,
+            "jobs": counts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status not in FINISHED:
+                    job.cancel_requested.set()
+                    if job.process is not None:
+                        job.process.terminate()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+import os
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DEFAULT_TOP_SITES = 10  # allocation sites reported per phase
+DEFAULT_FRAMES = 1      # frames of the traceback that identifies an allocation site
+DEFAULT_KEEP = 50       # profiles kept for GET /debug/memory
+
+# Allocations of tracemalloc and of the profiler itself are not interesting
+IGNORED_FILES = {tracemalloc.__file__, __file__}
+
+
+class RequestMemoryProfile:
+    """
+    Peak memory and allocation sites of the phases of one request, passed to PhaseTimer(memory=...).
+
+    Where, per phase:
+      - peak_bytes: highest traced memory during the phase, above the memory traced when it started.
+        Nested phases (e.g. solve within total) are included in the peak of the enclosing phase.
+      - retained_bytes: memory allocated in the phase and still alive at its end.
+      - top: the allocation sites with the most retained memory (tracemalloc snapshot difference).
+
+    The phases only take the snapshots. They are compared by summarize() once tracing has stopped,
+    comparing them while tracemalloc traces its own allocations takes about 25 times longer.
+    """
+
+    def __init__(self, top_sites=DEFAULT_TOP_SITES, stop_tracing=True):
+        self.top_sites = top_sites
+        self.stop_tracing = stop_tracing  # False if tracemalloc was already tracing (PYTHONTRACEMALLOC)
+        self.phases = {}
+        self._stack = []     # [memory at the start, highest peak seen] of the open phases
+        self._finished = []  # (name, peak_bytes, retained_bytes, snapshot before, snapshot after)
+
+    def _raise_enclosing_peak(self, peak):
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+    @contextmanager
+    def phase(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        # The peak is reset for this phase, the enclosing phase keeps its peak so far
+        self._raise_enclosing_peak(peak)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        self._stack.append([current, current])
+        try:
+            yield
+        finally:
+            start, nested_peak = self._stack.pop()
+            current_end, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, nested_peak)
+            after = tracemalloc.take_snapshot()
+            self._raise_enclosing_peak(peak)
+            self._finished.append((name, peak - start, current_end - start, before, after))
+
+    def top(self, before, after):
+        """
+        Returns the top_sites allocation sites with the most memory retained between the snapshots.
+        """
+        top = []
+        for stat in after.compare_to(before, "traceback"):
+            if len(top) == self.top_sites or stat.size_diff <= 0:
+                break
+            if any(frame.filename in IGNORED_FILES for frame in stat.traceback):
+                continue
+            top.append({
+                "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "retained_bytes": stat.size_diff,
+                "blocks": stat.count_diff,
+            })
+        return top
+
+    def summarize(self):
+        """
+        Compares the snapshots of the finished phases and drops them. Returns the phases.
+        """
+        for name, peak_bytes, retained_bytes, before, after in self._finished:
+            phase = {"peak_bytes": peak_bytes, "retained_bytes": retained_bytes, "top": None}
+            previous = self.phases.get(name)
+            if previous is not None:
+                # Repeated phase: highest peak, summed retained memory, sites of the call with the highest peak
+                if previous["peak_bytes"] >= phase["peak_bytes"]:
+                    phase["peak_bytes"], phase["top"] = previous["peak_bytes"], previous["top"]
+                phase["retained_bytes"] += previous["retained_bytes"]
+            if phase["top"] is None:
+                phase["top"] = self.top(before, after)
+            self.phases[name] = phase
+        self._finished = []
+        return self.phases
+
+
+class MemoryProfiler:
+    """
+    Opt-in tracemalloc allocation profiler of /optimize requests.
+
+    Where:
+      - enabled: profiling is available at all (MEMORY_PROFILE=1). tracemalloc only traces while a
+        request is profiled, other requests run without its overhead.
+      - every: profile every n-th request (MEMORY_PROFILE_EVERY, 0 = only requests with "memory_profile": true).
+      - Only one request is profiled at a time. tracemalloc traces the whole process, so allocations of
+        concurrent requests are included in the profile.
+      - The keep (MEMORY_PROFILE_KEEP) most recent profiles are kept in memory, per worker process.
+    """
+
+    def __init__(self, enabled=None, every=None, top_sites=None, frames=None, keep=None):
+        if enabled is None:
+            enabled = os.getenv("MEMORY_PROFILE", "0") == "1"
+        if every is None:
+            every = int(os.getenv("MEMORY_PROFILE_EVERY", 0))
+        if top_sites is None:
+            top_sites = int(os.getenv("MEMORY_PROFILE_TOP", DEFAULT_TOP_SITES))
+        if frames is None:
+            frames = int(os.getenv("MEMORY_PROFILE_FRAMES", DEFAULT_FRAMES))
+        if keep is None:
+            keep = int(os.getenv("MEMORY_PROFILE_KEEP", DEFAULT_KEEP))
+        self.enabled = enabled
+        self.every = every
+        self.top_sites = top_sites
+        self.frames = frames
+
+        self._profiles = deque(maxlen=keep)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def start(self, requested=False):
+        """
+        Returns a RequestMemoryProfile if this request is profiled, otherwise None.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._requests += 1
+            sampled = self.every > 0 and self._requests % self.every == 0
+        if not (requested or sampled) or not self._active.acquire(blocking=False):
+            return None
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(self.frames)
+        return RequestMemoryProfile(self.top_sites, stop_tracing=not tracing)
+
+    def finish(self, profile, timer=None, request=None):
+        """
+        Stops tracing and keeps the profile, with the parameters of the request and the duration
+        and model sizes of its PhaseTimer.
+        """
+        if profile is None:
+            return
+        try:
+            if profile.stop_tracing:
+                tracemalloc.stop()
+            phases = profile.summarize()
+            self._profiles.append({
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "peak_bytes": max((phase["peak_bytes"] for phase in phases.values()), default=0),
+                "seconds": timer.phases.get("total") if timer is not None else None,
+                "model_size": dict(timer.sizes) if timer is not None else {},
+                "request": request,
+                "phases": phases,
+            })
+        finally:
+            self._active.release()
+
+    def status(self, limit=None):
+        """
+        Returns the kept profiles, the one with the highest peak first.
+        """
+        profiles = sorted(self._profiles, key=lambda profile: profile["peak_bytes"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "every": self.every,
+            "requests": self._requests,
+            "profiles": profiles[:limit] if limit else profiles,
+        }
+
+    def after_fork(self):
+        """
+        Called in a forked worker: the locks of the parent are not usable there.
+        """
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upper bounds of the model size buckets (number of keys or variables)
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with one series per label value.
+    """
+
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = [0] * len(self.buckets) + [0.0, 0]
+                self._series[label_value] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def series(self):
+        """
+        Returns a copy of the series of this process, {label value: [bucket counts..., sum, count]}.
+        """
+        with self._lock:
+            return {label_value: list(series) for label_value, series in self._series.items()}
+
+    def render(self, series=None):
+        """
+        Returns the histogram in the Prometheus text exposition format, of the given series
+        (e.g. merged from all worker processes) or of this process.
+        """
+        if series is None:
+            series = self.series()
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, values in sorted(series.items()):
+            label = f'{self.label}="{label_value}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{label}}} {values[-1]}")
+        return "\n".join(lines)
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+
+phase_duration = Histogram(
+    "optimize_phase_duration_seconds",
+    "Duration of the phases of the optimize pipeline.",
+    "phase",
+    LATENCY_BUCKETS,
+)
+model_size = Histogram(
+    "optimize_model_size",
+    "Size of the optimization model (feasible keys and variables).",
+    "kind",
+    SIZE_BUCKETS,
+)
+HISTOGRAMS = (phase_duration, model_size)
+
+_publish_lock = threading.Lock()
+
+
+def metrics_dir():
+    """
+    Directory shared by the worker processes (METRICS_MULTIPROC_DIR, set by gunicorn.conf.py), or None
+    if the histograms are only kept in memory.
+    """
+    return os.getenv("METRICS_MULTIPROC_DIR") or None
+
+
+def publish():
+    """
+    Writes the histograms of this process to <metrics_dir>/<pid>.json, replacing its previous state.
+    """
+    directory = metrics_dir()
+    if directory is None:
+        return
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with _publish_lock:
+        state = {histogram.name: histogram.series() for histogram in HISTOGRAMS}
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+
+def merged_series(histogram, states):
+    """
+    Sums the series of one histogram over the published states of all processes.
+    """
+    merged = {}
+    for state in states:
+        for label_value, values in state.get(histogram.name, {}).items():
+            if label_value in merged:
+                merged[label_value] = [total + value for total, value in zip(merged[label_value], values)]
+            else:
+                merged[label_value] = list(values)
+    return merged
+
+
+def observe_timer(timer):
+    """
+    Adds all phases and model sizes of a PhaseTimer to the histograms.
+    """
+    for phase, seconds in timer.phases.items():
+        phase_duration.observe(phase, seconds)
+    for kind, size in timer.sizes.items():
+        model_size.observe(kind, size)
+    publish()
+
+
+def render_metrics():
+    """
+    Renders all histograms. With METRICS_MULTIPROC_DIR the states of all worker processes are merged,
+    including workers that have exited since (e.g. after GUNICORN_MAX_REQUESTS), so the counters never
+    decrease. Otherwise only the observations of this process are rendered.
+    """
+    directory = metrics_dir()
+    if directory is None:
+        return "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
+
+    publish()
+    states = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                states.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return "\n".join(histogram.render(merged_series(histogram, states)) for histogram in HISTOGRAMS) + "\n"
+
+
+def after_fork():
+    """
+    Called in a forked worker: starts without the observations and locks of the parent.
+    """
+    global _publish_lock
+    _publish_lock = threading.Lock()
+    for histogram in HISTOGRAMS:
+        histogram.reset()
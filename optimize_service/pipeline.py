@@ -0,0 +1,220 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from mipsDb_new.guessMIPS import predict_mips, predict_mips_batch
+from optimize_service.runtime_model import get_runtime_model
+from optimize_service.simulation_cache import get_simulation_cache
+
+load_dotenv()
+CLOUDSIM_URL = os.getenv('CLOUDSIM_URL', "http://192.168.178.28:8080")
+OPTIMIZE_MAX_INSTANCES = int(os.getenv('OPTIMIZE_MAX_INSTANCES', 0))
+
+OPTIMIZATION_PARAMETERS = ['provider', 'konfidenzgrad', 'volume', 'premium', 'lrs', 'parallelization']
+OPTIONAL_OPTIMIZATION_PARAMETERS = ['top_k', 'time_budget_ms', 'pareto']
+JOB_PARAMETERS = ['partition', 'nnodes', 'ncpus', 'io_usage', 'memory_usage', 'data_input_size',
+                  'data_output_size', 'elapsed_time']
+
+
+def predict_job_mips(data, model_snapshot):
+    """
+        Predicts the MIPS of one job described in the input_parameter.json format.
+
+        Where:
+          - data: The request parameters of the job.
+          - model_snapshot: The resident encoder/model pair of the ModelRegistry.
+
+        Returns:
+          The predicted MIPS as an integer.
+    """
+    mips = predict_mips(model_snapshot.model_path, data['partition'], data['nnodes'], data['ncpus'],
+                        data['io_usage'], data['memory_usage'], data['data_input_size'],
+                        data['data_output_size'], data['elapsed_time'], model_snapshot.encoder,
+                        model_snapshot.partition_columns, model=model_snapshot.model)
+    return int(mips)
+
+
+def predict_jobs_mips(jobs, model_snapshot):
+    """
+        Predicts the MIPS of many jobs with one vectorized model call.
+
+        Returns:
+          A list of integer MIPS values in input order.
+    """
+    if not jobs:
+        return []
+    predictions = predict_mips_batch(model_snapshot.model, jobs, model_snapshot.encoder,
+                                     model_snapshot.partition_columns)
+    return [int(mips) for mips in predictions]
+
+
+def request_simulation(provider, cloudlet_length, drop_nan=True):
+    """
+        Asks CloudSim for the execution time of a cloudlet with the given length on every instance type.
+
+        Where:
+          - provider: The provider, e.g., "AWS" or "Azure".
+          - cloudlet_length: The cloudlet length sent to the simulator.
+          - drop_nan: Remove entries with NaN values (the calibration needs to see them).
+
+        Returns:
+          A list of [instance_name, execution_time] entries.
+    """
+    url_simulate = CLOUDSIM_URL + "/simulate/" + provider.lower() + "?cloudletLength=" + str(cloudlet_length)
+    instances = requests.get(url_simulate)
+
+    instance_list = [[item['instance_name'], item['execution_time']] for item in instances.json()]
+    if not drop_nan:
+        return instance_list
+
+    filtered_instances = [
+        item for item in instance_list if not any(
+            str(value).lower() == 'nan' for value in item
+        )
+    ]
+    return filtered_instances
+
+
+def simulate_instances(provider, mips):
+    """
+        Returns the simulated execution times of a job with the given MIPS on every instance type.
+
+        The execution times of the trusted instances are computed from the calibrated RuntimeModel.
+        Only untrusted instances, uncalibrated providers and every n-th lookup (to detect drift) need a
+        simulation: the quantized cloudlet length is looked up in the persistent SimulationCache and
+        CloudSim is only called on a miss. CloudSim always answers for every instance type of a provider,
+        of its answer only the untrusted instances are used.
+
+        Returns:
+          A list of [instance_name, execution_time] entries without NaN values.
+    """
+    simulation_cache = get_simulation_cache()
+    cloudlet_length = simulation_cache.quantize(mips)
+
+    runtime_model = get_runtime_model()
+    prediction = None
+    if not runtime_model.needs_verification(provider):
+        prediction = runtime_model.predict(provider, cloudlet_length)
+        if prediction is not None and not prediction[1]:
+            return prediction[0]
+
+    filtered_instances = simulation_cache.get(provider, cloudlet_length)
+    if filtered_instances is None:
+        filtered_instances = request_simulation(provider, cloudlet_length)
+        simulation_cache.put(provider, cloudlet_length, filtered_instances)
+    drifted = runtime_model.check(provider, cloudlet_length, filtered_instances)
+    if prediction is None:
+        return filtered_instances
+
+    # Trusted instances from the model, the untrusted ones from the simulation (dropped if it has no time for them)
+    predicted_instances, untrusted = prediction
+    untrusted = set(untrusted) | set(drifted)
+    return ([item for item in predicted_instances if item[0] not in untrusted]
+            + [item for item in filtered_instances if item[0] in untrusted])
+
+
+def simulate_job_instances(provider, mips):
+    """
+        Like simulate_instances, for provider "all" both providers are simulated concurrently.
+
+        Returns:
+          The instance list, or {"AWS": instance_list, "Azure": instance_list} for provider "all".
+    """
+    if provider.lower() != 'all':
+        return simulate_instances(provider, mips)
+    providers = ["AWS", "Azure"]
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        instance_lists = list(executor.map(lambda p: simulate_instances(p, mips), providers))
+    return dict(zip(providers, instance_lists))
+
+
+def select_instances(instances, max_instances=None):
+    """
+    Selects the simulated instances that are optimized, for provider "all" per provider.
+
+    All instances are optimized unless max_instances (default: OPTIMIZE_MAX_INSTANCES, 0 = all)
+    is set, then only the max_instances fastest ones are kept.
+    """
+    if max_instances is None:
+        max_instances = OPTIMIZE_MAX_INSTANCES
+    if isinstance(instances, dict):
+        return {provider: select_instances(instance_list, max_instances) for provider, instance_list in instances.items()}
+    if max_instances <= 0 or len(instances) <= max_instances:
+        return instances
+    return sorted(instances, key=lambda item: item[1])[:max_instances]
+
+
+def optimization_job(data, instance_list):
+    """
+        Builds the keyword arguments of main_optimization from the request parameters
+        and the simulated instance list.
+    """
+    job = {key: data[key] for key in OPTIMIZATION_PARAMETERS}
+    for key in OPTIONAL_OPTIMIZATION_PARAMETERS:
+        if data.get(key) is not None:
+            job[key] = data[key]
+    job['instance_list'] = instance_list
+    return job
+
+
+class InvalidRequest(ValueError):
+    """
+    Raised by normalize_request for parameters that the optimizer would not treat like their normalized value.
+    """
+
+
+def request_flag(data, key):
+    # The optimizer tests premium and lrs for truth, so the string "false" would count as true
+    value = data[key]
+    if not isinstance(value, bool):
+        raise InvalidRequest(f"{key} must be true or false, got {value!r}")
+    return value
+
+
+def parallelization_factors(data):
+    # The factors divide the duration and multiply the storage cost, 2.5 would not be computed as 2
+    factors = data['parallelization']
+    if not isinstance(factors, list) or not factors:
+        raise InvalidRequest(f"parallelization must be a non-empty list of integers, got {factors!r}")
+    for factor in factors:
+        if isinstance(factor, bool) or not isinstance(factor, int) or factor < 1:
+            raise InvalidRequest(f"parallelization factors must be positive integers, got {factor!r}")
+    return sorted(set(factors))
+
+
+def normalize_request(data, model_version=None):
+    """
+        Builds a canonical key for an optimize request.
+
+        Where:
+          - Only the parameters that influence the result are used.
+          - The provider is lower-cased, numbers are compared as floats and the parallelization
+            factors are sorted and deduplicated.
+          - premium and lrs must be booleans and the parallelization factors positive integers,
+            otherwise InvalidRequest is raised (answered with 400), because the optimizer would treat
+            e.g. "false" or 2.5 differently from the key.
+          - model_version (the MIPS model version) is part of the key, because a new model
+            can predict a different cloudlet length for the same job.
+
+        Returns:
+          A JSON string that is equal for equivalent requests.
+    """
+    normalized = {
+        'provider': str(data['provider']).lower(),
+        'konfidenzgrad': float(data['konfidenzgrad']),
+        'volume': float(data['volume']),
+        'premium': request_flag(data, 'premium'),
+        'lrs': request_flag(data, 'lrs'),
+        'parallelization': parallelization_factors(data),
+        'partition': str(data['partition']),
+        'model_version': model_version,
+        'top_k': int(data['top_k']) if data.get('top_k') else None,
+        'time_budget_ms': float(data['time_budget_ms']) if data.get('time_budget_ms') else None,
+        'pareto': bool(data.get('pareto')),
+    }
+    for key in JOB_PARAMETERS[1:]:
+        normalized[key] = float(data[key])
+    return json.dumps(normalized, sort_keys=True)
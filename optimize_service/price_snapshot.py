@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from CloudSurvey_Package.db_clients import get_compute_client, get_storage_client
+from CloudSurvey_Package.db_operations import get_latest_ingestion_batch, get_mean_spot_price, get_spot_instance_types
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.currency import PROVIDER_CURRENCY
+from CloudSurvey_Package.optimization_solution import PROVIDERS, normalize_provider
+from CloudSurvey_Package.storage_prices import fetch_storage_prices, get_storage_sku, get_storage_skus
+
+DEFAULT_BATCH_CHECK_INTERVAL = 30  # seconds between two lookups of the latest ingestion batch
+
+
+def latest_ingestion_batches():
+    return get_latest_ingestion_batch(get_compute_client()), get_latest_ingestion_batch(get_storage_client())
+
+
+def hourly_profiles(pricing_list):
+    """
+    Turns the result of get_mean_spot_price(..., with_range=True) for one instance type into dense
+    24-slot price curves.
+
+    Returns:
+      {region: {"mean": [24], "min": [24], "max": [24]}}, hours without prices are None.
+    """
+    profiles = {}
+    for entry in pricing_list:
+        field = 'spot_price' if 'spot_price' in entry else 'spot_price_eur'  # AWS aggregation
+        profile = profiles.setdefault(entry['region'], {"mean": [None] * 24, "min": [None] * 24, "max": [None] * 24})
+        hour = entry['hour']
+        profile["mean"][hour] = entry[field]
+        profile["min"][hour] = entry.get('min_' + field)
+        profile["max"][hour] = entry.get('max_' + field)
+    return dict(sorted(profiles.items()))
+
+
+class PriceSnapshot:
+    """
+    Read-only price data of all providers, loaded once and shared by all requests.
+
+    With the pre-forking server (gunicorn.conf.py) the snapshot is loaded in the master process
+    before the workers are forked, so all workers share its memory copy-on-write.
+
+    Where:
+      - Per provider, the mean, lowest and highest spot prices per hour (get_mean_spot_price), the storage
+        prices of every SKU and the transfer cost map are kept.
+      - instance_types: Optional {provider: [instance_type, ...]} to load only these spot prices
+        (see WarmUp). Prices of other instance types are queried per request. None loads every
+        instance type with spot prices.
+      - batch_lookup: Function returning the current ingestion batch (any comparable value). Once a
+        newer batch is seen, the snapshot is reloaded in a background thread and swapped in with a
+        single reference assignment. Until then, requests keep using the previous snapshot.
+      - batch_check_interval: Minimum seconds between two calls of batch_lookup.
+    """
+
+    def __init__(self, batch_lookup=latest_ingestion_batches, batch_check_interval=None):
+        if batch_check_interval is None:
+            batch_check_interval = float(os.getenv("PRICE_SNAPSHOT_BATCH_CHECK_INTERVAL",
+                                                   DEFAULT_BATCH_CHECK_INTERVAL))
+        self.batch_lookup = batch_lookup
+        self.batch_check_interval = batch_check_interval
+
+        self.instance_types = None
+        self._snapshot = None  # {"batch", "providers": {provider: {"pricing", "covered", ...}}, ...}
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._batch_checked_at = None
+        self.batch = None      # latest ingestion batch seen by batch_lookup
+        self.reload_count = 0
+        self.last_error = None
+
+    def _build_snapshot(self, batch):
+        start = time.perf_counter()
+        client_compute = get_compute_client()
+        client_storage = get_storage_client()
+        providers = {}
+        for provider in PROVIDERS:
+            instance_types = (self.instance_types or {}).get(provider)
+            covered = set(instance_types) if instance_types else None  # None: every instance type
+            if not instance_types:
+                instance_types = get_spot_instance_types(client_compute, provider)
+            pricing = {}
+            for entry in get_mean_spot_price(client_compute, instance_types, provider, with_range=True):
+                pricing.setdefault(entry['instance_type'], []).append(entry)
+            providers[provider] = {
+                "pricing": pricing,
+                "covered": covered,
+                "storage": {sku: fetch_storage_prices(provider, sku, client_storage)
+                            for sku in get_storage_skus(provider)},
+                "transfer_cost_map": fill_transfer_cost_map(provider, client_storage),
+            }
+        return {
+            "batch": batch,
+            "providers": providers,
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+            "load_seconds": time.perf_counter() - start,
+        }
+
+    def load(self):
+        """
+        Loads the prices of all providers and publishes them. Raises if the databases cannot be read.
+        """
+        with self._lock:
+            self._reloading = True  # no second load from _check_batch meanwhile
+        try:
+            self._batch_checked_at = time.monotonic()
+            batch = self.batch_lookup() if self.batch_lookup is not None else None
+            snapshot = self._build_snapshot(batch)
+        finally:
+            with self._lock:
+                self._reloading = False
+        self._snapshot = snapshot
+        self.batch = batch
+        self.last_error = None
+        logging.info(f"Loaded price snapshot of ingestion batch {batch} in {snapshot['load_seconds']:.3f}s")
+        return snapshot
+
+    def _reload(self):
+        try:
+            self.load()
+            self.reload_count += 1
+        except Exception as e:
+            self.last_error = str(e)
+            logging.error(f"Reloading the price snapshot failed: {e}")
+
+    def _check_batch(self):
+        """
+        Looks up the latest ingestion batch and starts a reload in the background if it differs
+        from the one of the snapshot, or if no snapshot could be loaded so far.
+        The previous snapshot is served until the new one is loaded.
+        """
+        now = time.monotonic()
+        if self._batch_checked_at is not None and now - self._batch_checked_at < self.batch_check_interval:
+            return
+        self._batch_checked_at = now
+
+        if self.batch_lookup is not None:
+            try:
+                self.batch = self.batch_lookup()
+            except Exception as e:
+                logging.error(f"Could not look up the latest ingestion batch: {e}")
+                return
+
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if snapshot["batch"] == self.batch:
+                return
+            logging.info(f"New ingestion batch {self.batch}, reloading the price snapshot")
+
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="price-snapshot-reload", daemon=True).start()
+
+    def current_batch(self):
+        """
+        Returns the ingestion batch of the served prices, as batch_lookup of the ResultCache: the batch of
+        the snapshot, or the latest batch while none is loaded. Cached results are then dropped when the
+        reloaded snapshot is swapped in, not when the new batch is first seen.
+        """
+        self._check_batch()
+        snapshot = self._snapshot
+        return snapshot["batch"] if snapshot is not None else self.batch
+
+    def price_data(self, provider, instance_list, volume=None, premium=None, lrs=None, fetch_missing=True):
+        """
+        Returns the pre-fetched price data for main_optimization (see its price_data argument),
+        or None if no snapshot is loaded yet. The storage prices are included if volume is given.
+
+        Spot prices of instance types the snapshot does not cover are queried from the database. With
+        fetch_missing=False they are left out and listed under "missing_instance_types" instead, so
+        main_optimization_batch can query them once for all jobs of a batch.
+        """
+        self._check_batch()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+
+        def provider_data(provider, instance_list):
+            prices = snapshot["providers"][provider]
+            pricing_list = []
+            missing = []
+            for instance_type in {item[0] for item in instance_list}:
+                if prices["covered"] is not None and instance_type not in prices["covered"]:
+                    missing.append(instance_type)
+                pricing_list.extend(prices["pricing"].get(instance_type, []))
+            data = {"pricing_list": pricing_list, "transfer_cost_map": prices["transfer_cost_map"]}
+            if missing and fetch_missing:
+                pricing_list.extend(get_mean_spot_price(get_compute_client(), sorted(missing), provider))
+            elif missing:
+                data["missing_instance_types"] = sorted(missing)
+            if volume is not None:
+                sku = get_storage_sku(provider, volume, premium, lrs)
+                if sku in prices["storage"]:
+                    data["storage_price_list"] = prices["storage"][sku]
+            return data
+
+        provider = normalize_provider(provider)
+        if provider == "all":
+            return {name: provider_data(name, instances) for name, instances in instance_list.items()}
+        return provider_data(provider, instance_list)
+
+    def price_profile(self, provider, instance_type, region=None):
+        """
+        Returns the 24-hour mean/min/max spot price curves of one instance type (see hourly_profiles),
+        restricted to region if given, together with an ETag, or (None, None) if there are no prices.
+
+        The curves come from the snapshot, instance types it does not cover (and all of them while no
+        snapshot is loaded) are queried from the database. The ETag is derived from the ingestion batch
+        of the prices, so it changes exactly when new prices are ingested. Without batch documents it is
+        derived from the curves.
+        """
+        self._check_batch()
+        snapshot = self._snapshot
+        prices = snapshot["providers"][provider] if snapshot is not None else None
+        if prices is not None and (prices["covered"] is None or instance_type in prices["covered"]):
+            batch = snapshot["batch"]
+            pricing_list = prices["pricing"].get(instance_type, [])
+        else:
+            batch = self.batch
+            pricing_list = get_mean_spot_price(get_compute_client(), [instance_type], provider, with_range=True)
+
+        profiles = hourly_profiles(pricing_list)
+        if region is not None:
+            profiles = {region: profiles[region]} if region in profiles else {}
+        if not profiles:
+            return None, None
+
+        profile = {
+            "provider": provider,
+            "instance_type": instance_type,
+            "currency": PROVIDER_CURRENCY[provider],
+            "regions": profiles,
+        }
+        if batch in (None, (None, None)):
+            key = profile  # no ingestion batches recorded, the ETag follows the prices
+        else:
+            key = [batch, provider, instance_type, region]
+        etag = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+        return profile, etag
+
+    def after_fork(self):
+        """
+        Called in a forked worker: the lock and the reload thread of the parent are not usable there.
+        The loaded snapshot itself is kept and shared with the parent.
+        """
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def status(self):
+        snapshot = self._snapshot
+        status = {
+            "loaded": snapshot is not None,
+            "reloading": self._reloading,
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+        }
+        if snapshot is not None:
+            status.update({
+                "ingestion_batch": snapshot["batch"],
+                "loaded_at": snapshot["loaded_at"],
+                "load_seconds": snapshot["load_seconds"],
+                "instance_types": {provider: len(prices["pricing"])
+                                   for provider, prices in snapshot["providers"].items()},
+                "storage_skus": {provider: len(prices["storage"])
+                                 for provider, prices in snapshot["providers"].items()},
+            })
+        return status
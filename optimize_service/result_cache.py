@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_BATCH_CHECK_INTERVAL = 30  # seconds between two lookups of the latest ingestion batch
+
+# Default of ResultCache.put: the value was computed on the batch of the cache at the time of the put
+CURRENT_BATCH = object()
+
+
+def estimate_size(key, value):
+    """
+    Approximates the memory of one cache entry by the size of its JSON encoding.
+    """
+    return len(key) + len(json.dumps(value, default=str))
+
+
+class ResultCache:
+    """
+    LRU cache for optimize responses, bounded by an approximate memory size.
+
+    Entries do not expire by time. Instead, the cache remembers the ingestion batch the
+    entries were computed on (see record_ingestion_batch) and drops all of them once a
+    newer batch has been written by the spot price ingestion scripts.
+
+    A result is computed on the batch seen when its computation starts (batch()). It is passed
+    to put, which does not store the result if a newer batch has been seen in the meantime.
+
+    Where:
+      - max_bytes: Upper bound of the summed entry sizes, least recently used entries are evicted.
+      - batch_lookup: Function returning the current ingestion batch (any comparable value).
+      - batch_check_interval: Minimum seconds between two calls of batch_lookup.
+    """
+
+    def __init__(self, max_bytes=None, batch_lookup=None, batch_check_interval=None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if batch_check_interval is None:
+            batch_check_interval = float(os.getenv("RESULT_CACHE_BATCH_CHECK_INTERVAL", DEFAULT_BATCH_CHECK_INTERVAL))
+        self.max_bytes = max_bytes
+        self.batch_lookup = batch_lookup
+        self.batch_check_interval = batch_check_interval
+
+        self._entries = OrderedDict()  # key -> (value, size, batch)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._batch = None
+        self._batch_checked_at = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def _check_batch(self):
+        """
+        Clears the cache if a new ingestion batch has been recorded since the last check.
+        """
+        if self.batch_lookup is None:
+            return
+        now = time.monotonic()
+        if self._batch_checked_at is not None and now - self._batch_checked_at < self.batch_check_interval:
+            return
+        self._batch_checked_at = now
+
+        try:
+            batch = self.batch_lookup()
+        except Exception as e:
+            logging.error(f"Could not look up the latest ingestion batch: {e}")
+            return
+
+        with self._lock:
+            if batch != self._batch:
+                if self._entries:
+                    logging.info(f"New ingestion batch {batch}, dropping {len(self._entries)} cached results")
+                self._clear()
+                self._batch = batch
+
+    def _clear(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def batch(self):
+        """
+        Returns the current ingestion batch. Called when a computation starts, the batch is then passed to put.
+        """
+        self._check_batch()
+        return self._batch
+
+    def get(self, key):
+        """
+        Returns the cached value for key or None.
+        """
+        self._check_batch()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] != self._batch:
+                self._bytes -= self._entries.pop(key)[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, batch=CURRENT_BATCH):
+        """
+        Stores value under key and evicts least recently used entries above max_bytes.
+        Values larger than max_bytes are not cached, neither are values computed on an older
+        ingestion batch (batch, as returned by batch() when the computation started).
+        """
+        size = estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+        self._check_batch()
+        with self._lock:
+            if batch is CURRENT_BATCH:
+                batch = self._batch
+            elif batch != self._batch:
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, batch)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+                "ingestion_batch": self._batch,
+            }
@@ -0,0 +1,291 @@
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+DEFAULT_PATH = "runtime_model.json"
+DEFAULT_TOLERANCE = 0.05          # relative error above which a fitted instance is not trusted
+DEFAULT_VERIFY_EVERY = 100        # every n-th lookup per provider is checked against CloudSim, 0 disables
+DEFAULT_PROBE_LENGTHS = (10000, 100000, 1000000, 10000000)
+
+
+def is_nan(value):
+    return str(value).lower() == 'nan'
+
+
+def fit_instance(lengths, execution_times):
+    """
+        Fits execution_time = intercept + seconds_per_length * cloudlet_length by least squares,
+        weighted by 1 / execution_time so short and long probes count equally.
+
+        Returns:
+          A dictionary with the coefficients and the largest relative residual of the probes.
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    execution_times = np.asarray(execution_times, dtype=float)
+    weights = 1 / np.maximum(np.abs(execution_times), 1e-9)
+    seconds_per_length, intercept = np.polyfit(lengths, execution_times, 1, w=weights)
+    predicted = intercept + seconds_per_length * lengths
+    residuals = np.abs(predicted - execution_times) / np.maximum(np.abs(execution_times), 1e-9)
+    return {
+        "intercept": float(intercept),
+        "seconds_per_length": float(seconds_per_length),
+        "max_residual": float(residuals.max()),
+    }
+
+
+class RuntimeModel:
+    """
+    Local replacement for CloudSim: per instance type, the execution time is a linear
+    function of the cloudlet length (cloudletLength / effective MIPS plus a fixed overhead).
+
+    Where:
+      - calibrate(provider, simulate) probes the simulator at a few cloudlet lengths and fits
+        the coefficients of every instance type. Instances whose fit misses a probe by more
+        than the tolerance are stored as untrusted.
+      - predict(provider, cloudlet_length) returns the execution times of the trusted instances
+        and the names of the untrusted ones, which have to be simulated, or None if the provider
+        is not calibrated.
+      - check(provider, cloudlet_length, instance_list) compares a live simulation with the
+        fit and marks instances that drifted past the tolerance as untrusted.
+      - The coefficients and the trusted flags are persisted as JSON in path and survive restarts.
+        The file is shared by all worker processes: it is read again once another process has
+        replaced it, e.g. after marking a drift or a new calibration.
+    """
+
+    def __init__(self, path=None, tolerance=None, verify_every=None):
+        self.path = path or os.getenv("RUNTIME_MODEL_PATH", DEFAULT_PATH)
+        if tolerance is None:
+            tolerance = float(os.getenv("RUNTIME_MODEL_TOLERANCE", DEFAULT_TOLERANCE))
+        if verify_every is None:
+            verify_every = int(os.getenv("RUNTIME_MODEL_VERIFY_EVERY", DEFAULT_VERIFY_EVERY))
+        self.tolerance = tolerance
+        self.verify_every = verify_every
+
+        self._providers = {}  # provider -> {"calibrated_at", "probe_lengths", "instances": [...]}
+        self._lookups = {}    # provider -> number of lookups since the start
+        self._lock = threading.Lock()
+        self._file_version = None  # (mtime, size) of the file when it was last read or written
+        self.local_answers = 0
+        self.partial_answers = 0
+        self.fallbacks = 0
+        self.drifts = 0
+        self.load()
+
+    def _stat_version(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        version = self._stat_version()
+        if version is None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._providers = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read runtime model {self.path}: {e}")
+            return
+        self._file_version = version
+
+    def reload_if_changed(self):
+        """
+        Reads the file again if another process has replaced it since it was last read or written.
+        """
+        version = self._stat_version()
+        if version is not None and version != self._file_version:
+            logging.info(f"Runtime model {self.path} changed, reloading")
+            self.load()
+
+    def save(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(self._providers, f, indent=2)
+        os.replace(temporary_path, self.path)
+        self._file_version = self._stat_version()
+
+    def calibrate(self, provider, simulate, probe_lengths=DEFAULT_PROBE_LENGTHS):
+        """
+            Probes the simulator and stores the fitted coefficients of every instance type.
+
+            Where:
+              - simulate: Function (provider, cloudlet_length) -> list of [instance_name, execution_time],
+                NaN values included (see request_simulation).
+              - probe_lengths: At least two distinct cloudlet lengths.
+
+            Returns:
+              The stored calibration of the provider.
+        """
+        provider = provider.lower()
+        times = {}  # instance_name -> list of execution times, in the order of probe_lengths
+        order = []
+        for cloudlet_length in probe_lengths:
+            for instance_name, execution_time in simulate(provider, cloudlet_length):
+                if instance_name not in times:
+                    times[instance_name] = []
+                    order.append(instance_name)
+                times[instance_name].append(execution_time)
+
+        instances = []
+        for instance_name in order:
+            values = times[instance_name]
+            if all(is_nan(value) for value in values):
+                continue  # not offered by the simulator, CloudSim results never contain it
+            entry = {"instance_name": instance_name, "trusted": False}
+            if len(values) == len(probe_lengths) and not any(is_nan(value) for value in values):
+                entry.update(fit_instance(probe_lengths, values))
+                entry["trusted"] = entry["max_residual"] <= self.tolerance
+            instances.append(entry)
+
+        calibration = {
+            "calibrated_at": datetime.now(timezone.utc).isoformat(),
+            "probe_lengths": list(probe_lengths),
+            "instances": instances,
+        }
+        with self._lock:
+            self.reload_if_changed()
+            self._providers[provider] = calibration
+            self.save()
+        untrusted = [entry["instance_name"] for entry in instances if not entry["trusted"]]
+        logging.info(f"Calibrated {len(instances)} {provider} instances, untrusted: {untrusted}")
+        return calibration
+
+    def needs_verification(self, provider):
+        """
+        True for every verify_every-th lookup of a provider, the caller then asks CloudSim and calls check.
+        """
+        if self.verify_every <= 0:
+            return False
+        provider = provider.lower()
+        with self._lock:
+            self._lookups[provider] = self._lookups.get(provider, 0) + 1
+            return self._lookups[provider] % self.verify_every == 0
+
+    def predict(self, provider, cloudlet_length):
+        """
+            Computes the execution time of a cloudlet on every trusted instance type from the fitted coefficients.
+
+            Returns:
+              (instance_list, untrusted): instance_list has [instance_name, execution_time] entries like
+              request_simulation for the trusted instances, untrusted the names of the instances whose
+              execution time has to be simulated. None if the provider is not calibrated.
+        """
+        self.reload_if_changed()
+        calibration = self._providers.get(provider.lower())
+        if calibration is None:
+            self.fallbacks += 1
+            return None
+        instance_list = []
+        untrusted = []
+        for entry in calibration["instances"]:
+            if entry["trusted"]:
+                instance_list.append(
+                    [entry["instance_name"], entry["intercept"] + entry["seconds_per_length"] * cloudlet_length])
+            else:
+                untrusted.append(entry["instance_name"])
+        if untrusted:
+            self.partial_answers += 1
+        else:
+            self.local_answers += 1
+        return instance_list, untrusted
+
+    def check(self, provider, cloudlet_length, instance_list):
+        """
+            Compares a live simulation with the fit. Instances off by more than the tolerance,
+            and instances missing from the calibration, are marked as untrusted.
+
+            Returns:
+              The names of the instances that were marked.
+        """
+        provider = provider.lower()
+        drifted = []
+        with self._lock:
+            # Marks of other processes since the last read are kept when the file is written
+            self.reload_if_changed()
+            calibration = self._providers.get(provider)
+            if calibration is None:
+                return []
+            entries = {entry["instance_name"]: entry for entry in calibration["instances"]}
+            for instance_name, execution_time in instance_list:
+                entry = entries.get(instance_name)
+                if entry is None:
+                    entry = {"instance_name": instance_name, "trusted": False}
+                    calibration["instances"].append(entry)
+                    entries[instance_name] = entry
+                    drifted.append(instance_name)
+                    continue
+                if not entry["trusted"]:
+                    continue
+                predicted = entry["intercept"] + entry["seconds_per_length"] * cloudlet_length
+                if abs(predicted - execution_time) > self.tolerance * max(abs(execution_time), 1e-9):
+                    entry["trusted"] = False
+                    drifted.append(instance_name)
+            if drifted:
+                self.drifts += len(drifted)
+                self.save()
+        if drifted:
+            logging.warning(f"Runtime model of {provider} drifted for {drifted}, simulating them until recalibrated")
+        return drifted
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "tolerance": self.tolerance,
+            "verify_every": self.verify_every,
+            "local_answers": self.local_answers,
+            "partial_answers": self.partial_answers,
+            "fallbacks": self.fallbacks,
+            "drifts": self.drifts,
+            "providers": {
+                provider: {
+                    "calibrated_at": calibration["calibrated_at"],
+                    "instances": len(calibration["instances"]),
+                    "untrusted": [entry["instance_name"] for entry in calibration["instances"]
+                                  if not entry["trusted"]],
+                }
+                for provider, calibration in self._providers.items()
+            },
+        }
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_runtime_model():
+    """
+    Returns the process-wide RuntimeModel, loading the persisted coefficients on first use.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = RuntimeModel()
+    return _model
+
+
+def main():
+    from optimize_service.pipeline import request_simulation
+
+    parser = argparse.ArgumentParser(description="Calibrate the local runtime model against CloudSim.")
+    parser.add_argument("providers", nargs="+", help="e.g. azure aws")
+    parser.add_argument("--probe-lengths", type=int, nargs="+", default=list(DEFAULT_PROBE_LENGTHS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runtime_model = get_runtime_model()
+    for provider in args.providers:
+        runtime_model.calibrate(provider, lambda p, length: request_simulation(p, length, drop_nan=False),
+                                probe_lengths=args.probe_lengths)
+    print(json.dumps(runtime_model.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = "simulation_cache.db"
+DEFAULT_QUANTUM = 1             # cloudlet lengths are rounded to a multiple of this value
+DEFAULT_MAX_ENTRIES = 10000     # 0 disables the cache
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # seconds, 0 keeps entries until they are evicted
+
+
+class SimulationCache:
+    """
+    Persistent cache of CloudSim results keyed by (provider, quantized cloudletLength).
+
+    Where:
+      - path: SQLite file the results are stored in, shared by all processes of the service.
+      - quantum: cloudletLength is rounded to a multiple of quantum before the lookup, so
+        similar jobs share one simulation. The simulator is called with the rounded length.
+      - max_entries: Size bound, the least recently used entries are evicted above it.
+      - max_age: Entries older than max_age seconds are treated as missing and replaced.
+    """
+
+    def __init__(self, path=None, quantum=None, max_entries=None, max_age=None):
+        self.path = path or os.getenv("SIMULATION_CACHE_PATH", DEFAULT_PATH)
+        self.quantum = quantum or int(os.getenv("SIMULATION_CACHE_QUANTUM", DEFAULT_QUANTUM))
+        if max_entries is None:
+            max_entries = int(os.getenv("SIMULATION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        if max_age is None:
+            max_age = float(os.getenv("SIMULATION_CACHE_MAX_AGE", DEFAULT_MAX_AGE))
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS simulations (
+                    provider TEXT NOT NULL,
+                    cloudlet_length INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (provider, cloudlet_length)
+                )
+            """)
+            self._connection.commit()
+        return self._connection
+
+    def quantize(self, cloudlet_length):
+        """
+        Rounds the cloudlet length to the nearest multiple of quantum (at least one quantum).
+        """
+        return max(self.quantum, int(round(cloudlet_length / self.quantum)) * self.quantum)
+
+    def get(self, provider, cloudlet_length):
+        """
+        Returns the cached instance list for an already quantized cloudlet length, or None.
+        """
+        if not self.enabled:
+            return None
+        provider = provider.lower()
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT result, created_at FROM simulations WHERE provider = ? AND cloudlet_length = ?",
+                (provider, cloudlet_length)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result, created_at = row
+            if self.max_age and now - created_at > self.max_age:
+                connection.execute("DELETE FROM simulations WHERE provider = ? AND cloudlet_length = ?",
+                                   (provider, cloudlet_length))
+                connection.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            connection.execute("UPDATE simulations SET last_used = ? WHERE provider = ? AND cloudlet_length = ?",
+                               (now, provider, cloudlet_length))
+            connection.commit()
+            self.hits += 1
+        return json.loads(result)
+
+    def put(self, provider, cloudlet_length, instance_list):
+        """
+        Stores the instance list of a simulation and evicts the least recently used entries
+        above max_entries.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO simulations (provider, cloudlet_length, result, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (provider.lower(), cloudlet_length, json.dumps(instance_list), now, now)
+            )
+            evicted = connection.execute(
+                "DELETE FROM simulations WHERE rowid IN ("
+                "SELECT rowid FROM simulations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            connection.commit()
+            self.evictions += max(evicted, 0)
+
+    def after_fork(self):
+        """
+        Called in a forked worker: SQLite connections must not be shared with the parent.
+        """
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def stats(self):
+        """
+        Returns counters and the age of the oldest and newest entry in seconds.
+        """
+        stats = {
+            "enabled": self.enabled,
+            "path": self.path,
+            "quantum": self.quantum,
+            "max_entries": self.max_entries,
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+        if not self.enabled:
+            return stats
+        with self._lock:
+            entries, oldest, newest = self._connect().execute(
+                "SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM simulations"
+            ).fetchone()
+        now = time.time()
+        stats.update({
+            "entries": entries,
+            "oldest_entry_age": now - oldest if oldest is not None else None,
+            "newest_entry_age": now - newest if newest is not None else None,
+        })
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_simulation_cache():
+    """
+    Returns the process-wide SimulationCache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SimulationCache()
+    return _cache
@@ -0,0 +1,212 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_STATS_PATH = "traffic_stats.db"
+DEFAULT_STATS_DAYS = 7             # days of traffic the ranking is based on
+DEFAULT_FLUSH_INTERVAL = 30        # seconds between two writes of the counters
+DEFAULT_TOP_INSTANCE_TYPES = 0     # 0 warms every instance type with spot prices
+DEFAULT_RETRY_INTERVAL = 10        # seconds between two attempts of a failed warm-up
+
+
+def today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class TrafficStats:
+    """
+    Counts how often each instance type is optimized, per provider and day, in a SQLite file.
+
+    The counters are kept in memory and written every flush_interval seconds, so all worker processes
+    (and the next deployment) share one ranking. top_instance_types() ranks the last `days` days.
+    """
+
+    def __init__(self, path=None, days=None, flush_interval=None):
+        self.path = path or os.getenv("TRAFFIC_STATS_PATH", DEFAULT_STATS_PATH)
+        self.days = days or int(os.getenv("WARMUP_STATS_DAYS", DEFAULT_STATS_DAYS))
+        if flush_interval is None:
+            flush_interval = float(os.getenv("TRAFFIC_STATS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pending = {}  # (provider, instance_type) -> count since the last flush
+        self._flushed_at = time.monotonic()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS instance_type_requests (
+                    provider TEXT NOT NULL,
+                    instance_type TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (provider, instance_type, day)
+                )
+            """)
+            self._connection.commit()
+        return self._connection
+
+    def record(self, provider, instance_list):
+        """
+        Counts the instance types of one optimization. For provider "all" instance_list is
+        {provider: instance_list}.
+        """
+        instance_lists = instance_list if isinstance(instance_list, dict) else {provider: instance_list}
+        with self._lock:
+            for name, instances in instance_lists.items():
+                for instance_type in {item[0] for item in instances}:
+                    key = (name, instance_type)
+                    self._pending[key] = self._pending.get(key, 0) + 1
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Adds the pending counters to today's rows and removes rows older than the ranking window.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+            if not pending:
+                return
+            day = today()
+            oldest_day = (datetime.now(timezone.utc).date() - timedelta(days=self.days)).isoformat()
+            try:
+                connection = self._connect()
+                connection.executemany(
+                    "INSERT INTO instance_type_requests (provider, instance_type, day, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(provider, instance_type, day) DO UPDATE SET count = count + excluded.count",
+                    [(provider, instance_type, day, count) for (provider, instance_type), count in pending.items()]
+                )
+                connection.execute("DELETE FROM instance_type_requests WHERE day < ?", (oldest_day,))
+                connection.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Writing the traffic statistics failed: {e}")
+
+    def top_instance_types(self, limit):
+        """
+        Returns {provider: [instance_type, ...]} with the `limit` most frequently optimized instance
+        types per provider within the last `days` days, most frequent first.
+        """
+        oldest_day = (datetime.now(timezone.utc).date() - timedelta(days=self.days)).isoformat()
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT provider, instance_type, SUM(count) AS total FROM instance_type_requests "
+                "WHERE day >= ? GROUP BY provider, instance_type ORDER BY provider, total DESC, instance_type",
+                (oldest_day,)
+            ).fetchall()
+        top = {}
+        for provider, instance_type, _ in rows:
+            instance_types = top.setdefault(provider, [])
+            if len(instance_types) < limit:
+                instance_types.append(instance_type)
+        return top
+
+    def after_fork(self):
+        """
+        Called in a forked worker: SQLite connections must not be shared with the parent.
+        """
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pending = {}
+
+
+class WarmUp:
+    """
+    Fills the price caches after the start of the service and reports readiness.
+
+    Where:
+      - The price snapshot is loaded with the hourly mean prices of the top_instance_types most frequently
+        optimized instance types per provider (from traffic_stats, 0 = every instance type), the storage
+        prices of every SKU and the full transfer matrix.
+      - background: Warm up in a daemon thread, the service answers requests meanwhile (from the databases).
+        Under gunicorn the warm-up runs in the master before the workers are forked (see gunicorn.conf.py).
+      - A failed warm-up is retried every retry_interval seconds.
+    """
+
+    def __init__(self, price_snapshot, traffic_stats, top_instance_types=None, background=None, retry_interval=None):
+        self.price_snapshot = price_snapshot
+        self.traffic_stats = traffic_stats
+        if top_instance_types is None:
+            top_instance_types = int(os.getenv("WARMUP_TOP_INSTANCE_TYPES", DEFAULT_TOP_INSTANCE_TYPES))
+        if background is None:
+            background = os.getenv("WARMUP_IN_BACKGROUND", "1") != "0"
+        if retry_interval is None:
+            retry_interval = float(os.getenv("WARMUP_RETRY_INTERVAL", DEFAULT_RETRY_INTERVAL))
+        self.top_instance_types = top_instance_types
+        self.background = background
+        self.retry_interval = retry_interval
+
+        self.ready = False
+        self.attempts = 0
+        self.started_at = None
+        self.finished_at = None
+        self.seconds = None
+        self.last_error = None
+        self._thread = None
+
+    def run(self):
+        """
+        One warm-up attempt. Returns True once the service is ready.
+        """
+        self.attempts += 1
+        if self.started_at is None:
+            self.started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        try:
+            if self.top_instance_types > 0:
+                # Without any recorded traffic yet, every instance type is loaded
+                self.price_snapshot.instance_types = (
+                    self.traffic_stats.top_instance_types(self.top_instance_types) or None)
+            self.price_snapshot.load()
+        except Exception as e:
+            self.last_error = str(e)
+            logging.error(f"Warm-up failed (attempt {self.attempts}): {e}")
+            return False
+        self.seconds = time.perf_counter() - start
+        self.finished_at = datetime.now(timezone.utc).isoformat()
+        self.last_error = None
+        self.ready = True
+        logging.info(f"Warm-up finished in {self.seconds:.3f}s, the service is ready")
+        return True
+
+    def _run_until_ready(self):
+        while not self.run():
+            time.sleep(self.retry_interval)
+
+    def start(self):
+        """
+        Starts the warm-up, in a daemon thread or (background=False) right away with retries in a thread.
+        """
+        if self.ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        if not self.background and self.attempts == 0 and self.run():
+            return
+        self._thread = threading.Thread(target=self._run_until_ready, name="warm-up", daemon=True)
+        self._thread.start()
+
+    def after_fork(self):
+        """
+        Called in a forked worker: a warm-up that did not finish in the parent is continued here.
+        """
+        self._thread = None
+        if not self.ready:
+            self.start()
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "background": self.background,
+            "top_instance_types": self.top_instance_types,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "seconds": self.seconds,
+            "last_error": self.last_error,
+        }
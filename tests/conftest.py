@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder
+
+import CloudSurvey_Package.db_clients as db_clients
+from benchmarks.fake_cloudsim import start_fake_cloudsim
+from benchmarks.load_test import enable_mongomock_round
+from benchmarks.synthetic_prices import seed_prices
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_mips_model(model_path, encoder_path, targets=(100, 200)):
+    """
+    Trains a tiny MIPS model on two jobs and writes it with its partition encoder like mipsDb_new/trainModel.py.
+    Different targets give a model with a different content version.
+    """
+    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    encoder.fit(pd.DataFrame({'partition': ['normal', 'gpu']}))
+    features = pd.DataFrame({
+        'nnodes': [1, 2], 'ncpus': [4, 8], 'cpu_takt': [2.45, 2.45], 'io_usage': [1.0, 2.0],
+        'memory_usage': [1.0, 2.0], 'data_input_size': [1.0, 2.0], 'data_output_size': [1.0, 2.0],
+        'elapsed_time': [10, 20], 'partition_gpu': [0, 1], 'partition_normal': [1, 0],
+    })
+    model = RandomForestRegressor(n_estimators=3, random_state=1).fit(features, list(targets))
+    joblib.dump(model, model_path)
+    joblib.dump(encoder, encoder_path)
+
+
+@pytest.fixture(scope="session")
+def service(tmp_path_factory):
+    """
+    app.py against the fake CloudSim and an in-process mongomock database with synthetic prices, like
+    benchmarks/load_test.py. The module is imported once per test session, after the warm-up.
+    """
+    mongomock = pytest.importorskip("mongomock")
+
+    work_dir = tmp_path_factory.mktemp("service")
+    _, cloudsim_url = start_fake_cloudsim()
+    write_mips_model(work_dir / "mips_model.pkl", work_dir / "partition_encoder.pkl")
+    os.environ.update({
+        "CLOUDSIM_URL": cloudsim_url,
+        "MIPS_MODEL_PATH": str(work_dir / "mips_model.pkl"),
+        "MIPS_ENCODER_PATH": str(work_dir / "partition_encoder.pkl"),
+        "MODEL_RELOAD_INTERVAL": "0",
+        "SIMULATION_CACHE_PATH": str(work_dir / "simulation_cache.db"),
+        "RUNTIME_MODEL_PATH": str(work_dir / "runtime_model.json"),
+        "JOB_STORE_PATH": str(work_dir / "jobs.db"),
+        "TRAFFIC_STATS_PATH": str(work_dir / "traffic_stats.db"),
+        "MONGODB_URI": "mongomock://compute",
+        "MONGODB_URI2": "mongomock://storage",
+        "WARMUP_IN_BACKGROUND": "0",
+        # Forked job processes inherit the in-process mongomock client, a fork server would not
+        "JOB_START_METHOD": "fork",
+    })
+    os.environ.pop("METRICS_MULTIPROC_DIR", None)
+
+    enable_mongomock_round()
+    database = mongomock.MongoClient()
+    seed_prices(database, days=1)
+    db_clients.MongoClient = lambda uri, **options: database
+
+    # CLOUDSIM_URL is read when the pipeline is imported, which other test modules may have done already
+    import optimize_service.pipeline as pipeline
+    pipeline.CLOUDSIM_URL = cloudsim_url
+    import app
+
+    deadline = time.monotonic() + 60
+    while not app.warm_up.ready and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return app
+
+
+@pytest.fixture
+def client(service):
+    return service.app.test_client()
+
+
+@pytest.fixture
+def job():
+    """
+    The request of input_parameter.json.
+    """
+    with open(os.path.join(REPOSITORY, "input_parameter.json")) as f:
+        return json.load(f)
@@ -0,0 +1,27 @@
+import random
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.fill_cost_maps import fill_transfer_cost_map
+from CloudSurvey_Package.optimization_solution import build_cost_maps
+from benchmarks.instance_scaling import synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+
+# Azure transfer prices are computed from the region pairs, no database is needed
+TRANSFER_COST_MAP = fill_transfer_cost_map("Azure", None)
+
+
+def synthetic_cost_maps(instance_count, seed, parallelization=(1, 2, 4)):
+    """
+    Cost maps of instance_count synthetic Azure instance types, like the benchmarks.
+
+    Returns:
+      (compute_cost_map, storage_cost_map, transfer_cost_map) as returned by build_cost_maps.
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_list = synthetic_instance_list(instance_count, rng)
+    return build_cost_maps(
+        "Azure", instance_list, 100, False, True, list(parallelization), None, None,
+        pricing_list=synthetic_pricing_list(instance_list, regions, rng),
+        storage_price_list=synthetic_storage_price_list(regions, rng),
+        transfer_cost_map=TRANSFER_COST_MAP,
+    )
@@ -0,0 +1,60 @@
+import math
+import time
+
+import CloudSurvey_Package.optimization_solution as optimization_solution
+from CloudSurvey_Package.optimization_problem import anytime_search
+
+# part -> total costs of its chains, the bound of every part is half of its cheapest chain
+PARTS = {"a": [4.0, 6.0], "b": [3.0], "c": [5.0, 2.5], "d": [9.0]}
+LOWER_BOUNDS = [(min(costs) / 2, part) for part, costs in PARTS.items()]
+
+
+def evaluate(part):
+    return [{"combination": (part, index), "total_cost": cost} for index, cost in enumerate(PARTS[part])]
+
+
+def test_search_without_time_limit_is_optimal():
+    incumbent, lower_bound, evaluated = anytime_search(LOWER_BOUNDS, evaluate, math.inf)
+
+    assert incumbent["combination"] == ("c", 1)
+    assert lower_bound == incumbent["total_cost"] == 2.5
+    # "d" is bounded by 4.5 and never evaluated
+    assert evaluated == 3
+
+
+def test_search_past_the_deadline_returns_the_first_chain_with_its_gap():
+    incumbent, lower_bound, evaluated = anytime_search(LOWER_BOUNDS, evaluate, time.perf_counter())
+
+    assert evaluated == 1
+    assert incumbent["combination"] == ("c", 1)  # the part with the lowest bound
+    assert lower_bound == 1.5  # the bound of "b", the next part
+    assert incumbent["total_cost"] - lower_bound > 0
+
+
+def test_optimize_with_time_budget(client, job):
+    data = dict(job, elapsed_time=8800)
+    exact = client.post('/optimize', json=data).json["result"]
+    anytime = client.post('/optimize', json=dict(data, time_budget_ms=60000)).json["result"]
+
+    assert anytime["status"] == "Optimal"
+    assert anytime["gap"] == 0
+    assert anytime["objective"] == anytime["lower_bound"] == exact["objective"]
+    assert anytime["chosen_combinations"] == exact["chosen_combinations"]
+
+
+def test_optimize_past_the_time_budget(client, job, monkeypatch):
+    anytime_lower_bounds = optimization_solution.anytime_lower_bounds
+
+    def loose_lower_bounds(*args):
+        # Weaker bounds, the first chain can no longer be proven optimal without evaluating the others
+        lower_bounds, evaluate = anytime_lower_bounds(*args)
+        return [(bound / 1000, part) for bound, part in lower_bounds], evaluate
+
+    monkeypatch.setattr(optimization_solution, "anytime_lower_bounds", loose_lower_bounds)
+    data = dict(job, elapsed_time=8900)
+    exact = client.post('/optimize', json=data).json["result"]
+    anytime = client.post('/optimize', json=dict(data, time_budget_ms=1e-6)).json["result"]
+
+    assert anytime["status"] == "TimeLimit"
+    assert anytime["gap"] == anytime["objective"] - anytime["lower_bound"] > 0
+    assert anytime["lower_bound"] <= exact["objective"] <= anytime["objective"]
@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def calls(service, monkeypatch):
+    """
+    Records the MIPS predictions, CloudSim lookups and optimized jobs of the service.
+    """
+    calls = {"predict": [], "simulate": [], "optimize": []}
+
+    def recorded(name, function):
+        def wrapper(*args, **kwargs):
+            calls[name].append(args)
+            return function(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(service, "predict_jobs_mips", recorded("predict", service.predict_jobs_mips))
+    monkeypatch.setattr(service, "simulate_job_instances", recorded("simulate", service.simulate_job_instances))
+    monkeypatch.setattr(service, "main_optimization_batch", recorded("optimize", service.main_optimization_batch))
+    return calls
+
+
+def test_results_are_in_input_order(service, client, job):
+    jobs = [dict(job, elapsed_time=7100), dict(job, elapsed_time=7200, volume=100), dict(job, elapsed_time=7300)]
+    response = client.post('/optimize/batch', json=jobs)
+    assert response.status_code == 200
+    results = [entry["result"] for entry in response.json["results"]]
+
+    service.result_cache.invalidate()
+    for single_job, result in zip(jobs, results):
+        assert client.post('/optimize', json=single_job).json["result"] == result
+
+
+def test_lookups_are_shared_between_jobs(client, job, calls):
+    first = dict(job, elapsed_time=7400)
+    other_volume = dict(first, volume=100)
+    response = client.post('/optimize/batch', json=[first, other_volume, first])
+
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert results[0] == results[2]
+    # One prediction for both distinct jobs, one simulation for their common cloudlet length
+    assert len(calls["predict"]) == 1 and len(calls["predict"][0][0]) == 2
+    assert len(calls["simulate"]) == 1
+    assert len(calls["optimize"][0][0]) == 2
+
+
+def test_cached_jobs_are_not_computed_again(client, job, calls):
+    jobs = [dict(job, elapsed_time=7500), dict(job, elapsed_time=7600)]
+    first = client.post('/optimize/batch', json=jobs).json
+    calls["simulate"].clear()
+    calls["optimize"].clear()
+    second = client.post('/optimize/batch', json=jobs).json
+
+    assert second == first
+    assert not calls["simulate"]
+    assert all(not optimized_jobs for optimized_jobs, *_ in calls["optimize"])
+
+
+def test_invalid_job_is_rejected(client, job):
+    invalid = dict(job)
+    del invalid["volume"]
+
+    assert client.post('/optimize/batch', json=[job, invalid]).status_code == 400
+    assert client.post('/optimize/batch', json=job).status_code == 400
@@ -0,0 +1,56 @@
+import pytest
+
+from CloudSurvey_Package.optimization_problem import all_candidates, compute_mean_cost, dominant_candidates
+from tests.synthetic import synthetic_cost_maps
+
+
+def nested_loop_candidates(compute_cost_map, storage_cost_map, transfer_cost_map):
+    """The former all_candidates, which compared every storage key with every compute key."""
+    feasible_keys = []
+    cost_map_combo = {}
+    for (r1, r2), transfer_c in transfer_cost_map.items():
+        for (r1_s, i_s, p_s), storage_cost in storage_cost_map.items():
+            if r1_s != r1:
+                continue
+            for (r2_c, i_c, s_c, p_c), compute_cost in compute_cost_map.items():
+                if (r2_c == r2) and (i_c == i_s) and (p_c == p_s):
+                    quintuple = (r1, r2, i_s, s_c, p_s)
+                    feasible_keys.append(quintuple)
+                    cost_map_combo[quintuple] = (storage_cost + (transfer_c * p_s)
+                                                 + (p_s * compute_mean_cost(compute_cost)))
+    return feasible_keys, cost_map_combo
+
+
+@pytest.mark.parametrize("instance_count, seed, parallelization", [(1, 1, (1,)), (4, 2, (1, 2, 4)), (8, 3, (2, 8))])
+def test_hash_join_returns_the_chains_of_the_nested_loop(instance_count, seed, parallelization):
+    cost_maps = synthetic_cost_maps(instance_count, seed, parallelization)
+
+    assert all_candidates(*cost_maps) == nested_loop_candidates(*cost_maps)
+
+
+def test_chains_without_matching_keys_are_skipped():
+    compute_cost_map = {("westeurope", "E2s v5 Spot", 3, 1): (2.0, 3600),
+                        ("westeurope", "E2s v5 Spot", 3, 2): (1.5, 1800),
+                        ("ukwest", "D4s v5 Spot", 0, 1): (4.0, 3600)}
+    storage_cost_map = {("northeurope", "E2s v5 Spot", 1): 0.5, ("northeurope", "E2s v5 Spot", 4): 0.1,
+                        ("ukwest", "D4s v5 Spot", 1): 0.25}
+    transfer_cost_map = {("northeurope", "westeurope"): 0.01, ("ukwest", "westeurope"): 0.02}
+
+    feasible_keys, cost_map_combo = all_candidates(compute_cost_map, storage_cost_map, transfer_cost_map)
+
+    assert feasible_keys == [("northeurope", "westeurope", "E2s v5 Spot", 3, 1)]
+    assert cost_map_combo == {feasible_keys[0]: 0.5 + 0.01 + 2.0}
+    assert (feasible_keys, cost_map_combo) == nested_loop_candidates(compute_cost_map, storage_cost_map,
+                                                                       transfer_cost_map)
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_dominant_chains_are_the_cheapest_of_their_compute_key(seed):
+    cost_maps = synthetic_cost_maps(5, seed)
+    _, every_chain = nested_loop_candidates(*cost_maps)
+    cheapest = {}
+    for (r1, r2, i, s, p), cost in every_chain.items():
+        cheapest[(r2, i, s, p)] = min(cost, cheapest.get((r2, i, s, p), cost))
+
+    _, cost_map_combo = dominant_candidates(*cost_maps)
+    assert {(r2, i, s, p): cost for (r1, r2, i, s, p), cost in cost_map_combo.items()} == pytest.approx(cheapest)
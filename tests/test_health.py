@@ -0,0 +1,15 @@
+from CloudSurvey_Package.db_clients import get_compute_client, get_storage_client, reset_after_fork
+
+
+def test_health_checks_the_clients_of_this_process(client):
+    assert client.get('/health').status_code == 200
+
+    # A freshly forked worker before after_fork has no clients to check
+    reset_after_fork()
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.json == {"healthy": False, "databases": {}}
+
+    get_compute_client()
+    get_storage_client()
+    assert client.get('/health').status_code == 200
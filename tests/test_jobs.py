@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from optimize_service.job_store import JobStore
+from optimize_service.jobs import CANCELLED, FAILED, JobManager, JobQueueFull, QUEUED, RUNNING
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def blocked_prepare():
+    """A prepare that waits for release, so the jobs stay in their current status."""
+    release = threading.Event()
+    started = []
+
+    def prepare(data):
+        started.append(data)
+        release.wait(10)
+        raise ValueError("no prices")
+
+    prepare.release = release
+    prepare.started = started
+    yield prepare
+    release.set()
+
+
+def test_queued_job_is_cancelled(blocked_prepare):
+    jobs = JobManager(blocked_prepare, workers=1, max_queued=1)
+    running_id = jobs.submit({"n": 1})
+    wait_for(lambda: jobs.get(running_id).status == RUNNING)
+    queued_id = jobs.submit({"n": 2})
+    assert jobs.get(queued_id).status == QUEUED
+    with pytest.raises(JobQueueFull):
+        jobs.submit({"n": 3})
+
+    assert jobs.cancel(queued_id).status == CANCELLED
+    blocked_prepare.release.set()
+    wait_for(lambda: jobs.get(running_id).status == FAILED)
+
+    assert jobs.get(running_id).as_dict()["error"] == "ValueError: no prices"
+    assert jobs.get(queued_id).status == CANCELLED
+    assert blocked_prepare.started == [{"n": 1}]
+    assert jobs.cancel("unknown") is None
+    jobs.shutdown()
+
+
+def test_running_job_is_cancelled_before_its_process_starts(tmp_path):
+    release = threading.Event()
+
+    def prepare(data):
+        release.wait(10)
+        return {}
+
+    jobs = JobManager(prepare, workers=1, store=JobStore(str(tmp_path / "jobs.db")))
+    job_id = jobs.submit({})
+    wait_for(lambda: jobs.get(job_id).status == RUNNING)
+    jobs.cancel(job_id)
+    release.set()
+    wait_for(lambda: jobs.get(job_id).status == CANCELLED)
+
+    # Another worker process polls the stored status
+    other_worker = JobManager(prepare, store=JobStore(str(tmp_path / "jobs.db")))
+    assert other_worker.get(job_id).as_dict()["status"] == CANCELLED
+    jobs.shutdown()
+
+
+def test_cancellation_through_another_worker(tmp_path, blocked_prepare):
+    jobs = JobManager(blocked_prepare, workers=1, store=JobStore(str(tmp_path / "jobs.db")))
+    other_worker = JobManager(blocked_prepare, store=JobStore(str(tmp_path / "jobs.db")))
+    jobs.submit({"n": 1})
+    queued_id = jobs.submit({"n": 2})
+
+    other_worker.cancel(queued_id)
+    blocked_prepare.release.set()
+    wait_for(lambda: jobs.get(queued_id).status == CANCELLED)
+    assert blocked_prepare.started == [{"n": 1}]
+    jobs.shutdown()
+
+
+def test_async_optimization_succeeds_and_is_cached(service, client, job):
+    data = dict(job, elapsed_time=8700)
+    response = client.post('/optimize', json=dict(data, **{"async": True}))
+    assert response.status_code == 202
+    status_url = response.json["status_url"]
+
+    wait_for(lambda: client.get(status_url).json["status"] not in (QUEUED, RUNNING))
+    finished = client.get(status_url).json
+    assert finished["status"] == "succeeded", finished
+    assert finished["result"] == client.post('/optimize', json=data).json["result"]
+    # Cached under the model version of the job, answered without a new job
+    assert client.post('/optimize', json=dict(data, **{"async": True})).status_code == 200
+
+    assert client.delete(status_url).json["status"] == "succeeded"
+    assert client.get('/jobs/unknown').status_code == 404
+    assert client.delete('/jobs/unknown').status_code == 404
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+import CloudSurvey_Package.constants as constants
+from CloudSurvey_Package.optimization_problem import argmin_optimize
+from CloudSurvey_Package.optimization_solution import build_cost_maps, main_joint_optimization
+from CloudSurvey_Package.timing import PhaseTimer
+from benchmarks.instance_scaling import synthetic_instance_list, synthetic_pricing_list, synthetic_storage_price_list
+from tests.synthetic import TRANSFER_COST_MAP
+
+
+def synthetic_jobs(job_count, seed):
+    """
+    job_count jobs on 4 of 8 synthetic Azure instance types each, with the prices as price_data.
+    """
+    rng = random.Random(seed)
+    regions = constants.azure_regions
+    instance_types = synthetic_instance_list(8, rng)
+    price_data = {"pricing_list": synthetic_pricing_list(instance_types, regions, rng),
+                  "storage_price_list": synthetic_storage_price_list(regions, rng),
+                  "transfer_cost_map": TRANSFER_COST_MAP}
+    return [{"instance_list": [[name, rng.uniform(0.3, 3) * duration / 4]
+                               for name, duration in rng.sample(instance_types, 4)],
+             "volume": 100, "premium": False, "lrs": True, "parallelization": [1, 2, 4], "price_data": price_data}
+            for _ in range(job_count)]
+
+
+def single_job_cost(job):
+    data = job["price_data"]
+    cost_maps = build_cost_maps("Azure", job["instance_list"], job["volume"], job["premium"], job["lrs"],
+                                job["parallelization"], None, None, pricing_list=data["pricing_list"],
+                                storage_price_list=data["storage_price_list"],
+                                transfer_cost_map=data["transfer_cost_map"])
+    return argmin_optimize(*cost_maps)["total_cost"]
+
+
+def test_unlimited_jobs_are_optimized_independently():
+    jobs = synthetic_jobs(6, 1)
+    result = main_joint_optimization("Azure", jobs)
+
+    assert result["status"] == "Optimal"
+    for chain, job in zip(result["jobs"], jobs):
+        assert chain["total_cost"] == pytest.approx(single_job_cost(job))
+
+
+def test_shared_storage_uses_one_region_and_costs_more_or_equal():
+    jobs = synthetic_jobs(6, 2)
+    independent = main_joint_optimization("Azure", jobs)
+    shared = main_joint_optimization("Azure", jobs, shared_storage=True)
+
+    assert shared["status"] == "Optimal"
+    assert len({chain["combination"][0] for chain in shared["jobs"]}) == 1
+    assert shared["objective"] >= independent["objective"] - 1e-9
+
+
+def test_region_limits_are_kept():
+    jobs = synthetic_jobs(8, 3)
+    for job in jobs:
+        job["deadline_hours"] = 10
+    result = main_joint_optimization("Azure", jobs, default_region_limit=4)
+
+    assert all(peak <= 4 for peak in result["peak_instances"].values())
+    assert all(chain["end_hour"] <= 10 + 1e-9 for chain in result["jobs"])
+
+
+def test_infeasible_storage_groups_fail_without_enumeration():
+    jobs = synthetic_jobs(6, 4) * 6
+    for index, job in enumerate(jobs):
+        jobs[index] = dict(job, storage_group=f"group-{index % 4}", deadline_hours=3)
+
+    with pytest.raises(RuntimeError, match="No joint schedule"):
+        main_joint_optimization("Azure", jobs, default_region_limit=1)
+
+
+def test_storage_assignment_cap():
+    jobs = [dict(job, storage_group=f"group-{index % 4}", deadline_hours=10)
+            for index, job in enumerate(synthetic_jobs(8, 5))]
+    results = {}
+    for cap in (1, 5):
+        timer = PhaseTimer()
+        results[cap] = main_joint_optimization("Azure", jobs, default_region_limit=4, max_storage_assignments=cap,
+                                               timer=timer)
+        assert timer.sizes["joint_storage_assignments"] <= cap
+
+    # The region limits make the first assignment more expensive than its bound, it is not proven optimal
+    assert results[1]["status"] == "TimeLimit"
+    assert results[5]["objective"] <= results[1]["objective"] + 1e-9
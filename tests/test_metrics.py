@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from CloudSurvey_Package.timing import PhaseTimer
+from optimize_service import metrics
+
+
+@pytest.fixture
+def histograms(monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    metrics.after_fork()
+    yield
+    metrics.after_fork()
+
+
+@pytest.fixture
+def shared_histograms(monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    metrics.after_fork()
+    yield tmp_path
+    metrics.after_fork()
+
+
+def test_histogram_counts_cumulative_buckets(histograms):
+    histogram = metrics.Histogram("test_seconds", "Test.", "phase", (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe("solve", value)
+
+    rendered = histogram.render()
+    assert 'test_seconds_bucket{phase="solve",le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{phase="solve",le="1.0"} 2' in rendered
+    assert 'test_seconds_bucket{phase="solve",le="+Inf"} 3' in rendered
+    assert 'test_seconds_sum{phase="solve"} 5.55' in rendered
+
+
+def test_timer_phases_and_sizes_are_rendered(histograms):
+    timer = PhaseTimer()
+    timer.phases["argmin"] = 0.001
+    timer.record("feasible_keys", 500)
+    metrics.observe_timer(timer)
+
+    rendered = metrics.render_metrics()
+    assert 'optimize_phase_duration_seconds_count{phase="argmin"} 1' in rendered
+    assert 'optimize_model_size_bucket{kind="feasible_keys",le="1000"} 1' in rendered
+
+
+def test_metrics_endpoint(service, client, job, histograms):
+    client.post('/optimize', json=dict(job, elapsed_time=8400))
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'optimize_phase_duration_seconds_count{phase="total"} 1' in response.data.decode()
+
+
+def test_metrics_of_all_workers_are_merged(shared_histograms):
+    timer = PhaseTimer()
+    timer.phases["solve"] = 0.02
+    metrics.observe_timer(timer)
+    # State published by another worker, which may have exited since
+    other = {metrics.phase_duration.name: {"solve": [0] * 4 + [1] * (len(metrics.LATENCY_BUCKETS) - 4) + [0.03, 1]},
+             metrics.model_size.name: {}}
+    (shared_histograms / "1.json").write_text(json.dumps(other))
+
+    rendered = metrics.render_metrics()
+
+    assert 'optimize_phase_duration_seconds_count{phase="solve"} 2' in rendered
+    assert 'optimize_phase_duration_seconds_bucket{phase="solve",le="0.025"} 1' in rendered
+    assert 'optimize_phase_duration_seconds_bucket{phase="solve",le="0.05"} 2' in rendered
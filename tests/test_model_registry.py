@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from mipsDb_new.model_registry import ModelNotLoaded, ModelRegistry
+from tests.conftest import write_mips_model
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(model_path=str(tmp_path / "mips_model.pkl"),
+                         encoder_path=str(tmp_path / "partition_encoder.pkl"), reload_interval=0)
+
+
+def rewrite(registry, targets):
+    write_mips_model(registry.model_path, registry.encoder_path, targets=targets)
+    # A new mtime even if the file system has a coarse clock
+    stat = os.stat(registry.model_path)
+    os.utime(registry.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_missing_files_are_reported_as_not_loaded(registry):
+    assert registry.try_load() is None
+    assert not registry.loaded
+    assert registry.last_error
+    with pytest.raises(ModelNotLoaded):
+        registry.current()
+
+
+def test_model_is_loaded_once_the_files_appear(registry):
+    assert registry.try_load() is None
+    rewrite(registry, (100, 200))
+
+    assert registry.reload_if_changed()
+    assert registry.loaded
+    assert registry.status()["last_error"] is None
+    assert not registry.reload_if_changed()
+
+
+def test_changed_files_are_swapped_in(registry):
+    rewrite(registry, (100, 200))
+    first = registry.current()
+    rewrite(registry, (300, 400))
+
+    assert registry.reload_if_changed()
+    second = registry.current()
+    assert second.version != first.version
+    # Requests holding the old snapshot keep a consistent pair
+    assert first.model is not second.model
+
+
+def test_unreadable_files_keep_the_previous_version(registry):
+    rewrite(registry, (100, 200))
+    version = registry.current().version
+    with open(registry.model_path, "wb") as f:
+        f.write(b"half written")
+
+    assert not registry.reload_if_changed()
+    assert registry.current().version == version
+    assert registry.last_error
+
+
+def test_service_answers_503_without_model(service, client, job, registry, monkeypatch):
+    registry.try_load()
+    monkeypatch.setattr(service, "model_registry", registry)
+
+    assert client.post('/optimize', json=job).status_code == 503
+    assert client.get('/ready').status_code == 503
+    assert client.get('/status').json["model"]["loaded"] is False
@@ -0,0 +1,34 @@
+import pytest
+
+from CloudSurvey_Package.optimization_problem import pareto_chains
+from benchmarks.pareto_front import pairwise_front
+from tests.synthetic import synthetic_cost_maps
+
+
+@pytest.mark.parametrize("instance_count, seed", [(1, 1), (5, 2), (20, 3), (40, 4)])
+def test_front_matches_pairwise_reference(instance_count, seed):
+    cost_maps = synthetic_cost_maps(instance_count, seed)
+    front = pareto_chains(*cost_maps)
+
+    assert {(chain["completion_time"], chain["total_cost"]) for chain in front} == pairwise_front(*cost_maps)
+
+
+def test_front_is_sorted_by_completion_time():
+    front = pareto_chains(*synthetic_cost_maps(20, 5))
+
+    times = [chain["completion_time"] for chain in front]
+    costs = [chain["total_cost"] for chain in front]
+    assert times == sorted(times)
+    # Each slower chain of the front must be cheaper
+    assert all(slower < faster for faster, slower in zip(costs, costs[1:]))
+
+
+def test_optimize_with_pareto_front(client, job):
+    data = dict(job, elapsed_time=9000)
+    assert "pareto_front" not in client.post('/optimize', json=data).json["result"]
+
+    result = client.post('/optimize', json=dict(data, pareto=True)).json["result"]
+    front = result["pareto_front"]
+    assert front
+    # The cheapest chain of the front is the optimum
+    assert front[-1]["total_cost"] == pytest.approx(result["objective"])
@@ -0,0 +1,54 @@
+import time
+
+from CloudSurvey_Package.db_clients import get_compute_client
+from CloudSurvey_Package.db_operations import record_ingestion_batch
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_price_profile(client):
+    response = client.get('/prices/azure/E2s v5 Spot/ukwest')
+
+    assert response.status_code == 200
+    profile = response.json
+    assert profile["instance_type"] == "E2s v5 Spot"
+    assert list(profile["regions"]) == ["ukwest"]
+    curves = profile["regions"]["ukwest"]
+    assert all(len(curves[name]) == 24 for name in ("mean", "min", "max"))
+    # The mean is rounded to four digits
+    for low, mean, high in zip(curves["min"], curves["mean"], curves["max"]):
+        assert low - 5e-5 <= mean <= high + 5e-5
+
+    assert client.get('/prices/gcp/E2s v5 Spot').status_code == 400
+    assert client.get('/prices/azure/unknown').status_code == 404
+
+
+def test_unchanged_prices_are_answered_with_304(client):
+    response = client.get('/prices/azure/E2s v5 Spot')
+    etag = response.headers["ETag"]
+
+    cached = client.get('/prices/azure/E2s v5 Spot', headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+    # Every instance type and region has its own ETag
+    assert client.get('/prices/azure/E2s v5 Spot/ukwest').headers["ETag"] != etag
+    assert client.get('/prices/azure/E2s v5 Spot', headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_new_ingestion_batch_changes_the_etag(service, client, monkeypatch):
+    monkeypatch.setattr(service.price_snapshot, "batch_check_interval", 0)
+    etag = client.get('/prices/azure/E2s v5 Spot').headers["ETag"]
+
+    record_ingestion_batch(get_compute_client(), "azure_spot_prices", 0)
+    # The new snapshot is loaded in the background, meanwhile the previous one is served
+    wait_for(lambda: client.get('/prices/azure/E2s v5 Spot').headers["ETag"] != etag)
+
+    response = client.get('/prices/azure/E2s v5 Spot', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["instance_type"] == "E2s v5 Spot"
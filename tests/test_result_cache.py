@@ -0,0 +1,70 @@
+import pytest
+
+from optimize_service.pipeline import InvalidRequest, normalize_request
+from optimize_service.result_cache import ResultCache
+
+
+def cache_with_batches():
+    batches = {"current": 1}
+    cache = ResultCache(max_bytes=1024 * 1024, batch_lookup=lambda: batches["current"], batch_check_interval=0)
+    return cache, batches
+
+
+def test_new_batch_drops_cached_results():
+    cache, batches = cache_with_batches()
+    cache.put("key", {"objective": 1.0})
+    assert cache.get("key") == {"objective": 1.0}
+
+    batches["current"] = 2
+    assert cache.get("key") is None
+
+
+def test_result_of_an_older_batch_is_not_stored():
+    cache, batches = cache_with_batches()
+    batch = cache.batch()
+    # New prices are ingested while the result is computed
+    batches["current"] = 2
+    cache.put("key", {"objective": 1.0}, batch)
+
+    assert cache.get("key") is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_bytes=150)
+    cache.put("a", "x" * 60)
+    cache.put("b", "x" * 60)
+    cache.get("a")
+    cache.put("c", "x" * 60)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_equivalent_requests_share_a_key(job):
+    reordered = dict(job, provider="azure", parallelization=[4, 2, 1, 2], volume=float(job["volume"]))
+
+    assert normalize_request(reordered, "v1") == normalize_request(job, "v1")
+    assert normalize_request(job, "v2") != normalize_request(job, "v1")
+    assert normalize_request(dict(job, premium=False), "v1") != normalize_request(job, "v1")
+
+
+@pytest.mark.parametrize("invalid", [{"premium": "false"}, {"lrs": 1}, {"parallelization": [1, 2.5]},
+                                     {"parallelization": [0]}, {"parallelization": []}])
+def test_values_the_optimizer_treats_differently_are_rejected(job, invalid):
+    with pytest.raises(InvalidRequest):
+        normalize_request(dict(job, **invalid), "v1")
+
+
+def test_invalid_request_is_answered_with_400(client, job):
+    assert client.post('/optimize', json=dict(job, premium="false")).status_code == 400
+
+
+def test_repeated_request_is_answered_from_the_cache(service, client, job):
+    job = dict(job, elapsed_time=8500)
+    first = client.post('/optimize', json=job).json
+    hits = service.result_cache.stats()["hits"]
+
+    assert client.post('/optimize', json=job).json == first
+    assert service.result_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,77 @@
+import pytest
+
+from optimize_service.runtime_model import RuntimeModel
+
+PROBE_LENGTHS = (10000, 100000, 1000000)
+
+
+def simulate(provider, cloudlet_length):
+    """CloudSim stand-in: linear instances, one that is not, one that is not offered."""
+    return [
+        ["E2s v5 Spot", 2.0 + cloudlet_length / 1000],
+        ["FX48-12mds v2 Spot", 1.0 + cloudlet_length / 4000],
+        ["D2 v3 Spot", cloudlet_length ** 0.5],
+        ["M416ms v2 Spot", "NaN"],
+    ]
+
+
+def live_simulation(cloudlet_length):
+    """The instance list of a live simulation, which never contains NaN values."""
+    return {name: time for name, time in simulate("azure", cloudlet_length) if time != "NaN"}
+
+
+def model(tmp_path, **options):
+    options.setdefault("tolerance", 0.05)
+    options.setdefault("verify_every", 0)
+    return RuntimeModel(path=str(tmp_path / "runtime_model.json"), **options)
+
+
+def test_calibration_trusts_only_instances_that_fit(tmp_path):
+    runtime_model = model(tmp_path)
+    assert runtime_model.predict("azure", 50000) is None
+
+    runtime_model.calibrate("Azure", simulate, PROBE_LENGTHS)
+    instance_list, untrusted = runtime_model.predict("azure", 50000)
+
+    assert untrusted == ["D2 v3 Spot"]
+    assert dict(instance_list) == pytest.approx({"E2s v5 Spot": 52.0, "FX48-12mds v2 Spot": 13.5})
+    assert runtime_model.stats()["providers"]["azure"]["instances"] == 3
+
+
+def test_drift_marks_the_instance_untrusted_for_every_process(tmp_path):
+    runtime_model = model(tmp_path)
+    runtime_model.calibrate("azure", simulate, PROBE_LENGTHS)
+    other_process = model(tmp_path)
+
+    live = live_simulation(50000)
+    live["E2s v5 Spot"] *= 1.5
+    drifted = runtime_model.check("azure", 50000, list(live.items()))
+
+    assert drifted == ["E2s v5 Spot"]
+    assert runtime_model.stats()["drifts"] == 1
+    # Marked once, the next check ignores the untrusted instance
+    assert runtime_model.check("azure", 50000, list(live.items())) == []
+
+    instance_list, untrusted = other_process.predict("azure", 50000)
+    assert sorted(untrusted) == ["D2 v3 Spot", "E2s v5 Spot"]
+    assert [name for name, _ in instance_list] == ["FX48-12mds v2 Spot"]
+    assert model(tmp_path).stats()["providers"]["azure"]["untrusted"] == ["E2s v5 Spot", "D2 v3 Spot"]
+
+
+def test_deviation_within_the_tolerance_is_not_a_drift(tmp_path):
+    runtime_model = model(tmp_path)
+    runtime_model.calibrate("azure", simulate, PROBE_LENGTHS)
+
+    live = live_simulation(50000)
+    live["E2s v5 Spot"] *= 1.04
+    live["B1s Spot"] = 10.0  # unknown to the calibration
+
+    assert runtime_model.check("azure", 50000, list(live.items())) == ["B1s Spot"]
+    assert "E2s v5 Spot" in dict(runtime_model.predict("azure", 50000)[0])
+
+
+def test_verification_every_nth_lookup(tmp_path):
+    runtime_model = model(tmp_path, verify_every=3)
+
+    assert [runtime_model.needs_verification("azure") for _ in range(6)] == [False, False, True] * 2
+    assert not model(tmp_path).needs_verification("azure")
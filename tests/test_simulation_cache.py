@@ -0,0 +1,72 @@
+import pytest
+
+import optimize_service.simulation_cache as simulation_cache
+from optimize_service.simulation_cache import SimulationCache
+
+INSTANCES = [["E2s v5 Spot", 7200.0], ["FX48-12mds v2 Spot", 5000.0]]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(simulation_cache.time, "time", lambda: now[0])
+    return now
+
+
+def cache(tmp_path, **options):
+    return SimulationCache(path=str(tmp_path / "simulation_cache.db"), **options)
+
+
+def test_cloudlet_length_is_rounded_to_the_quantum(tmp_path):
+    rounded = cache(tmp_path, quantum=100)
+
+    assert rounded.quantize(149) == 100
+    assert rounded.quantize(151) == 200
+    assert rounded.quantize(10) == 100  # at least one quantum
+    assert cache(tmp_path).quantize(12345) == 12345
+
+
+def test_results_are_shared_per_provider_and_length(tmp_path):
+    simulations = cache(tmp_path)
+    simulations.put("Azure", 1000, INSTANCES)
+
+    assert simulations.get("azure", 1000) == INSTANCES
+    assert simulations.get("aws", 1000) is None
+    assert simulations.get("azure", 1001) is None
+    # A second process reads the same file
+    assert cache(tmp_path).get("azure", 1000) == INSTANCES
+
+
+def test_old_entries_expire(tmp_path, clock):
+    simulations = cache(tmp_path, max_age=60)
+    simulations.put("azure", 1000, INSTANCES)
+    clock[0] += 59
+    assert simulations.get("azure", 1000) == INSTANCES
+
+    clock[0] += 2
+    assert simulations.get("azure", 1000) is None
+    assert simulations.stats()["expired"] == 1
+    assert simulations.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    simulations = cache(tmp_path, max_entries=2, max_age=0)
+    for length in (1000, 2000):
+        simulations.put("azure", length, INSTANCES)
+        clock[0] += 1
+    simulations.get("azure", 1000)
+    clock[0] += 1
+    simulations.put("azure", 3000, INSTANCES)
+
+    assert simulations.get("azure", 1000) == INSTANCES
+    assert simulations.get("azure", 2000) is None
+    assert simulations.stats()["entries"] == 2
+    assert simulations.stats()["evictions"] == 1
+
+
+def test_zero_max_entries_disables_the_cache(tmp_path):
+    simulations = cache(tmp_path, max_entries=0)
+    simulations.put("azure", 1000, INSTANCES)
+
+    assert simulations.get("azure", 1000) is None
+    assert not (tmp_path / "simulation_cache.db").exists()
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from optimize_service.single_flight import SingleFlight
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(in_flight, key, function, callers):
+    """Starts callers threads with the same key, the first one is in flight before the others start."""
+    results = [None] * callers
+
+    def call(index):
+        try:
+            results[index] = in_flight.do(key, function)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    threads[0].start()
+    wait_for(lambda: in_flight.stats()["in_flight"] == 1)
+    for thread in threads[1:]:
+        thread.start()
+    return threads, results
+
+
+def test_identical_requests_are_computed_once():
+    in_flight = SingleFlight()
+    release = threading.Event()
+    computations = []
+
+    def optimize():
+        computations.append(1)
+        release.wait(5)
+        return {"objective": 1.0}
+
+    threads, results = run_concurrently(in_flight, "key", optimize, callers=4)
+    wait_for(lambda: in_flight.stats()["waiting"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(computations) == 1
+    assert all(result == {"objective": 1.0} for result, _ in results)
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True]
+    assert in_flight.stats() == {"executions": 1, "coalesced": 3, "in_flight": 0, "waiting": 0}
+
+
+def test_different_keys_and_later_requests_are_computed_again():
+    in_flight = SingleFlight()
+
+    assert in_flight.do("a", lambda: 1) == (1, False)
+    assert in_flight.do("b", lambda: 2) == (2, False)
+    assert in_flight.do("a", lambda: 3) == (3, False)
+    assert in_flight.stats()["executions"] == 3
+
+
+def test_waiters_get_the_exception_of_the_computation():
+    in_flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("CloudSim unavailable")
+
+    threads, results = run_concurrently(in_flight, "key", fail, callers=3)
+    wait_for(lambda: in_flight.stats()["waiting"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # The failed key is not kept, the next request computes it
+    assert in_flight.do("key", lambda: 1) == (1, False)
+    with pytest.raises(ValueError):
+        in_flight.do("key", lambda: int("x"))
+
+
+def test_concurrent_identical_optimize_requests_are_computed_once(service, client, job, monkeypatch):
+    release = threading.Event()
+    computations = []
+    compute_optimization = service.compute_optimization
+
+    def blocked(*args):
+        computations.append(args)
+        release.wait(5)
+        return compute_optimization(*args)
+
+    monkeypatch.setattr(service, "compute_optimization", blocked)
+    data = dict(job, elapsed_time=8600)
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(client.post('/optimize', json=data)))
+               for _ in range(3)]
+    coalesced = service.in_flight.stats()["coalesced"]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: service.in_flight.stats()["coalesced"] == coalesced + 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(computations) == 1
+    assert [response.status_code for response in responses] == [200] * 3
+    assert responses[0].json == responses[1].json == responses[2].json
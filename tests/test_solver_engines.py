@@ -0,0 +1,45 @@
+import pytest
+
+from CloudSurvey_Package.optimization_problem import dominant_candidates
+from CloudSurvey_Package.optimization_solution import ENGINES, solve_cost_maps
+from tests.synthetic import synthetic_cost_maps
+
+
+@pytest.mark.parametrize("instance_count, seed", [(1, 1), (5, 2), (20, 3)])
+def test_engines_return_the_same_response(instance_count, seed):
+    cost_maps = synthetic_cost_maps(instance_count, seed)
+    responses = {engine: solve_cost_maps(*cost_maps, engine=engine) for engine in ENGINES}
+
+    first = responses[ENGINES[0]]
+    assert first["status"] == "Optimal"
+    for engine, response in responses.items():
+        assert response == first, engine
+
+
+def test_pulp_is_an_alias_of_cbc():
+    cost_maps = synthetic_cost_maps(5, 4)
+
+    assert solve_cost_maps(*cost_maps, engine="pulp") == solve_cost_maps(*cost_maps, engine="cbc")
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_objective_is_the_cheapest_chain(seed):
+    cost_maps = synthetic_cost_maps(10, seed)
+    _, cost_map_combo = dominant_candidates(*cost_maps)
+
+    response = solve_cost_maps(*cost_maps, engine="argmin")
+    assert response["status"] == "Optimal"
+    assert response["objective"] == pytest.approx(min(cost_map_combo.values()))
+    chosen = tuple(response["chosen_combinations"][0]["combination"])
+    assert cost_map_combo[chosen] == pytest.approx(response["objective"])
+
+
+def test_argmin_picks_the_chain_of_the_model():
+    cost_maps = synthetic_cost_maps(5, 3)
+
+    assert solve_cost_maps(*cost_maps, engine="argmin") == solve_cost_maps(*cost_maps, engine="cbc")
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match="Unknown optimization engine"):
+        solve_cost_maps(*synthetic_cost_maps(1, 1), engine="glpk")
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+
+def stream_lines(client, job):
+    response = client.post('/optimize/stream', json=job)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_stream_ends_with_the_optimum(client, job):
+    lines = stream_lines(client, dict(job, elapsed_time=8100))
+
+    assert lines[0]["type"] == "simulation"
+    assert lines[-1]["type"] == "optimum"
+    candidates = lines[1:-1]
+    assert candidates and all(line["type"] == "candidate" for line in candidates)
+    cheapest = min(candidates, key=lambda line: line["total_cost"])
+    assert lines[-1]["status"] == "Optimal"
+    assert lines[-1]["objective"] == pytest.approx(cheapest["total_cost"])
+
+
+def test_stream_optimum_matches_optimize(client, job):
+    job = dict(job, elapsed_time=8200)
+    optimum = stream_lines(client, job)[-1]
+    result = client.post('/optimize', json=job).json["result"]
+
+    assert optimum["objective"] == pytest.approx(result["objective"])
+    assert optimum["combination"] == result["chosen_combinations"][0]["combination"]
+
+
+def test_stream_rejects_all_providers(client, job):
+    assert client.post('/optimize/stream', json=dict(job, provider="all")).status_code == 400
@@ -0,0 +1,44 @@
+import pytest
+
+from CloudSurvey_Package.optimization_problem import chain_breakdown
+from CloudSurvey_Package.optimization_solution import solve_cost_maps
+from tests.synthetic import synthetic_cost_maps
+
+
+def every_chain_total(compute_cost_map, storage_cost_map, transfer_cost_map):
+    # Reference: every (r1, r2, i, s, p) chain, without the storage index of iter_chains
+    totals = {}
+    for (r2, i, s, p), compute_cost in compute_cost_map.items():
+        for (r1, storage_i, storage_p), storage_cost in storage_cost_map.items():
+            if (storage_i, storage_p) == (i, p) and (r1, r2) in transfer_cost_map:
+                key = (r1, r2, i, s, p)
+                totals[key] = chain_breakdown(key, storage_cost, transfer_cost_map[r1, r2], compute_cost)["total_cost"]
+    return totals
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_alternatives_are_the_cheapest_distinct_chains(seed):
+    cost_maps = synthetic_cost_maps(3, seed)
+    response = solve_cost_maps(*cost_maps, top_k=10)
+    alternatives = response["alternatives"]
+
+    totals = [chain["total_cost"] for chain in alternatives]
+    assert len(alternatives) == 10
+    assert len({chain["combination"] for chain in alternatives}) == 10
+    assert totals == sorted(totals)
+    assert totals == pytest.approx(sorted(every_chain_total(*cost_maps).values())[:10])
+    assert alternatives[0]["combination"] == response["chosen_combinations"][0]["combination"]
+
+
+def test_cost_components_add_up():
+    for chain in solve_cost_maps(*synthetic_cost_maps(3, 3), top_k=5)["alternatives"]:
+        assert chain["storage_cost"] + chain["transfer_cost"] + chain["compute_cost"] == \
+            pytest.approx(chain["total_cost"])
+
+
+def test_optimize_returns_top_k_alternatives(client, job):
+    result = client.post('/optimize', json=dict(job, elapsed_time=8300, top_k=3)).json["result"]
+
+    assert len(result["alternatives"]) == 3
+    assert result["alternatives"][0]["combination"] == result["chosen_combinations"][0]["combination"]
+    assert "alternatives" not in client.post('/optimize', json=dict(job, elapsed_time=8300)).json["result"]